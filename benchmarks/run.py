@@ -0,0 +1,236 @@
+"""
+存储与界面刷新的基准测试。
+
+    python benchmarks/run.py                         # 1k / 10k / 100k 张归档
+    python benchmarks/run.py --sizes 1000 --repeat 3
+    python benchmarks/run.py -o after.json --compare before.json
+    python benchmarks/run.py --no-ui                 # 只测存储，不需要 PySide6
+
+每个规模先生成一份合成数据（50 个长期目标、500 个模板，结构与 goals_data.json 一致），
+再在临时目录里逐项计时。界面部分在 QT_QPA_PLATFORM=offscreen 下运行，不弹出窗口。
+结果以 JSON 输出（默认到标准输出），人可读的表格打印到标准错误。
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import make_store, write_store  # noqa: E402
+from goalfocus_core.storage import JournalStore, load_data, save_data  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def measure(func, repeat: int, setup=None) -> dict:
+    """func 执行 repeat 次的耗时统计（毫秒）；setup 在每次计时前调用，不计入耗时。"""
+    times = []
+    for i in range(repeat):
+        if setup is not None:
+            setup(i)
+        t0 = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": min(times),
+        "median_ms": statistics.median(times),
+        "mean_ms": statistics.fmean(times),
+        "max_ms": max(times),
+    }
+
+
+# ---------- 存储 ----------
+
+def bench_storage(data_dir: str, repeat: int) -> dict:
+    path = os.path.join(data_dir, "goals_data.json")
+    out_path = os.path.join(data_dir, "save_copy.json")
+    # 第一次加载把生成的旧格式数据拆成按月分片；之后的 load_data 测的都是分片格式
+    store = load_data(path)
+
+    def load_full():
+        # 读入全部分片
+        s = load_data(path)
+        for _ in s["archive"]:
+            pass
+
+    results = {
+        "load_data": measure(lambda: load_data(path), repeat),
+        "load_data_full": measure(load_full, repeat),
+        "save_data": measure(lambda: save_data(store, out_path), repeat),
+    }
+
+    # 日常修改：追加一条日志记录并落盘
+    storage = JournalStore(out_path)
+    edited = storage.load()
+
+    def record():
+        goal = edited["active_goals"][0]
+        goal["current_goal"] = f"修改 {time.perf_counter()}"
+        storage.record(edited, [("put", "active_goals", goal["id"])])
+        storage.flush()
+
+    results["record_change"] = measure(record, repeat)
+
+    # 修改一张归档卡片：只重写它所在月份的分片
+    def record_archive():
+        goal = edited["archive"][0]
+        goal["current_goal"] = f"修改 {time.perf_counter()}"
+        storage.record(edited, [("put", "archive", goal["id"])])
+        storage.flush()
+
+    results["record_archive_change"] = measure(record_archive, repeat)
+    storage.close()
+    return results
+
+
+# ---------- 界面 ----------
+
+def bench_ui(data_dir: str, repeat: int) -> dict:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+
+    import main as gui
+
+    app = QApplication.instance() or QApplication([])
+    old_dir = os.environ.get("GOALFOCUS_DATA_DIR")
+    # 数据目录指向生成的数据（默认档案直接使用数据目录）
+    os.environ["GOALFOCUS_DATA_DIR"] = data_dir
+    try:
+        results = {}
+        windows = []
+
+        def startup():
+            windows.append(gui.GoalApp())
+
+        results["startup"] = measure(startup, repeat)
+        for w in windows[:-1]:
+            w.shutdown()
+            w.deleteLater()
+        window = windows[-1]
+
+        # 等归档解析完、延后的标签页建好、索引建完，之后的计时都是稳态
+        len(window.store["archive"])
+        app.processEvents()
+        window.finish_startup()
+        window.repo.ensure_archive_indexes()
+        app.processEvents()
+
+        results["refresh_main_state"] = measure(window.refresh_main_state, repeat)
+        results["refresh_archive_tab"] = measure(window.refresh_archive_tab, repeat)
+
+        table = window.archive_table
+        rows = max(table.model().rowCount(), 1)
+
+        def select(i):
+            table.selectionModel().blockSignals(True)
+            table.selectRow((i * 37) % rows)
+            table.selectionModel().blockSignals(False)
+
+        results["on_archive_selection_changed"] = measure(window.on_archive_selection_changed, repeat, setup=select)
+
+        # 写线程结束之后临时目录才能删除
+        window.shutdown()
+        window.deleteLater()
+        app.processEvents()
+        return results
+    finally:
+        if old_dir is None:
+            os.environ.pop("GOALFOCUS_DATA_DIR", None)
+        else:
+            os.environ["GOALFOCUS_DATA_DIR"] = old_dir
+
+
+# ---------- 汇总 ----------
+
+def git_revision() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def print_table(results: list[dict], baseline: dict | None) -> None:
+    header = f"{'benchmark':<30}{'archive':>9}{'median ms':>12}{'min ms':>10}"
+    if baseline:
+        header += f"{'before ms':>12}{'ratio':>8}"
+    print(header, file=sys.stderr)
+    for r in results:
+        line = f"{r['benchmark']:<30}{r['archive_size']:>9}{r['median_ms']:>12.2f}{r['min_ms']:>10.2f}"
+        old = baseline.get((r["benchmark"], r["archive_size"])) if baseline else None
+        if old is not None:
+            line += f"{old:>12.2f}{r['median_ms'] / old if old else float('nan'):>8.2f}"
+        print(line, file=sys.stderr)
+
+
+def load_baseline(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {(r["benchmark"], r["archive_size"]): r["median_ms"] for r in data.get("results", [])}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="GoalFocus 基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="归档卡片数")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-ui", action="store_true", help="跳过界面部分")
+    parser.add_argument("-o", "--output", help="结果 JSON 文件（默认输出到标准输出）")
+    parser.add_argument("--compare", metavar="JSON", help="与之前的结果对比")
+    args = parser.parse_args(argv)
+
+    ui = not args.no_ui
+    if ui:
+        try:
+            import PySide6  # noqa: F401
+        except ImportError:
+            print("PySide6 is not installed, skipping UI benchmarks", file=sys.stderr)
+            ui = False
+
+    results = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="goalfocus-bench-") as data_dir:
+            print(f"archive size {size}: generating…", file=sys.stderr)
+            write_store(os.path.join(data_dir, "goals_data.json"), make_store(size, seed=args.seed))
+            timings = bench_storage(data_dir, args.repeat)
+            if ui:
+                timings.update(bench_ui(data_dir, args.repeat))
+            for name, stats in timings.items():
+                results.append({"benchmark": name, "archive_size": size, **stats})
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "ui": ui,
+        },
+        "results": results,
+    }
+    print_table(results, load_baseline(args.compare) if args.compare else None)
+
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+    else:
+        print(data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+生成与 goals_data.json 结构完全一致的合成数据，供基准测试使用。
+同样的参数和 seed 总是生成同样的数据。
+"""
+
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from goalfocus_core.storage import save_data
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_LONG_TERM_WORDS = ["英语", "健身", "写作", "阅读", "编程", "理财", "绘画", "吉他", "冥想", "摄影"]
+_GOAL_WORDS = ["完成", "复习", "练习", "整理", "准备", "阅读", "推进", "修改", "总结", "规划"]
+_OBJECT_WORDS = ["口语 30 分钟", "第三章", "周报", "项目文档", "单词 50 个", "跑步 5 公里", "代码评审", "读书笔记"]
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _ts(t: datetime) -> str:
+    return t.strftime(TIME_FORMAT)
+
+
+def _actions(rng: random.Random, created: datetime, finished: datetime | None) -> list[dict]:
+    actions = []
+    for _ in range(rng.randint(2, 6)):
+        done_at = None
+        if finished is not None:
+            done_at = created + (finished - created) * rng.random()
+        actions.append(
+            {
+                "id": _uuid(rng),
+                "text": f"{rng.choice(_GOAL_WORDS)}{rng.choice(_OBJECT_WORDS)}",
+                "done": finished is not None,
+                "created_at": _ts(created),
+                "completed_at": _ts(done_at) if done_at else None,
+            }
+        )
+    return actions
+
+
+def make_store(archive_size: int, long_term_goals: int = 50, templates: int = 500, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    end = datetime(2025, 1, 1, 22, 0, 0)
+
+    lt_goals = []
+    for i in range(long_term_goals):
+        lt_goals.append(
+            {
+                "id": _uuid(rng),
+                "title": f"{_LONG_TERM_WORDS[i % len(_LONG_TERM_WORDS)]}计划 {i + 1}",
+                "target_count": rng.choice([30, 50, 100, 200]),
+                "completed_count": 0,
+                "created_at": _ts(end - timedelta(days=1000)),
+                "completed_at": None,
+            }
+        )
+
+    # 归档从新到旧：每张卡片比上一张早完成若干分钟到一天
+    archive = []
+    finished = end
+    for _ in range(archive_size):
+        finished -= timedelta(minutes=rng.randint(20, 1440))
+        created = finished - timedelta(minutes=rng.randint(10, 600))
+        lt = rng.sample(lt_goals, rng.randint(0, 2))
+        for g in lt:
+            g["completed_count"] += 1
+        archive.append(
+            {
+                "id": _uuid(rng),
+                "long_term": "；".join(g["title"] for g in lt) or rng.choice(_LONG_TERM_WORDS),
+                "long_term_goal_id": lt[0]["id"] if lt else None,
+                "long_term_goal_ids": [g["id"] for g in lt],
+                "current_goal": f"{rng.choice(_GOAL_WORDS)}{rng.choice(_OBJECT_WORDS)}",
+                "actions": _actions(rng, created, finished),
+                "done": True,
+                "created_at": _ts(created),
+                "completed_at": _ts(finished),
+            }
+        )
+
+    tpl = []
+    for i in range(templates):
+        lt = rng.sample(lt_goals, rng.randint(0, 2))
+        tpl.append(
+            {
+                "id": _uuid(rng),
+                "name": f"模板 {i + 1}",
+                "long_term_text": "；".join(g["title"] for g in lt),
+                "long_term_goal_id": lt[0]["id"] if lt else None,
+                "long_term_goal_ids": [g["id"] for g in lt],
+                "current_goal": f"{rng.choice(_GOAL_WORDS)}{rng.choice(_OBJECT_WORDS)}",
+                "actions_texts": [f"{rng.choice(_GOAL_WORDS)}{rng.choice(_OBJECT_WORDS)}" for _ in range(rng.randint(2, 6))],
+                "created_at": _ts(end - timedelta(days=rng.randint(0, 1000))),
+            }
+        )
+
+    active_created = end + timedelta(minutes=30)
+    active = {
+        "id": _uuid(rng),
+        "long_term": lt_goals[0]["title"] if lt_goals else "",
+        "long_term_goal_id": lt_goals[0]["id"] if lt_goals else None,
+        "long_term_goal_ids": [lt_goals[0]["id"]] if lt_goals else [],
+        "current_goal": "当前的专注卡片",
+        "actions": _actions(rng, active_created, None),
+        "done": False,
+        "created_at": _ts(active_created),
+        "completed_at": None,
+    }
+
+    return {
+        "active_goals": [active],
+        "archive": archive,
+        "total_completed_count": archive_size,
+        "delete_tokens_used": 0,
+        "long_term_goals": lt_goals,
+        "templates": tpl,
+    }
+
+
+def write_store(path: str, store: dict) -> None:
+    """按桌面程序自己的写法落盘（快照格式，archive 在最后）。"""
+    save_data(store, path)
@@ -0,0 +1,3 @@
+"""
+GoalFocus 的核心逻辑（不依赖 Qt）：数据存储、数据结构与业务操作。
+"""
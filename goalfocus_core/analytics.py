@@ -0,0 +1,181 @@
+"""
+归档的列式导出与向量化统计（需要 NumPy，未安装时 HAVE_NUMPY 为 False）。
+
+时间列是“本地时间”的 datetime64[s]：epoch 秒加上当时的 UTC 偏移，
+这样按天/小时/星期取整得到的就是用户看到的日期和钟点。
+"""
+
+import time
+
+from goalfocus_core.model import Record, parse_ts
+from goalfocus_core.storage import goal_long_term_ids
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAVE_NUMPY = np is not None
+
+# datetime64 的 NaT 在 int64 视图下的值，用来表示“没有时间”
+_NAT = -(2**63)
+_SECONDS_PER_DAY = 86400
+# 1970-01-01 是周四；(天数 + 3) % 7 得到周一为 0 的星期
+_EPOCH_WEEKDAY = 3
+
+
+def _epoch(item, key: str) -> int:
+    value = getattr(item, key) if isinstance(item, Record) else parse_ts(item.get(key))
+    return value if isinstance(value, int) else _NAT
+
+
+def _to_local(ts: "np.ndarray") -> "np.ndarray":
+    """epoch 秒（int64，缺失为 _NAT）-> 本地时间的 datetime64[s]。"""
+    out = ts.copy()
+    valid = ts != _NAT
+    if valid.any():
+        # UTC 偏移只在整点变化：对出现过的每个小时查一次 localtime，再按下标广播回去
+        hours, inverse = np.unique(ts[valid] // 3600, return_inverse=True)
+        offsets = np.fromiter(
+            (time.localtime(int(h) * 3600).tm_gmtoff for h in hours), dtype=np.int64, count=len(hours)
+        )
+        out[valid] = ts[valid] + offsets[inverse]
+    return out.view("datetime64[s]")
+
+
+class ArchiveColumns:
+    """
+    归档的列式快照（每张卡片一行）：
+    - ids：卡片 id（list）；
+    - created / completed：本地时间 datetime64[s]，缺失为 NaT；
+    - action_count / action_done：关键动作数与已完成数（int32）；
+    - link_offsets / link_codes：CSR 形式的长期目标关联，第 i 张卡片关联
+      long_term_ids[link_codes[link_offsets[i]:link_offsets[i + 1]]]；
+    - action_completed / action_row：所有关键动作的完成时间及其所属卡片的行号。
+    """
+
+    def __init__(self, goals):
+        if np is None:
+            raise RuntimeError("NumPy is required for archive analytics")
+        goals = list(goals)
+        n = len(goals)
+        self.ids = [g.get("id") for g in goals]
+        self.created = _to_local(np.fromiter((_epoch(g, "created_at") for g in goals), np.int64, n))
+        self.completed = _to_local(np.fromiter((_epoch(g, "completed_at") for g in goals), np.int64, n))
+
+        actions = [g.get("actions") or [] for g in goals]
+        self.action_count = np.fromiter((len(a) for a in actions), np.int32, n)
+        self.action_done = np.fromiter((sum(1 for x in a if x.get("done")) for a in actions), np.int32, n)
+
+        action_ts = [_epoch(x, "completed_at") for a in actions for x in a]
+        self.action_completed = _to_local(np.array(action_ts, dtype=np.int64))
+        self.action_row = np.repeat(np.arange(n, dtype=np.int32), self.action_count)
+
+        codes: dict[str, int] = {}
+        link_codes = []
+        offsets = np.zeros(n + 1, dtype=np.int32)
+        for i, g in enumerate(goals):
+            for lt_id in goal_long_term_ids(g):
+                link_codes.append(codes.setdefault(lt_id, len(codes)))
+            offsets[i + 1] = len(link_codes)
+        self.long_term_ids = list(codes)
+        self.link_offsets = offsets
+        self.link_codes = np.array(link_codes, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows_for_long_term_goal(self, lt_id: str) -> "np.ndarray":
+        """关联了某个长期目标的卡片行号。"""
+        if lt_id not in self.long_term_ids:
+            return np.zeros(0, dtype=np.int64)
+        code = self.long_term_ids.index(lt_id)
+        hits = np.flatnonzero(self.link_codes == code)
+        # 关联下标 -> 所属卡片：offsets 是非递减的，searchsorted 找到所在区间
+        return np.unique(np.searchsorted(self.link_offsets, hits, side="right") - 1)
+
+    def durations(self) -> "np.ndarray":
+        """每张卡片从创建到完成的秒数（两端都有时间的卡片）。"""
+        ok = ~(np.isnat(self.created) | np.isnat(self.completed))
+        return (self.completed[ok] - self.created[ok]).astype(np.int64)
+
+
+# ---------- 向量化统计 ----------
+
+def _valid(times: "np.ndarray") -> "np.ndarray":
+    return times[~np.isnat(times)]
+
+
+def _weekday(days: "np.ndarray") -> "np.ndarray":
+    return (days.astype(np.int64) + _EPOCH_WEEKDAY) % 7
+
+
+def daily_counts(times: "np.ndarray") -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    按天计数，覆盖从最早到最晚的每一天（没有记录的天为 0）。
+    返回 (datetime64[D] 日期, int64 计数)。
+    """
+    days = _valid(times).astype("datetime64[D]")
+    if days.size == 0:
+        return np.zeros(0, dtype="datetime64[D]"), np.zeros(0, dtype=np.int64)
+    first = days.min()
+    counts = np.bincount((days - first).astype(np.int64))
+    return first + np.arange(counts.size), counts
+
+
+def histogram(times: "np.ndarray", unit: str = "D") -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    按 unit 分箱计数："D" 天、"W" 周（周一开始）、"M" 月。
+    返回 (每个箱的起始时间, 计数)，中间空箱为 0。
+    """
+    if unit == "D":
+        return daily_counts(times)
+    if unit == "W":
+        days = _valid(times).astype("datetime64[D]")
+        # numpy 的 datetime64[W] 以周四对齐，这里自己对齐到周一
+        mondays = days - _weekday(days).astype("timedelta64[D]")
+        if mondays.size == 0:
+            return mondays, np.zeros(0, dtype=np.int64)
+        first = mondays.min()
+        counts = np.bincount((mondays - first).astype(np.int64) // 7)
+        return first + 7 * np.arange(counts.size), counts
+    if unit == "M":
+        months = _valid(times).astype("datetime64[M]")
+        if months.size == 0:
+            return months, np.zeros(0, dtype=np.int64)
+        first = months.min()
+        counts = np.bincount((months - first).astype(np.int64))
+        return first + np.arange(counts.size), counts
+    raise ValueError(f"unknown histogram unit: {unit}")
+
+
+def hour_weekday_heatmap(times: "np.ndarray") -> "np.ndarray":
+    """7×24 计数矩阵：行是星期（0 = 周一），列是小时。"""
+    t = _valid(times)
+    days = t.astype("datetime64[D]")
+    hours = (t - days).astype(np.int64) // 3600
+    cells = _weekday(days) * 24 + hours
+    return np.bincount(cells, minlength=7 * 24).reshape(7, 24)
+
+
+def rolling_rate(times: "np.ndarray", window: int = 7) -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    每天往前 window 天（含当天）的平均每日完成数。
+    返回 (datetime64[D] 日期, float64 速率)，不足一个窗口的前几天按已有天数平均。
+    """
+    days, counts = daily_counts(times)
+    if counts.size == 0:
+        return days, counts.astype(np.float64)
+    csum = np.cumsum(counts)
+    shifted = np.concatenate((np.zeros(window, dtype=csum.dtype), csum[:-window] if csum.size > window else csum[:0]))
+    sums = csum - shifted[: csum.size]
+    spans = np.minimum(np.arange(1, counts.size + 1), window)
+    return days, sums / spans
+
+
+def duration_histogram(columns: ArchiveColumns, bins=None) -> tuple["np.ndarray", "np.ndarray"]:
+    """卡片用时分布；默认按 1 小时、半天、1/2/3/7/14/30 天分段。返回 (计数, 分段边界秒数)。"""
+    if bins is None:
+        bins = np.array([0, 1, 12, 24, 48, 72, 168, 336, 720], dtype=np.int64) * 3600
+        bins = np.append(bins, np.iinfo(np.int64).max)
+    return np.histogram(columns.durations(), bins=bins)
@@ -0,0 +1,308 @@
+"""
+命令行工具：不启动界面，直接读写数据文件。
+
+    python goalfocus.py status
+    python goalfocus.py add "背 50 个单词"
+    python goalfocus.py check 1 2
+    python goalfocus.py finish
+    python goalfocus.py check --card 2 1     # 同时有多张卡片时用 --card 指明（序号或 id）
+    python goalfocus.py start 晨间英语
+    python goalfocus.py export --from 2024-01-01 --to 2024-03-31 -o q1.json
+    python goalfocus.py import q1.json
+    python goalfocus.py batch ops.txt
+    python goalfocus.py profiles --new 工作        # 档案：列出 / 新建 / 切换（--use）/ 删除（--delete）
+    python goalfocus.py --profile 工作 status      # 只对这一次命令使用某个档案
+
+batch 文件每行一条命令（写法同上，省略 "python goalfocus.py"），# 开头为注释。
+整批命令只加载、保存一次；任何一行出错都不会写入数据。
+"""
+
+import argparse
+import json
+import shlex
+import sys
+
+from goalfocus_core import profiling
+from goalfocus_core.locking import LockError
+from goalfocus_core.model import json_default
+from goalfocus_core.profiles import ProfileManager
+from goalfocus_core.service import GoalError, GoalService
+from goalfocus_core.storage import open_storage
+
+
+class CommandError(Exception):
+    pass
+
+
+class _LineParser(argparse.ArgumentParser):
+    """batch 里逐行解析：出错时抛出 CommandError，不打印用法、不退出。"""
+
+    def error(self, message):
+        raise CommandError(message)
+
+
+def _card(service: GoalService, ref: str | None):
+    """卡片序号（从 1 开始，同 status 的顺序）或卡片 id -> 卡片；只有一张时可以省略。"""
+    goals = service.active_goals()
+    if not goals:
+        raise GoalError("没有卡片", "当前没有进行中的专注卡片。")
+    if ref is None:
+        if len(goals) > 1:
+            raise CommandError(f"当前有 {len(goals)} 张进行中的卡片，请用 --card 指明是哪一张")
+        return goals[0]
+    if ref.isdigit() and 1 <= int(ref) <= len(goals):
+        return goals[int(ref) - 1]
+    goal = service.active_goal(ref)
+    if goal is None:
+        raise CommandError(f"没有这张卡片：{ref}")
+    return goal
+
+
+def _action_ids(service: GoalService, goal, refs: list[str]) -> list[str]:
+    """动作序号（从 1 开始）或动作 id -> 动作 id。"""
+    actions = goal["actions"]
+    ids = []
+    for ref in refs:
+        if ref.isdigit() and 1 <= int(ref) <= len(actions):
+            ids.append(actions[int(ref) - 1]["id"])
+        elif service.repo.action_goal(ref) is goal:
+            ids.append(ref)
+        else:
+            raise CommandError(f"没有这个关键动作：{ref}")
+    return ids
+
+
+def _long_term_ids(service: GoalService, refs: list[str]) -> list[str]:
+    """长期目标名称或 id -> id。"""
+    ids = []
+    for ref in refs:
+        g = service.repo.long_term_goal(ref)
+        if g is None:
+            g = next((x for x in service.repo.long_term_goals() if x.get("title") == ref), None)
+        if g is None:
+            raise CommandError(f"没有这个长期目标：{ref}")
+        ids.append(g["id"])
+    return ids
+
+
+def cmd_status(service: GoalService, args) -> None:
+    goals = service.active_goals()
+    total, tokens = service.delete_tokens()
+    if not goals:
+        print("当前没有进行中的专注卡片。")
+    for n, goal in enumerate(goals, start=1):
+        if len(goals) > 1:
+            print(f"#{n}  {goal['id']}")
+        print(f"长期目标：{goal.get('long_term', '')}")
+        print(f"当下目标：{goal.get('current_goal', '')}")
+        for idx, a in enumerate(goal["actions"], start=1):
+            print(f"  {idx}. [{'x' if a.get('done') else ' '}] {a.get('text', '')}")
+    print(f"累计完成 {total} 张，可用删除机会 {tokens} 次。")
+
+
+def cmd_new(service: GoalService, args) -> None:
+    lt_ids = _long_term_ids(service, args.lt or [])
+    service.create_goal(args.long_term, args.goal, args.actions, lt_ids)
+    print(f"已创建卡片：{args.goal}")
+
+
+def cmd_add(service: GoalService, args) -> None:
+    goal = _card(service, args.card)
+    for text in args.texts:
+        service.add_action(goal["id"], text)
+    print(f"已添加 {len(args.texts)} 个关键动作。")
+
+
+def cmd_check(service: GoalService, args) -> None:
+    goal = _card(service, args.card)
+    for action_id in _action_ids(service, goal, args.actions):
+        service.update_action(action_id, done=not args.undo)
+    print(f"已{'取消' if args.undo else '勾选'} {len(args.actions)} 个关键动作。")
+
+
+def cmd_finish(service: GoalService, args) -> None:
+    goal, _ = service.finish_goal(_card(service, args.card)["id"])
+    print(f"已完成并归档：{goal.get('current_goal', '')}")
+
+
+def cmd_templates(service: GoalService, args) -> None:
+    for t in service.repo.templates():
+        print(f"{t.get('name', '')}  |  {t.get('long_term_text', '')}  |  动作 {len(t.get('actions_texts') or [])} 个")
+
+
+def cmd_start(service: GoalService, args) -> None:
+    t = service.repo.template_named(args.template) or service.repo.template(args.template)
+    if t is None:
+        raise CommandError(f"没有这个模板：{args.template}")
+    goal = service.start_template(t["id"])
+    print(f"已从模板创建卡片：{goal.get('current_goal', '')}")
+
+
+def cmd_export(service: GoalService, args) -> None:
+    goals = list(service.archive_between(args.start, args.end))
+    data = json.dumps({"archive": goals}, ensure_ascii=False, indent=2, default=json_default)
+    if args.output in (None, "-"):
+        print(data)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(data)
+        print(f"已导出 {len(goals)} 张归档卡片到 {args.output}", file=sys.stderr)
+
+
+def cmd_import(service: GoalService, args) -> None:
+    try:
+        with open(args.file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise CommandError(f"无法读取 {args.file}：{e}")
+    # 接受 export 的输出，也接受完整的数据文件
+    goals = data.get("archive") if isinstance(data, dict) else data
+    if not isinstance(goals, list):
+        raise CommandError(f"{args.file} 里没有归档卡片列表")
+    n = service.import_archive(goals)
+    print(f"已导入 {n} 张归档卡片（跳过 {len(goals) - n} 张已存在的）。")
+
+
+def cmd_batch(service: GoalService, args) -> None:
+    try:
+        f = sys.stdin if args.file == "-" else open(args.file, "r", encoding="utf-8")
+        with f:
+            lines = f.read().splitlines()
+    except OSError as e:
+        raise CommandError(f"无法读取 {args.file}：{e}")
+
+    parser = build_parser(exit_on_error=False)
+    for lineno, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            sub = parser.parse_args(shlex.split(line))
+        except (CommandError, argparse.ArgumentError, ValueError) as e:
+            raise CommandError(f"第 {lineno} 行无法解析：{line}（{e}）")
+        except SystemExit:
+            # 例如 --help：用法已经打印出来了
+            raise CommandError(f"第 {lineno} 行无法解析：{line}")
+        if sub.func in (cmd_batch, cmd_profiles):
+            raise CommandError(f"第 {lineno} 行：batch 里不能使用 {sub.command}")
+        try:
+            sub.func(service, sub)
+        except (GoalError, CommandError) as e:
+            raise CommandError(f"第 {lineno} 行：{_message(e)}")
+
+
+def cmd_profiles(profiles: ProfileManager, args) -> None:
+    """不需要加载数据，由 main 直接调用。"""
+    if args.new:
+        profiles.create(args.new)
+        print(f"已新建档案：{args.new.strip()}")
+    if args.use:
+        profiles.set_current(args.use)
+        print(f"已切换到档案：{args.use}")
+    if args.delete:
+        target = profiles.delete(args.delete)
+        print(f"已删除档案：{args.delete}（文件移到了 {target}）")
+    if not (args.new or args.use or args.delete):
+        current = profiles.current
+        for name in profiles.names():
+            mark = "*" if name == current else " "
+            print(f"{mark} {name}    {profiles.directory(name)}")
+
+
+def _message(e: Exception) -> str:
+    return f"{e.title}：{e}" if isinstance(e, GoalError) else str(e)
+
+
+def _card_option(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--card", metavar="卡片", help="要操作的卡片（status 中的序号或 id），只有一张时可省略")
+
+
+def build_parser(exit_on_error: bool = True) -> argparse.ArgumentParser:
+    """exit_on_error=False 时解析出错抛出 CommandError（batch 逐行解析用）。"""
+    parser_class = argparse.ArgumentParser if exit_on_error else _LineParser
+    parser = parser_class(prog="goalfocus", description="GoalFocus 命令行工具", exit_on_error=exit_on_error)
+    parser.add_argument("--storage", choices=("json", "sqlite"), help="存储引擎（默认同桌面程序）")
+    parser.add_argument("--profile", metavar="档案", help="使用的档案（默认为当前档案，见 profiles）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("status", help="查看进行中的卡片")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("new", help="创建新卡片")
+    p.add_argument("--long-term", required=True, help="长期目标描述")
+    p.add_argument("--goal", required=True, help="当下目标")
+    p.add_argument("--lt", action="append", metavar="长期目标", help="关联的长期目标（名称或 id，可重复）")
+    p.add_argument("actions", nargs="+", help="关键动作")
+    p.set_defaults(func=cmd_new)
+
+    p = sub.add_parser("add", help="给卡片添加关键动作")
+    p.add_argument("texts", nargs="+")
+    _card_option(p)
+    p.set_defaults(func=cmd_add)
+
+    p = sub.add_parser("check", help="勾选关键动作（序号从 1 开始，或动作 id）")
+    p.add_argument("actions", nargs="+")
+    p.add_argument("--undo", action="store_true", help="取消勾选")
+    _card_option(p)
+    p.set_defaults(func=cmd_check)
+
+    p = sub.add_parser("finish", help="完成并归档卡片")
+    _card_option(p)
+    p.set_defaults(func=cmd_finish)
+
+    p = sub.add_parser("templates", help="列出模板")
+    p.set_defaults(func=cmd_templates)
+
+    p = sub.add_parser("start", help="用模板创建卡片")
+    p.add_argument("template", help="模板名称或 id")
+    p.set_defaults(func=cmd_start)
+
+    p = sub.add_parser("export", help="导出一段时间的归档（按完成日期）")
+    p.add_argument("--from", dest="start", metavar="YYYY-MM-DD")
+    p.add_argument("--to", dest="end", metavar="YYYY-MM-DD")
+    p.add_argument("-o", "--output", help="输出文件（默认输出到屏幕）")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", help="导入归档（export 的输出或完整数据文件）")
+    p.add_argument("file")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("batch", help="批量执行文件中的命令（- 表示标准输入）")
+    p.add_argument("file")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("profiles", help="列出档案，或新建 / 切换 / 删除档案")
+    p.add_argument("--new", metavar="名称")
+    p.add_argument("--use", metavar="名称", help="切换当前档案（桌面程序下次启动或切换时生效）")
+    p.add_argument("--delete", metavar="名称", help="删除档案（文件移到数据目录的 trash 下）")
+    p.set_defaults(func=cmd_profiles)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = profiling.configure(sys.argv[1:] if argv is None else argv)
+    args = build_parser().parse_args(argv)
+    profiles = ProfileManager()
+    try:
+        if args.func is cmd_profiles:
+            cmd_profiles(profiles, args)
+            return 0
+        if args.profile is not None and args.profile not in profiles.names():
+            raise CommandError(f"没有这个档案：{args.profile}")
+    except (GoalError, CommandError) as e:
+        print(_message(e), file=sys.stderr)
+        return 1
+    # 变更先攒在内存里，成功后一次写入；出错则丢弃（SQLite 引擎回滚当前事务）
+    try:
+        service = GoalService(open_storage(args.storage, profiles.directory(args.profile)), autosave=False)
+    except LockError as e:
+        print(f"数据文件正被其它程序使用，请稍后再试：{e}", file=sys.stderr)
+        return 1
+    try:
+        args.func(service, args)
+    except (GoalError, CommandError) as e:
+        print(_message(e), file=sys.stderr)
+        service.discard()
+        return 1
+    service.close()
+    return 0
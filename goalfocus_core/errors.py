@@ -0,0 +1,15 @@
+"""
+核心模块共用的异常类型，放在这里避免 profiles 等模块为了一个异常去导入 service。
+"""
+
+
+class GoalError(Exception):
+    """
+    业务规则不允许的操作（例如已有进行中的卡片时再创建）。
+    title / 消息正文直接用于界面提示；level 为 "warning" 或 "information"。
+    """
+
+    def __init__(self, title: str, message: str, level: str = "information"):
+        super().__init__(message)
+        self.title = title
+        self.level = level
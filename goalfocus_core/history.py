@@ -0,0 +1,142 @@
+"""
+撤销 / 重做。
+
+每一步操作（Command）只保存它改动到的那几个对象在修改前的状态，
+内存占用与改动大小成正比，与 store 大小无关。对象用一个小元组标识：
+    ("set", key)                 —— 顶层字段，如 delete_tokens_used
+    ("item", coll, item_id)      —— 列表 coll 中的一项：(下标, 拷贝)，不存在时为 None
+    ("action", action_id)        —— 进行中卡片里的一个关键动作：(卡片 id, 下标, 拷贝) 或 None
+    ("order", goal_id)           —— 卡片里关键动作的顺序：id 列表
+撤销时先记下这些对象的当前状态作为重做的那一步，再把旧状态写回；重做同理，两者完全对称。
+"""
+
+from collections import deque
+
+from goalfocus_core.model import Record
+
+# 最多保留多少步；更早的在新操作入栈时自动丢弃
+HISTORY_LIMIT = 100
+
+
+class Command:
+    __slots__ = ("label", "steps")
+
+    def __init__(self, label: str, steps: list[tuple]):
+        self.label = label
+        # [(对象标识, 修改前的状态), ...]，按记录顺序
+        self.steps = steps
+
+
+def _copy(value):
+    return value.clone() if isinstance(value, Record) else value
+
+
+def capture(repo, entity: tuple):
+    kind = entity[0]
+    if kind == "set":
+        return _copy(repo.store.get(entity[1]))
+    if kind == "item":
+        found = repo.find_item(entity[1], entity[2])
+        return None if found is None else (found[0], found[1].clone())
+    if kind == "action":
+        goal = repo.action_goal(entity[1])
+        if goal is None:
+            return None
+        return goal["id"], repo.action_index(entity[1]), repo.action(entity[1]).clone()
+    if kind == "order":
+        goal = repo.active_goal(entity[1])
+        return None if goal is None else [a["id"] for a in goal["actions"]]
+    raise ValueError(f"unknown history entity: {entity!r}")
+
+
+def restore(repo, entity: tuple, state) -> list[tuple]:
+    """把对象恢复到 state，返回对应的变更（格式见 storage.make_record）。"""
+    kind = entity[0]
+    if kind == "set":
+        repo.store[entity[1]] = state
+        return [("set", entity[1])]
+    if kind == "item":
+        coll, item_id = entity[1], entity[2]
+        repo.remove_item(coll, item_id)
+        if state is None:
+            return [("del", coll, item_id)]
+        repo.insert_item(coll, state[1], state[0])
+        return [("put", coll, item_id)]
+    if kind == "action":
+        changes = []
+        old_goal = repo.action_goal(entity[1])
+        if old_goal is not None:
+            repo.remove_action(entity[1])
+            changes.append(("put", "active_goals", old_goal["id"]))
+        # 卡片已经不在进行中（例如被其它程序归档）时只能放弃这一步
+        if state is not None and repo.active_goal(state[0]) is not None:
+            repo.add_action(state[0], state[2], state[1])
+            if old_goal is None or old_goal["id"] != state[0]:
+                changes.append(("put", "active_goals", state[0]))
+        return changes
+    if kind == "order":
+        if state is None or repo.active_goal(entity[1]) is None:
+            return []
+        repo.reorder_actions(entity[1], state)
+        return [("put", "active_goals", entity[1])]
+    raise ValueError(f"unknown history entity: {entity!r}")
+
+
+class History:
+    """有上限的撤销栈和重做栈（deque 环形缓冲）。"""
+
+    def __init__(self, limit: int = HISTORY_LIMIT):
+        self._undo: deque[Command] = deque(maxlen=limit)
+        self._redo: deque[Command] = deque(maxlen=limit)
+
+    def snapshot(self, repo, label: str, entities) -> Command:
+        """在修改之前调用，记下这些对象的当前状态。"""
+        return Command(label, [(e, capture(repo, e)) for e in entities])
+
+    def push(self, command: Command) -> None:
+        """新操作入栈；之前撤销掉的步骤不能再重做。"""
+        self._undo.append(command)
+        self._redo.clear()
+
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo_label(self) -> str | None:
+        return self._undo[-1].label if self._undo else None
+
+    def redo_label(self) -> str | None:
+        return self._redo[-1].label if self._redo else None
+
+    def clear(self) -> None:
+        self._undo.clear()
+        self._redo.clear()
+
+    def undo(self, repo) -> tuple[Command | None, list[tuple]]:
+        """撤销最近一步，返回 (这一步, 变更列表)；没有可撤销的返回 (None, [])。"""
+        if not self._undo:
+            return None, []
+        command = self._undo.pop()
+        inverse, changes = self._apply(repo, command)
+        self._redo.append(inverse)
+        return command, changes
+
+    def redo(self, repo) -> tuple[Command | None, list[tuple]]:
+        if not self._redo:
+            return None, []
+        command = self._redo.pop()
+        inverse, changes = self._apply(repo, command)
+        self._undo.append(inverse)
+        return command, changes
+
+    @staticmethod
+    def _apply(repo, command: Command) -> tuple[Command, list[tuple]]:
+        # 倒序恢复；恢复前记下的当前状态就是反方向的那一步（它再倒序恢复时顺序正好相反）
+        inverse = []
+        changes = []
+        for entity, state in reversed(command.steps):
+            inverse.append((entity, capture(repo, entity)))
+            changes.extend(restore(repo, entity, state))
+        return Command(command.label, inverse), changes
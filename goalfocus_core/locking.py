@@ -0,0 +1,111 @@
+"""
+跨进程的咨询式文件锁：桌面程序、命令行同时读写同一份数据文件时，读写快照和日志前都先加锁。
+Windows 用 msvcrt.locking，其它系统用 fcntl.flock；同一进程的多个线程之间也互斥。
+只约束同样加锁的程序（旧版程序不加锁）。
+"""
+
+import os
+import threading
+import time
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+# 等锁的最长时间，秒；超时抛出 LockError，由调用方决定稍后重试还是报错，不会不加锁就读写
+LOCK_TIMEOUT = 10.0
+_RETRY_INTERVAL = 0.05
+
+
+class LockError(OSError):
+    """在 LOCK_TIMEOUT 内没拿到锁（被其它进程占着），或锁文件打不开。"""
+
+
+def _try_lock(f) -> bool:
+    try:
+        if msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(f) -> None:
+    if msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class FileLock:
+    """
+    with FileLock(path): ...
+    锁文件本身没有内容，用完不删除（删除会和其它进程的加锁产生竞争）。
+    """
+
+    def __init__(self, path: str, timeout: float = LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._thread_lock = threading.RLock()
+        self._file = None
+        self._depth = 0
+
+    def acquire(self) -> bool:
+        """
+        成功返回 True；超时返回 False；锁文件打不开时抛出 OSError。
+        后两种情况下仍持有线程锁，需要照常 release。
+        """
+        self._thread_lock.acquire()
+        self._depth += 1
+        if self._depth > 1:
+            return True
+        f = open(self.path, "a+b")
+        deadline = time.monotonic() + self.timeout
+        while not _try_lock(f):
+            if time.monotonic() >= deadline:
+                f.close()
+                return False
+            time.sleep(_RETRY_INTERVAL)
+        self._file = f
+        return True
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            try:
+                _unlock(self._file)
+            except OSError:
+                pass
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        try:
+            locked = self.acquire()
+        except OSError as e:
+            # 例如数据目录已被删除；与“被其它进程锁住”不同，不用等待
+            self.release()
+            raise LockError(f"Cannot open lock file {self.path}: {e}") from e
+        if not locked:
+            self.release()
+            raise LockError(f"Data file is locked by another process ({self.path})")
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def file_signature(path: str) -> tuple[int, int] | None:
+    """(mtime_ns, size)，文件不存在返回 None；用来廉价地判断文件是否被改过。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
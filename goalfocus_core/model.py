@@ -0,0 +1,314 @@
+import copy
+import sys
+import time
+import uuid
+from collections.abc import MutableMapping
+from functools import lru_cache
+
+# 磁盘上的时间格式（本地时间），与 storage.now_str 一致
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# "YYYY-MM-DD HH" -> 该小时整点的 epoch 秒；None 表示这一小时在本地时间里不存在（夏令时跳过的时段）
+_hour_base_cache: dict[str, int | None] = {}
+
+
+def _hour_base(key: str) -> int | None:
+    base = _hour_base_cache.get(key, 0)
+    if base != 0:
+        return base
+    try:
+        t = time.strptime(key, "%Y-%m-%d %H")
+        base = int(time.mktime(t))
+        if time.strftime("%Y-%m-%d %H", time.localtime(base)) != key:
+            base = None
+    except (ValueError, OverflowError):
+        base = None
+    _hour_base_cache[key] = base
+    return base
+
+
+def parse_ts(value):
+    """
+    "YYYY-MM-DD HH:MM:SS" -> epoch 秒（int）。
+    同一小时的 UTC 偏移不变，所以按小时缓存整点值，之后只做整数加法；
+    无法无损还原的值（格式不符、夏令时跳过的时段）原样保留字符串。
+    """
+    if not isinstance(value, str):
+        return value
+    if len(value) != 19 or value[13] != ":" or value[16] != ":":
+        return value
+    base = _hour_base(value[:13])
+    if base is None:
+        return value
+    try:
+        minute = int(value[14:16])
+        second = int(value[17:19])
+    except ValueError:
+        return value
+    if minute > 59 or second > 59:
+        return value
+    return base + minute * 60 + second
+
+
+@lru_cache(maxsize=4096)
+def _format_epoch(ts: int) -> str:
+    return time.strftime(TIME_FORMAT, time.localtime(ts))
+
+
+def format_ts(value):
+    """parse_ts 的逆运算：int -> 字符串；None 和保留下来的字符串原样返回。"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return _format_epoch(value)
+    return value
+
+
+def intern_str(value):
+    # 长期目标文字、模板里的动作文字等在成千上万张归档卡片里重复出现，只保留一份
+    return sys.intern(value) if type(value) is str else value
+
+
+def json_default(obj):
+    """json.dumps 的 default 钩子：领域对象按原 JSON 结构输出。"""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class Record(MutableMapping):
+    """
+    领域对象的基类：字段存在 __slots__ 里，时间字段存 epoch 秒。
+    - 属性访问（goal.created_at）得到紧凑表示；
+    - 按 key 访问（goal["created_at"]、goal.get(...)）得到与 JSON 完全一致的值，
+      界面和存储层原来按 dict 写的代码无需改动；
+    - 不认识的字段放在 _extra 里，原样写回，保证与磁盘格式互转无损。
+    """
+
+    __slots__ = ("_extra",)
+
+    FIELDS: tuple[str, ...] = ()
+    TIME_FIELDS: frozenset = frozenset()
+    INTERNED: frozenset = frozenset()
+
+    def __init__(self, data: dict | None = None):
+        self._extra = None
+        data = data or {}
+        for key in self.FIELDS:
+            if key in data:
+                self[key] = data[key]
+            else:
+                object.__setattr__(self, key, self._default(key))
+        for key, value in data.items():
+            if key not in self.FIELDS:
+                self[key] = value
+
+    @classmethod
+    def coerce(cls, value):
+        """dict -> 领域对象；已经是该类型的对象、None 原样返回。"""
+        if value is None or isinstance(value, cls):
+            return value
+        return cls(value)
+
+    def _default(self, key: str):
+        if key == "id":
+            return str(uuid.uuid4())
+        if key == "created_at":
+            return int(time.time())
+        return None
+
+    def _convert(self, key: str, value):
+        if key in self.TIME_FIELDS:
+            return parse_ts(value)
+        if key in self.INTERNED:
+            return intern_str(value)
+        return value
+
+    # ---------- dict 兼容接口 ----------
+    def __getitem__(self, key: str):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            return format_ts(value) if key in self.TIME_FIELDS else value
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key in self.FIELDS:
+            object.__setattr__(self, key, self._convert(key, value))
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in self.FIELDS:
+            raise KeyError(f"{key} 是固定字段，不能删除")
+        if self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        del self._extra[key]
+        if not self._extra:
+            self._extra = None
+
+    def __contains__(self, key) -> bool:
+        return key in self.FIELDS or (self._extra is not None and key in self._extra)
+
+    def __iter__(self):
+        yield from self.FIELDS
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return len(self.FIELDS) + (len(self._extra) if self._extra is not None else 0)
+
+    # 领域对象是实体：按身份比较，list.remove / index 不会逐字段比较整条记录
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> dict:
+        d = {key: self[key] for key in self.FIELDS}
+        if self._extra is not None:
+            d.update(self._extra)
+        return d
+
+    def clone(self):
+        """深拷贝：直接复制槽位里的紧凑值，不经过时间字段的格式化与解析。"""
+        new = object.__new__(type(self))
+        for key in self.FIELDS:
+            object.__setattr__(new, key, _clone_value(getattr(self, key)))
+        new._extra = copy.deepcopy(self._extra)
+        return new
+
+
+def _clone_value(value):
+    if isinstance(value, Record):
+        return value.clone()
+    if isinstance(value, list):
+        return [_clone_value(v) for v in value]
+    return value
+
+
+def goal_long_term_ids(goal: dict) -> list[str]:
+    """卡片/模板关联的长期目标 id，兼容只有 long_term_goal_id 的旧数据。"""
+    lt_ids = goal.get("long_term_goal_ids") or []
+    if not lt_ids and goal.get("long_term_goal_id"):
+        lt_ids = [goal["long_term_goal_id"]]
+    return lt_ids
+
+
+def _long_term_ids_default(rec) -> list[str]:
+    return [rec.long_term_goal_id] if rec.long_term_goal_id else []
+
+
+class Action(Record):
+    __slots__ = ("id", "text", "done", "created_at", "completed_at")
+
+    FIELDS = __slots__
+    TIME_FIELDS = frozenset(("created_at", "completed_at"))
+    INTERNED = frozenset(("text",))
+
+    def _default(self, key: str):
+        if key == "text":
+            return ""
+        if key == "done":
+            return False
+        return super()._default(key)
+
+
+class Goal(Record):
+    __slots__ = (
+        "id",
+        "long_term",
+        "long_term_goal_id",
+        "long_term_goal_ids",
+        "current_goal",
+        "done",
+        "created_at",
+        "completed_at",
+        "actions",
+    )
+
+    FIELDS = __slots__
+    TIME_FIELDS = frozenset(("created_at", "completed_at"))
+    INTERNED = frozenset(("long_term", "long_term_goal_id", "current_goal"))
+
+    def __init__(self, data: dict | None = None):
+        super().__init__(data)
+        if not self.long_term_goal_ids and self.long_term_goal_id:
+            self.long_term_goal_ids = _long_term_ids_default(self)
+
+    def _default(self, key: str):
+        if key in ("long_term", "current_goal"):
+            return ""
+        if key in ("long_term_goal_ids", "actions"):
+            return []
+        if key == "done":
+            return False
+        return super()._default(key)
+
+    def _convert(self, key: str, value):
+        if key == "actions":
+            return [Action.coerce(a) for a in value or []]
+        if key == "long_term_goal_ids":
+            return [intern_str(x) for x in value or []]
+        return super()._convert(key, value)
+
+
+class LongTermGoal(Record):
+    __slots__ = ("id", "title", "target_count", "completed_count", "created_at", "completed_at")
+
+    FIELDS = __slots__
+    TIME_FIELDS = frozenset(("created_at", "completed_at"))
+
+    def _default(self, key: str):
+        if key == "title":
+            return ""
+        if key == "target_count":
+            return 100
+        if key == "completed_count":
+            return 0
+        return super()._default(key)
+
+
+class Template(Record):
+    __slots__ = (
+        "id",
+        "name",
+        "long_term_text",
+        "long_term_goal_id",
+        "long_term_goal_ids",
+        "current_goal",
+        "actions_texts",
+        "created_at",
+    )
+
+    FIELDS = __slots__
+    TIME_FIELDS = frozenset(("created_at",))
+    INTERNED = frozenset(("long_term_text", "long_term_goal_id", "current_goal"))
+
+    def __init__(self, data: dict | None = None):
+        super().__init__(data)
+        if not self.long_term_goal_ids and self.long_term_goal_id:
+            self.long_term_goal_ids = _long_term_ids_default(self)
+
+    def _default(self, key: str):
+        if key in ("name", "long_term_text", "current_goal"):
+            return ""
+        if key in ("long_term_goal_ids", "actions_texts"):
+            return []
+        return super()._default(key)
+
+    def _convert(self, key: str, value):
+        if key in ("long_term_goal_ids", "actions_texts"):
+            return [intern_str(x) for x in value or []]
+        return super()._convert(key, value)
+
+
+# 各列表对应的领域类型，供日志重放和存储引擎把读到的 dict 转成对象
+COLLECTION_TYPES = {
+    "active_goals": Goal,
+    "archive": Goal,
+    "long_term_goals": LongTermGoal,
+    "templates": Template,
+}
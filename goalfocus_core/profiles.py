@@ -0,0 +1,140 @@
+"""
+数据目录与档案（profile）。
+
+数据放在每个用户固定的目录里，与程序从哪里启动无关：
+    Windows  %APPDATA%\\GoalFocus
+    macOS    ~/Library/Application Support/GoalFocus
+    其它     $XDG_DATA_HOME/goalfocus（默认 ~/.local/share/goalfocus）
+环境变量 GOALFOCUS_DATA_DIR 可以指定其它目录（便携版、测试）。
+
+默认档案直接使用数据目录本身，其它档案各占 profiles/<名称>/ 一个子目录，
+里面的文件与默认档案完全相同（goals_data.json、日志、SQLite 数据库等）。
+当前档案记在 profiles.json 里，桌面程序和命令行共用。
+"""
+
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+from goalfocus_core.errors import GoalError
+from goalfocus_core.sqlite_store import SQLITE_FILE
+from goalfocus_core.storage import DATA_FILE, JOURNAL_SUFFIX, atomic_write_bytes
+
+DEFAULT_PROFILE = "default"
+PROFILES_FILE = "profiles.json"
+PROFILES_DIR = "profiles"
+# 删除的档案移到这里保留，不直接删文件
+TRASH_DIR = "trash"
+
+# 旧版把数据文件放在程序所在目录；第一次运行时从那里复制到数据目录
+_LEGACY_SUFFIXES = ("", JOURNAL_SUFFIX)
+_SQLITE_SUFFIXES = ("", "-wal")
+
+
+def data_root() -> str:
+    root = os.environ.get("GOALFOCUS_DATA_DIR")
+    if root:
+        return os.path.abspath(root)
+    if sys.platform == "win32":
+        return os.path.join(os.environ.get("APPDATA") or os.path.expanduser("~"), "GoalFocus")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Application Support/GoalFocus")
+    base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "goalfocus")
+
+
+def _legacy_dirs() -> list[str]:
+    # 只看程序自己的目录：当前目录可能是任意位置，不能把那里碰巧同名的文件当成旧数据
+    return [os.path.dirname(os.path.abspath(sys.argv[0]))]
+
+
+class ProfileManager:
+    """档案的列出、新建、删除和切换；切换只改 profiles.json，数据的重新加载由调用方负责。"""
+
+    def __init__(self, root: str | None = None):
+        self.root = root or data_root()
+        os.makedirs(self.root, exist_ok=True)
+        self._migrate_legacy()
+
+    # ---------- 查询 ----------
+    def names(self) -> list[str]:
+        profiles_dir = os.path.join(self.root, PROFILES_DIR)
+        try:
+            others = sorted(
+                name for name in os.listdir(profiles_dir) if os.path.isdir(os.path.join(profiles_dir, name))
+            )
+        except OSError:
+            others = []
+        return [DEFAULT_PROFILE] + others
+
+    @property
+    def current(self) -> str:
+        try:
+            with open(os.path.join(self.root, PROFILES_FILE), "r", encoding="utf-8") as f:
+                name = json.load(f).get("current")
+        except (OSError, ValueError, AttributeError):
+            return DEFAULT_PROFILE
+        return name if name in self.names() else DEFAULT_PROFILE
+
+    def directory(self, name: str | None = None) -> str:
+        name = self.current if name is None else name
+        if name == DEFAULT_PROFILE:
+            return self.root
+        return os.path.join(self.root, PROFILES_DIR, name)
+
+    # ---------- 修改 ----------
+    def create(self, name: str) -> str:
+        name = (name or "").strip()
+        if not name:
+            raise GoalError("名称为空", "请输入档案名称。", "warning")
+        if name in (".", "..") or any(c in name for c in '\\/:*?"<>|'):
+            raise GoalError("名称无效", f"档案名称不能包含 \\ / : * ? \" < > | 等字符：{name}", "warning")
+        if name in self.names():
+            raise GoalError("档案已存在", f"已经有名为「{name}」的档案。", "warning")
+        os.makedirs(self.directory(name))
+        return name
+
+    def delete(self, name: str) -> str:
+        """把档案目录移到 trash/ 下保留，返回移动后的路径。默认档案和当前档案不能删除。"""
+        if name == DEFAULT_PROFILE:
+            raise GoalError("不能删除", "默认档案不能删除。", "warning")
+        if name == self.current:
+            raise GoalError("不能删除", "请先切换到其它档案，再删除这个档案。", "warning")
+        if name not in self.names():
+            raise GoalError("没有档案", f"没有名为「{name}」的档案。")
+        trash = os.path.join(self.root, TRASH_DIR)
+        os.makedirs(trash, exist_ok=True)
+        target = os.path.join(trash, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        try:
+            os.replace(self.directory(name), target)
+        except OSError as e:
+            # 例如另一个程序正开着这个档案（Windows 上打开的文件所在目录不能移动）
+            raise GoalError("删除失败", f"无法移动档案「{name}」的文件：{e}", "warning")
+        return target
+
+    def set_current(self, name: str) -> None:
+        if name not in self.names():
+            raise GoalError("没有档案", f"没有名为「{name}」的档案。")
+        data = json.dumps({"current": name}, ensure_ascii=False, indent=2).encode("utf-8")
+        atomic_write_bytes(os.path.join(self.root, PROFILES_FILE), data)
+
+    # ---------- 旧版数据 ----------
+    def _migrate_legacy(self) -> None:
+        """数据目录里还没有数据时，把旧版放在程序目录里的数据复制过来；原文件保留。"""
+        files = [(DATA_FILE, _LEGACY_SUFFIXES), (SQLITE_FILE, _SQLITE_SUFFIXES)]
+        if any(os.path.exists(os.path.join(self.root, name)) for name, _ in files):
+            return
+        for legacy in _legacy_dirs():
+            if legacy == os.path.abspath(self.root):
+                continue
+            if not any(os.path.exists(os.path.join(legacy, name)) for name, _ in files):
+                continue
+            for name, suffixes in files:
+                for suffix in suffixes:
+                    src = os.path.join(legacy, name + suffix)
+                    if os.path.exists(src):
+                        shutil.copy2(src, os.path.join(self.root, name + suffix))
+            print(f"GoalFocus: copied data from {legacy} to {self.root}", file=sys.stderr)
+            return
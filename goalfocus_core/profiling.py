@@ -0,0 +1,178 @@
+"""
+可选的性能埋点。设置环境变量 GOALFOCUS_TRACE（值为输出文件路径，或 1 使用默认文件名），
+或用 --trace[=路径] 启动后，记录各热点路径的耗时和内存分配变化，
+退出时写成 Chrome trace-event JSON，可在 chrome://tracing 或 https://ui.perfetto.dev 中打开。
+
+未启用时 span() / traced() 只多一次属性判断。
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+DEFAULT_TRACE_FILE = "goalfocus_trace.json"
+# 每个 span 名称保留最近多少次用于汇总
+SUMMARY_WINDOW = 200
+# trace 里最多保留多少个事件（约几十 MB）；长时间开着埋点时只保留最近的，内存不会一直增长
+MAX_EVENTS = 200_000
+
+
+class Tracer:
+    def __init__(self, max_events: int = MAX_EVENTS):
+        self.enabled = False
+        self.path: str | None = None
+        self._t0 = time.perf_counter()
+        self._events: deque[dict] = deque(maxlen=max_events)
+        self._recent: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def enable(self, path: str | None = None, allocations: bool = True) -> None:
+        if self.enabled:
+            return
+        self.enabled = True
+        self.path = path or DEFAULT_TRACE_FILE
+        if allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        atexit.register(self.write)
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._t0) * 1e6
+
+    def _add(self, name: str, start_us: float, dur_us: float, alloc: int | None, args: dict) -> None:
+        if alloc is not None:
+            args["alloc_kb"] = round(alloc / 1024, 1)
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": round(start_us, 1),
+            "dur": round(dur_us, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self._lock:
+            self._events.append(event)
+            recent = self._recent.get(name)
+            if recent is None:
+                recent = self._recent[name] = deque(maxlen=SUMMARY_WINDOW)
+            recent.append((dur_us / 1000, alloc))
+
+    @contextmanager
+    def span(self, name: str, **args):
+        """
+        记录一段代码的耗时；args 原样写进 trace（例如批大小）。
+        内存变化是整个进程的已分配字节数之差，其它线程同时分配的内存也会算进去。
+        """
+        if not self.enabled:
+            yield
+            return
+        tracing = tracemalloc.is_tracing()
+        mem0 = tracemalloc.get_traced_memory()[0] if tracing else None
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            dur = self._now_us() - start
+            alloc = tracemalloc.get_traced_memory()[0] - mem0 if tracing else None
+            self._add(name, start, dur, alloc, args)
+
+    def traced(self, name: str | None = None):
+        """装饰器版的 span，默认用函数的 __qualname__ 作为名称。"""
+
+        def decorate(func):
+            label = name or func.__qualname__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(label):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorate
+
+    def instant(self, name: str, **args) -> None:
+        """打一个时间点（例如首帧绘制），在时间线上显示为竖线。"""
+        if not self.enabled:
+            return
+        event = {
+            "name": name,
+            "ph": "i",
+            "s": "p",
+            "ts": round(self._now_us(), 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self._lock:
+            self._events.append(event)
+
+    def summary(self) -> list[dict]:
+        """每个 span 最近 SUMMARY_WINDOW 次的统计，按平均耗时从高到低。"""
+        with self._lock:
+            items = [(name, list(recent)) for name, recent in self._recent.items()]
+        rows = []
+        for name, samples in items:
+            times = sorted(ms for ms, _ in samples)
+            allocs = [a for _, a in samples if a is not None]
+            rows.append(
+                {
+                    "name": name,
+                    "count": len(times),
+                    "mean_ms": sum(times) / len(times),
+                    "p95_ms": times[min(int(len(times) * 0.95), len(times) - 1)],
+                    "max_ms": times[-1],
+                    "last_ms": samples[-1][0],
+                    "alloc_kb": sum(allocs) / len(allocs) / 1024 if allocs else None,
+                }
+            )
+        rows.sort(key=lambda r: r["mean_ms"], reverse=True)
+        return rows
+
+    def write(self, path: str | None = None) -> str | None:
+        """把已记录的（最近 MAX_EVENTS 个）事件写成 Chrome trace-event JSON，返回文件路径。"""
+        path = path or self.path
+        if not path:
+            return None
+        with self._lock:
+            events = list(self._events)
+        data = {"traceEvents": events, "displayTimeUnit": "ms"}
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"Failed to write trace {path}: {e}", file=sys.stderr)
+            return None
+        return path
+
+
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+
+
+def configure(argv: list[str]) -> list[str]:
+    """
+    根据 GOALFOCUS_TRACE 或 --trace[=路径] 启用埋点，返回去掉 --trace 之后的参数列表。
+    """
+    path = os.environ.get("GOALFOCUS_TRACE")
+    rest = []
+    for arg in argv:
+        if arg == "--trace":
+            path = path or "1"
+        elif arg.startswith("--trace="):
+            path = arg.split("=", 1)[1]
+        else:
+            rest.append(arg)
+    if path:
+        tracer.enable(None if path == "1" else path)
+    return rest
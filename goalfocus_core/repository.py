@@ -0,0 +1,403 @@
+from goalfocus_core.model import Action, Goal, LongTermGoal, Template
+from goalfocus_core.search import ArchiveSearchIndex
+from goalfocus_core.stats import ArchiveStats
+from goalfocus_core.storage import finalize_store, goal_long_term_ids
+
+
+class Repository:
+    """
+    store 的访问层：所有按 id 的查找都走字典索引，所有增删、重排都经过这里，
+    保证索引与 store 中的列表同步。
+    - 长期目标、模板、进行中的卡片及其关键动作：启动时建索引（数量都很少）；
+    - 归档：id 索引和“长期目标 -> 归档卡片”反向索引在第一次用到时才建立，
+      之后随插入/删除增量维护；SqliteArchive 直接用数据库索引，不在内存里建。
+    新增的项可以传 dict，进 store 之前统一转成 model 里的领域对象，add_* 返回该对象。
+    归档的全文索引（search）和统计聚合（stats）也在这里随增删同步更新；
+    已有归档由 begin_archive_indexes / archive_indexes_step 一次遍历分批喂给两者。
+    存储引擎保存了统计时（SqliteArchive / ShardedArchive 的 load_stats），stats 直接从保存的结果还原，
+    遍历只建全文索引。
+    """
+
+    def __init__(self, store: dict):
+        self.store = finalize_store(store)
+        self._long_term_goals: dict[str, dict] = {}
+        self._templates: dict[str, dict] = {}
+        self._templates_by_name: dict[str, dict] = {}
+        self._active: dict[str, dict] = {}
+        self._actions: dict[str, dict] = {}
+        self._action_goal: dict[str, dict] = {}
+        self._archive_by_id: dict[str, dict] | None = None
+        self._archive_by_lt: dict[str, set[str]] | None = None
+        self.search = ArchiveSearchIndex()
+        self.stats = ArchiveStats()
+        # stats 是否来自存储引擎保存的结果（是的话建索引的遍历不再累加统计）
+        self._stats_saved = False
+        self._index_iter = None
+        # 遍历的是 (id, 词项, 完成时间) 而不是卡片本身（见 begin_archive_indexes）
+        self._index_docs = False
+        # 建索引期间被删除的卡片，防止遍历快照时又被加回来
+        self._index_removed: set[str] = set()
+        self.archive_indexes_ready = False
+        # 表头排序的结果：(字段, 是否降序) -> 卡片 id，归档有增删时清空
+        self._archive_order: dict[tuple[str, bool], list[str]] = {}
+        self.rebuild()
+
+    def rebuild(self):
+        """store 被整体替换（例如重新加载）后调用。"""
+        self._long_term_goals = {g["id"]: g for g in self.store["long_term_goals"]}
+        self._templates = {t["id"]: t for t in self.store["templates"]}
+        # 同名模板（旧数据里可能有）以列表中靠前的为准
+        self._templates_by_name = {}
+        for t in reversed(self.store["templates"]):
+            self._templates_by_name[self._name_key(t.get("name"))] = t
+        self._reindex_active()
+        self._archive_by_id = None
+        self._archive_by_lt = None
+        self._archive_order = {}
+        self.search = ArchiveSearchIndex()
+        self._load_stats()
+        self._index_iter = None
+        self.archive_indexes_ready = False
+
+    # ---------- 长期目标 ----------
+    def long_term_goals(self) -> list[dict]:
+        return self.store["long_term_goals"]
+
+    def long_term_goal(self, goal_id: str | None) -> dict | None:
+        if not goal_id:
+            return None
+        return self._long_term_goals.get(goal_id)
+
+    def add_long_term_goal(self, g: dict, index: int = 0) -> LongTermGoal:
+        g = LongTermGoal.coerce(g)
+        self.store["long_term_goals"].insert(index, g)
+        self._long_term_goals[g["id"]] = g
+        return g
+
+    def remove_long_term_goal(self, goal_id: str) -> dict | None:
+        g = self._long_term_goals.pop(goal_id, None)
+        if g is not None:
+            self.store["long_term_goals"].remove(g)
+        return g
+
+    # ---------- 模板 ----------
+    def templates(self) -> list[dict]:
+        return self.store["templates"]
+
+    def template(self, template_id: str | None) -> dict | None:
+        if not template_id:
+            return None
+        return self._templates.get(template_id)
+
+    @staticmethod
+    def _name_key(name: str | None) -> str:
+        return (name or "").strip()
+
+    def template_named(self, name: str | None) -> dict | None:
+        return self._templates_by_name.get(self._name_key(name))
+
+    def add_template(self, t: dict, index: int = 0) -> Template:
+        t = Template.coerce(t)
+        self.store["templates"].insert(index, t)
+        self._templates[t["id"]] = t
+        self._templates_by_name.setdefault(self._name_key(t.get("name")), t)
+        return t
+
+    def remove_template(self, template_id: str) -> dict | None:
+        t = self._templates.pop(template_id, None)
+        if t is not None:
+            self.store["templates"].remove(t)
+            key = self._name_key(t.get("name"))
+            if self._templates_by_name.get(key) is t:
+                del self._templates_by_name[key]
+                for other in self.store["templates"]:
+                    if self._name_key(other.get("name")) == key:
+                        self._templates_by_name[key] = other
+                        break
+        return t
+
+    # ---------- 进行中的卡片与关键动作 ----------
+    def active_goals(self) -> list[dict]:
+        """进行中的卡片，按创建顺序。"""
+        return self.store["active_goals"]
+
+    def active_goal(self, goal_id: str | None) -> dict | None:
+        if not goal_id:
+            return None
+        return self._active.get(goal_id)
+
+    def add_active_goal(self, goal: dict, index: int | None = None) -> Goal:
+        goal = Goal.coerce(goal)
+        goals = self.store["active_goals"]
+        goals.insert(len(goals) if index is None else index, goal)
+        self._index_active_goal(goal)
+        return goal
+
+    def remove_active_goal(self, goal_id: str) -> dict | None:
+        goal = self._active.pop(goal_id, None)
+        if goal is not None:
+            self.store["active_goals"].remove(goal)
+            for a in goal["actions"]:
+                self._actions.pop(a["id"], None)
+                self._action_goal.pop(a["id"], None)
+        return goal
+
+    def _index_active_goal(self, goal: dict):
+        self._active[goal["id"]] = goal
+        for a in goal["actions"]:
+            self._actions[a["id"]] = a
+            self._action_goal[a["id"]] = goal
+
+    def _reindex_active(self):
+        self._active = {}
+        self._actions = {}
+        self._action_goal = {}
+        for goal in self.store["active_goals"]:
+            self._index_active_goal(goal)
+
+    def action(self, action_id: str | None) -> dict | None:
+        if not action_id:
+            return None
+        return self._actions.get(action_id)
+
+    def action_goal(self, action_id: str | None) -> dict | None:
+        """关键动作所属的进行中卡片。"""
+        if not action_id:
+            return None
+        return self._action_goal.get(action_id)
+
+    def add_action(self, goal_id: str, action: dict, index: int | None = None) -> Action:
+        goal = self._active[goal_id]
+        action = Action.coerce(action)
+        actions = goal["actions"]
+        actions.insert(len(actions) if index is None else index, action)
+        self._actions[action["id"]] = action
+        self._action_goal[action["id"]] = goal
+        return action
+
+    def action_index(self, action_id: str) -> int:
+        """关键动作在所属卡片中的下标，找不到返回 -1。"""
+        goal = self._action_goal.get(action_id)
+        if goal is None:
+            return -1
+        return goal["actions"].index(self._actions[action_id])
+
+    def remove_action(self, action_id: str) -> dict | None:
+        action = self._actions.pop(action_id, None)
+        goal = self._action_goal.pop(action_id, None)
+        if action is not None and goal is not None:
+            goal["actions"].remove(action)
+        return action
+
+    def reorder_actions(self, goal_id: str, ordered_ids: list[str]):
+        """按给定顺序重排；未出现在 ordered_ids 里的动作保持原顺序排在最后。"""
+        goal = self._active[goal_id]
+        seen = set()
+        new_actions = []
+        for aid in ordered_ids:
+            a = self._actions.get(aid)
+            if a is not None and aid not in seen and self._action_goal.get(aid) is goal:
+                new_actions.append(a)
+                seen.add(aid)
+        for a in goal["actions"]:
+            if a["id"] not in seen:
+                new_actions.append(a)
+        goal["actions"] = new_actions
+
+    # ---------- 归档 ----------
+    def archive(self):
+        return self.store["archive"]
+
+    def _ensure_archive_index(self):
+        if self._archive_by_id is not None:
+            return
+        self._archive_by_id = {}
+        self._archive_by_lt = {}
+        for g in self.store["archive"]:
+            self._index_archive_goal(g)
+
+    def _index_archive_goal(self, g: dict):
+        self._archive_by_id[g["id"]] = g
+        for lt_id in goal_long_term_ids(g):
+            self._archive_by_lt.setdefault(lt_id, set()).add(g["id"])
+
+    def _unindex_archive_goal(self, g: dict):
+        self._archive_by_id.pop(g["id"], None)
+        for lt_id in goal_long_term_ids(g):
+            ids = self._archive_by_lt.get(lt_id)
+            if ids is not None:
+                ids.discard(g["id"])
+
+    def _load_stats(self) -> None:
+        load_stats = getattr(self.store["archive"], "load_stats", None)
+        stats = load_stats() if load_stats is not None else None
+        self._stats_saved = stats is not None
+        self.stats = stats if stats is not None else ArchiveStats()
+
+    def _archive_is_lazy(self) -> bool:
+        # SqliteArchive / ShardedArchive 自带 find / ids_for_long_term_goal，由数据库索引或按分片查找
+        return hasattr(self.store["archive"], "ids_for_long_term_goal")
+
+    def archive_goal(self, goal_id: str | None) -> dict | None:
+        if not goal_id:
+            return None
+        if self._archive_is_lazy():
+            return self.store["archive"].find(goal_id)
+        self._ensure_archive_index()
+        return self._archive_by_id.get(goal_id)
+
+    def archive_ids_for_long_term_goal(self, lt_id: str) -> set[str]:
+        if self._archive_is_lazy():
+            return set(self.store["archive"].ids_for_long_term_goal(lt_id))
+        self._ensure_archive_index()
+        return set(self._archive_by_lt.get(lt_id, ()))
+
+    def archive_index(self, goal_id: str) -> int:
+        """归档卡片的下标，找不到返回 -1。"""
+        archive = self.store["archive"]
+        if self._archive_is_lazy():
+            if goal_id in self._active:
+                # 进行中的卡片不会同时在归档里；分片归档要证明“不存在”得读遍所有分片
+                return -1
+            return archive.index_of(goal_id)
+        g = self.archive_goal(goal_id)
+        if g is None:
+            return -1
+        # 领域对象按身份比较，list.index 在 C 层逐个比指针
+        return archive.index(g)
+
+    def sorted_archive_ids(self, field: str, descending: bool = False, ids: list[str] | None = None) -> list[str]:
+        """
+        按 field 排序的归档卡片 id（表头排序用），值相同的保持原来的先后。
+        ids 为 None 时排整个归档：SqliteArchive 交给 ORDER BY，列表 / 分片归档读一遍排好后缓存到下次增删；
+        否则只排给定的 id（搜索结果）。
+        """
+        if ids is not None:
+            keys = {gid: (self.archive_goal(gid) or {}).get(field) or "" for gid in ids}
+            return sorted(ids, key=keys.__getitem__, reverse=descending)
+        order = self._archive_order.get((field, descending))
+        if order is not None:
+            return order
+        archive = self.store["archive"]
+        sorted_ids = getattr(archive, "sorted_ids", None)
+        if sorted_ids is not None:
+            order = sorted_ids(field, descending)
+        else:
+            keys = [(g.get(field) or "", g["id"]) for g in archive]
+            keys.sort(key=lambda k: k[0], reverse=descending)
+            order = [gid for _, gid in keys]
+        self._archive_order[(field, descending)] = order
+        return order
+
+    def add_archive_goal(self, goal: dict, index: int = 0) -> Goal:
+        goal = Goal.coerce(goal)
+        self.store["archive"].insert(index, goal)
+        if self._archive_by_id is not None:
+            self._index_archive_goal(goal)
+        self._archive_order.clear()
+        self.search.add(goal)
+        self.stats.add(goal)
+        return goal
+
+    def remove_archive_goal_at(self, index: int) -> dict:
+        archive = self.store["archive"]
+        g = archive[index]
+        del archive[index]
+        if self._archive_by_id is not None:
+            self._unindex_archive_goal(g)
+        self._archive_order.clear()
+        self.search.remove(g["id"])
+        self.stats.remove(g)
+        if self._index_iter is not None:
+            self._index_removed.add(g["id"])
+        return g
+
+    # ---------- 按集合名的通用操作（撤销/重做用） ----------
+    def find_item(self, coll: str, item_id: str) -> tuple[int, dict] | None:
+        """(下标, 对象)，找不到返回 None。"""
+        if coll == "archive":
+            index = self.archive_index(item_id)
+            return (index, self.store["archive"][index]) if index >= 0 else None
+        item = {
+            "active_goals": self.active_goal,
+            "long_term_goals": self.long_term_goal,
+            "templates": self.template,
+        }[coll](item_id)
+        if item is None:
+            return None
+        return self.store[coll].index(item), item
+
+    def insert_item(self, coll: str, item: dict, index: int):
+        if coll == "archive":
+            return self.add_archive_goal(item, index)
+        if coll == "active_goals":
+            return self.add_active_goal(item, index)
+        if coll == "long_term_goals":
+            return self.add_long_term_goal(item, index)
+        return self.add_template(item, index)
+
+    def remove_item(self, coll: str, item_id: str) -> dict | None:
+        if coll == "archive":
+            index = self.archive_index(item_id)
+            return self.remove_archive_goal_at(index) if index >= 0 else None
+        return {
+            "active_goals": self.remove_active_goal,
+            "long_term_goals": self.remove_long_term_goal,
+            "templates": self.remove_template,
+        }[coll](item_id)
+
+    # ---------- 归档全文检索与统计 ----------
+    def begin_archive_indexes(self):
+        """开始为现有归档建全文索引和统计；之后反复调用 archive_indexes_step 直到返回 True。"""
+        archive = self.store["archive"]
+        search_docs = getattr(archive, "search_docs", None)
+        if search_docs is not None and self._stats_saved:
+            # ShardedArchive：只读各分片保存的检索词项，不读分片、不切词
+            self._index_iter = search_docs()
+            self._index_docs = True
+        else:
+            # 内存列表先拍快照，建索引期间的增删不会打乱遍历；SqliteArchive 按 seq 游标遍历本身就是稳定的
+            self._index_iter = iter(archive if self._archive_is_lazy() else list(archive))
+            self._index_docs = False
+        self._index_removed = set()
+        self.archive_indexes_ready = False
+
+    def archive_indexes_step(self, budget: int = 2000) -> bool:
+        """最多处理 budget 张卡片；全部完成返回 True。search.add / stats.add 对同一张卡片是幂等的。"""
+        if self._index_iter is None:
+            return self.archive_indexes_ready
+        for _ in range(budget):
+            item = next(self._index_iter, None)
+            if item is None:
+                self._index_iter = None
+                self._index_removed = set()
+                self.archive_indexes_ready = True
+                return True
+            if self._index_docs:
+                goal_id, weights, recency = item
+                if goal_id not in self._index_removed:
+                    self.search.add_terms(goal_id, weights, recency)
+            elif item["id"] not in self._index_removed:
+                self.search.add(item)
+                if not self._stats_saved:
+                    self.stats.add(item)
+        return False
+
+    def ensure_archive_indexes(self):
+        """需要立即用到结果时，把还没建完的部分同步建完。"""
+        if self.archive_indexes_ready:
+            return
+        if self._index_iter is None:
+            self.begin_archive_indexes()
+        while not self.archive_indexes_step(10000):
+            pass
+
+    @property
+    def stats_ready(self) -> bool:
+        """stats 是否已经覆盖整个归档：从保存的结果还原的立即可用，否则要等建索引的遍历结束。"""
+        return self._stats_saved or self.archive_indexes_ready
+
+    def search_archive(self, query: str, limit: int | None = None) -> list[str]:
+        """按相关度排序的归档卡片 id。"""
+        self.ensure_archive_indexes()
+        return self.search.search(query, limit)
@@ -0,0 +1,190 @@
+import bisect
+import math
+import re
+from operator import itemgetter
+
+from goalfocus_core.model import Record, parse_ts
+
+# 中日韩统一表意文字（含扩展 A 区和兼容区）
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_RE = re.compile(f"[{_CJK}]+|[^\\W_{_CJK}]+")
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+# 字段权重：当下目标最能代表一张卡片，时间只用于“按日期找”
+FIELD_WEIGHTS = (
+    ("current_goal", 3.0),
+    ("long_term", 2.0),
+    ("actions", 1.0),
+    ("completed_at", 0.5),
+    ("created_at", 0.5),
+)
+
+# BM25 里的词频饱和参数；卡片都很短，不做长度归一化
+TF_SATURATION = 1.2
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    中文按相邻两字切分（bigram），同时保留单字，单字查询也能命中；
+    英文、数字按连续字母数字切词并转小写。
+    """
+    tokens = []
+    for run in _TOKEN_RE.findall(text or ""):
+        if _CJK_RE.match(run):
+            tokens.extend(run)
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+def query_terms(text: str) -> list[str]:
+    """查询串 -> 必须全部命中的词项：多字中文只用 bigram（单字太泛），单字中文用单字本身。"""
+    terms = []
+    for run in _TOKEN_RE.findall(text or ""):
+        if _CJK_RE.match(run):
+            if len(run) == 1:
+                terms.append(run)
+            else:
+                terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run.lower())
+    return list(dict.fromkeys(terms))
+
+
+def _saturate(w: float) -> float:
+    return w * (TF_SATURATION + 1.0) / (w + TF_SATURATION)
+
+
+def goal_terms(goal) -> tuple[dict[str, float], int]:
+    """
+    卡片的 (词项 -> 加权词频, 完成时间 epoch 秒)。领域对象和磁盘上的 dict 都可以；
+    分片的 .search.json 保存的就是它，读回来直接交给 ArchiveSearchIndex.add_terms，不用再切词。
+    """
+    weights: dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS:
+        if field == "actions":
+            # 各动作之间用换行隔开，切词时不会跨动作组成 bigram
+            text = "\n".join(a.get("text", "") for a in goal.get("actions") or [])
+        elif field in ("created_at", "completed_at"):
+            # 只取日期部分，时分秒对检索没有意义
+            text = (goal.get(field) or "")[:10]
+        else:
+            text = goal.get(field) or ""
+        for token in tokenize(text):
+            weights[token] = weights.get(token, 0.0) + weight
+    if isinstance(goal, Record):
+        recency = goal.completed_at or goal.created_at
+    else:
+        recency = parse_ts(goal.get("completed_at") or goal.get("created_at"))
+    return weights, recency if isinstance(recency, int) else 0
+
+
+class ArchiveSearchIndex:
+    """
+    归档卡片的内存倒排索引：词项 -> {卡片 id: 饱和后的加权词频}。
+    覆盖长期目标、当下目标、关键动作文字以及创建/完成日期。
+    - 归档新增/删除时由 Repository 增量调用 add / remove，
+      已有归档也由 Repository 分批喂进来（见 archive_indexes_step）；
+    - search 对所有词项取交集，按 BM25 打分，同分时新完成的在前。
+    """
+
+    def __init__(self):
+        self._postings: dict[str, dict[str, float]] = {}
+        # 卡片 id -> 它出现过的词项，删除时据此清理倒排表
+        self._doc_terms: dict[str, tuple[str, ...]] = {}
+        # 卡片 id -> 完成时间（epoch 秒），同分排序用
+        self._recency: dict[str, int] = {}
+        # 英文/数字词表（有序），前缀匹配时用二分查找定位范围（输入到一半的单词也能搜到）
+        self._words: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    # ---------- 增量维护 ----------
+    def add(self, goal) -> None:
+        goal_id = goal.get("id")
+        if goal_id:
+            self.add_terms(goal_id, *goal_terms(goal))
+
+    def add_terms(self, goal_id: str, weights: dict[str, float], recency: int) -> None:
+        """按 goal_terms 的结果加入（或替换）一张卡片。"""
+        if goal_id in self._doc_terms:
+            self.remove(goal_id)
+        postings = self._postings
+        for token, w in weights.items():
+            posting = postings.get(token)
+            if posting is None:
+                posting = postings[token] = {}
+                if not _CJK_RE.match(token):
+                    bisect.insort(self._words, token)
+            posting[goal_id] = _saturate(w)
+        self._doc_terms[goal_id] = tuple(weights)
+        self._recency[goal_id] = recency
+
+    def remove(self, goal_id: str) -> None:
+        terms = self._doc_terms.pop(goal_id, None)
+        self._recency.pop(goal_id, None)
+        if terms is None:
+            return
+        for token in terms:
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(goal_id, None)
+            if not posting:
+                del self._postings[token]
+                if not _CJK_RE.match(token):
+                    i = bisect.bisect_left(self._words, token)
+                    if i < len(self._words) and self._words[i] == token:
+                        del self._words[i]
+
+    # ---------- 查询 ----------
+    def _expand(self, term: str) -> list[str]:
+        if _CJK_RE.match(term):
+            return [term] if term in self._postings else []
+        # 英文/数字：精确词 + 以它开头的词，在有序词表里是连续的一段
+        words = self._words
+        start = bisect.bisect_left(words, term)
+        end = bisect.bisect_left(words, term + "\U0010ffff", start)
+        return words[start:end]
+
+    def search(self, query: str, limit: int | None = None) -> list[str]:
+        """返回按相关度排序的卡片 id；查询为空时返回空列表。"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+        n_docs = max(len(self._doc_terms), 1)
+
+        # 每个查询词项：卡片 id -> 该词项的得分（前缀展开出的多个词取最高分）
+        per_term: list[dict[str, float]] = []
+        for term in terms:
+            scores: dict[str, float] = {}
+            for token in self._expand(term):
+                posting = self._postings[token]
+                idf = math.log(1.0 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                if not scores:
+                    scores = {gid: idf * tf for gid, tf in posting.items()}
+                    continue
+                for gid, tf in posting.items():
+                    s = idf * tf
+                    if s > scores.get(gid, 0.0):
+                        scores[gid] = s
+            if not scores:
+                return []
+            per_term.append(scores)
+
+        # 从最小的候选集开始求交集
+        per_term.sort(key=len)
+        total = dict(per_term[0])
+        for scores in per_term[1:]:
+            total = {gid: s + scores[gid] for gid, s in total.items() if gid in scores}
+            if not total:
+                return []
+
+        # 两次稳定排序：先按完成时间，再按得分，同分的保持新卡片在前
+        ranked = sorted(total.items(), key=lambda item: self._recency.get(item[0], 0), reverse=True)
+        ranked.sort(key=itemgetter(1), reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [gid for gid, _ in ranked]
@@ -0,0 +1,510 @@
+import uuid
+
+from goalfocus_core.errors import GoalError
+from goalfocus_core.history import Command, History
+from goalfocus_core.model import COLLECTION_TYPES, Goal, Record, parse_ts
+from goalfocus_core.profiling import span
+from goalfocus_core.repository import Repository
+from goalfocus_core.shards import ShardedArchive, shard_month
+from goalfocus_core.stats import delete_tokens
+from goalfocus_core.storage import decode_value, goal_long_term_ids, now_str, open_storage
+
+
+def _completed_epoch(goal) -> int:
+    value = goal.completed_at if isinstance(goal, Record) else parse_ts(goal.get("completed_at"))
+    return value if isinstance(value, int) else 0
+
+
+def new_action(text: str) -> dict:
+    return {"id": str(uuid.uuid4()), "text": text, "done": False, "created_at": now_str(), "completed_at": None}
+
+
+def make_goal_from_template(t: dict) -> dict:
+    lt_ids = list(goal_long_term_ids(t))
+    return {
+        "id": str(uuid.uuid4()),
+        "long_term": t.get("long_term_text", ""),
+        "long_term_goal_id": lt_ids[0] if lt_ids else None,
+        "long_term_goal_ids": lt_ids,
+        "current_goal": t.get("current_goal", ""),
+        "actions": [new_action(text) for text in (t.get("actions_texts") or [])],
+        "done": False,
+        "created_at": now_str(),
+        "completed_at": None,
+    }
+
+
+class GoalService:
+    """
+    不依赖 Qt 的业务层：卡片、关键动作、归档、删除机会、模板、长期目标的全部操作。
+    每个操作经 Repository 修改 store 并持久化；规则不允许时抛 GoalError。
+    on_change(changes) 在每次修改后调用（changes 的格式见 storage.make_record），
+    界面据此只刷新受影响的部分。
+
+    autosave=False 时变更先攒着，调用 save() 一次性写入（命令行批处理用）。
+
+    用户操作在修改前调用 _undoable 记下受影响对象的旧状态，commit 时作为一步进入 history，
+    undo() / redo() 恢复后同样经 commit 持久化并通知界面。
+
+    其它进程（命令行、另一台机器同步过来的文件）写入的修改：watch 注册通知，
+    poll_external 触发检查，apply_external 在界面线程里并入 store 并同样经 on_change 通知。
+    """
+
+    def __init__(self, storage=None, autosave: bool = True, on_change=None):
+        self.storage = storage if storage is not None else open_storage()
+        self.store = self.storage.load()
+        with span("repository.init"):
+            self.repo = Repository(self.store)
+        self.autosave = autosave
+        self.on_change = on_change
+        self._pending: list[tuple] = []
+        self.history = History()
+
+    # ---------- 持久化 ----------
+    def commit(self, *changes, undo: Command | None = None) -> list[tuple]:
+        """undo 是修改前用 _undoable 记下的那一步，修改成功后随变更一起入栈。"""
+        changes = list(changes)
+        if undo is not None:
+            self.history.push(undo)
+        if self.autosave:
+            self.storage.record(self.store, changes)
+        else:
+            self._pending.extend(changes)
+        if self.on_change is not None:
+            self.on_change(changes)
+        return changes
+
+    def save(self) -> None:
+        """写入 autosave=False 期间攒下的变更。"""
+        if self._pending:
+            # 记录写的是 store 的当前值，同一项多次修改只需保留最后一次的位置
+            changes = list(reversed(dict.fromkeys(reversed(self._pending))))
+            self._pending = []
+            self.storage.record(self.store, changes)
+
+    def close(self) -> None:
+        self.save()
+        self.storage.close()
+
+    def discard(self) -> None:
+        """丢弃 autosave=False 期间攒下的变更并关闭存储，磁盘上的数据保持不变。"""
+        self._pending = []
+        self.storage.discard()
+
+    # ---------- 其它进程的修改 ----------
+    def watch(self, notify) -> None:
+        """notify() 可能在后台线程里调用，只应该把 apply_external 转到界面线程执行。"""
+        self.storage.on_external = notify
+
+    def poll_external(self) -> None:
+        self.storage.poll()
+
+    def apply_external(self) -> bool:
+        """
+        并入其它进程的修改。返回 True 表示数据被整体重新加载（界面需要全部刷新），
+        否则逐项并入并经 on_change 通知（不再写回磁盘）。同一对象以最后写入的为准。
+        """
+        reload, records = self.storage.take_external(self.store)
+        if reload:
+            self.reload()
+            return True
+        changes = []
+        for rec in records:
+            op = rec.get("op")
+            if op == "set":
+                # 旧版程序写的 active_goal 无法与多张卡片合并，忽略
+                if rec["key"] != "active_goal":
+                    self.store[rec["key"]] = decode_value(rec)
+                    changes.append(("set", rec["key"]))
+            elif op in ("put", "del") and rec.get("coll") in COLLECTION_TYPES:
+                coll = rec["coll"]
+                if op == "put":
+                    value = decode_value(rec)
+                    index = int(rec.get("index", 0) or 0)
+                    archive = self.store["archive"]
+                    if coll == "archive" and isinstance(archive, ShardedArchive):
+                        # 归档卡片的分片由完成时间决定，只读这一个分片，不为证明“不存在”读遍所有分片
+                        month = shard_month(value)
+                        archive.load_month(month)
+                        hit = archive.locate(value["id"])
+                        found = None if hit is None else (archive.shard_start(hit[0]) + hit[1], hit[2])
+                        if "shard" in rec:
+                            # 记录里的下标是分片内的下标
+                            index += archive.shard_start(month)
+                    else:
+                        found = self.repo.find_item(coll, value["id"])
+                    if found is not None:
+                        index = found[0]
+                        self.repo.remove_item(coll, value["id"])
+                    self.repo.insert_item(coll, value, min(index, len(self.store[coll])))
+                    changes.append(("put", coll, value["id"]))
+                else:
+                    if coll == "archive" and rec.get("shard") and isinstance(self.store["archive"], ShardedArchive):
+                        # 先读入记录里标明的分片，通常就不必逐个分片查找
+                        self.store["archive"].load_month(rec["shard"])
+                    if self.repo.remove_item(coll, rec.get("id")) is None:
+                        continue
+                    changes.append(("del", coll, rec["id"]))
+        if changes and self.on_change is not None:
+            self.on_change(changes)
+        return False
+
+    def reload(self) -> None:
+        """丢弃内存中的数据，从磁盘重新加载；撤销历史随之清空。"""
+        self.save()
+        self.storage.flush()
+        self._replace_store(self.storage.load())
+
+    def switch_storage(self, storage) -> None:
+        """
+        换成另一份数据（切换档案）：新数据加载成功后才关闭旧的存储。
+        store 是同一个 dict 原地替换内容，界面和 repo 持有的引用继续有效。
+        """
+        self.save()
+        store = storage.load()
+        storage.on_external = self.storage.on_external
+        old, self.storage = self.storage, storage
+        old.close()
+        self._replace_store(store)
+
+    def _replace_store(self, store: dict) -> None:
+        self.store.clear()
+        self.store.update(store)
+        self.repo.rebuild()
+        self.history.clear()
+
+    # ---------- 撤销 / 重做 ----------
+    def _undoable(self, label: str, *entities) -> Command:
+        """
+        在修改之前调用（校验都通过之后），entities 的格式见 history 模块。
+        返回的一步交给 commit(undo=...)；修改中途出错时它不会入栈，也不会被之后无关的 commit 带上。
+        """
+        return self.history.snapshot(self.repo, label, entities)
+
+    def undo(self) -> str | None:
+        """撤销最近一步，返回它的名称；没有可撤销的返回 None。"""
+        command, changes = self.history.undo(self.repo)
+        if command is None:
+            return None
+        self.commit(*changes)
+        return command.label
+
+    def redo(self) -> str | None:
+        command, changes = self.history.redo(self.repo)
+        if command is None:
+            return None
+        self.commit(*changes)
+        return command.label
+
+    # ---------- 进行中的卡片 ----------
+    def active_goals(self) -> list[dict]:
+        return self.repo.active_goals()
+
+    def active_goal(self, goal_id: str | None):
+        return self.repo.active_goal(goal_id)
+
+    def _require_goal(self, goal_id: str | None):
+        goal = self.repo.active_goal(goal_id)
+        if goal is None:
+            raise GoalError("没有卡片", "这张专注卡片已经完成或被删除。")
+        return goal
+
+    def create_goal(
+        self, long_term: str, current_goal: str, actions_texts: list[str], long_term_goal_ids: list[str] | None = None
+    ):
+        long_term = (long_term or "").strip()
+        current_goal = (current_goal or "").strip()
+        if not long_term or not current_goal:
+            raise GoalError("信息不完整", "请填写【长期目标描述】和【当下目标】。", "warning")
+        actions_texts = [t.strip() for t in actions_texts if t and t.strip()]
+        if not actions_texts:
+            raise GoalError("没有关键动作", "请至少添加一个【关键动作】。", "warning")
+
+        lt_ids = list(long_term_goal_ids or [])
+        goal_id = str(uuid.uuid4())
+        step = self._undoable("创建卡片", ("item", "active_goals", goal_id))
+        goal = self.repo.add_active_goal(
+            {
+                "id": goal_id,
+                "long_term": long_term,
+                "long_term_goal_id": lt_ids[0] if lt_ids else None,
+                "long_term_goal_ids": lt_ids,
+                "current_goal": current_goal,
+                "actions": [new_action(text) for text in actions_texts],
+                "done": False,
+                "created_at": now_str(),
+                "completed_at": None,
+            }
+        )
+        self.commit(("put", "active_goals", goal_id), undo=step)
+        return goal
+
+    def start_template(self, template_id: str):
+        t = self.repo.template(template_id)
+        if t is None:
+            raise GoalError("模板不存在", f"找不到模板：{template_id}", "warning")
+        goal = make_goal_from_template(t)
+        step = self._undoable("用模板创建卡片", ("item", "active_goals", goal["id"]))
+        goal = self.repo.add_active_goal(goal)
+        self.commit(("put", "active_goals", goal["id"]), undo=step)
+        return goal
+
+    def discard_goal(self, goal_id: str) -> list[tuple]:
+        """不归档，直接删除一张进行中的卡片。"""
+        if self.repo.active_goal(goal_id) is None:
+            return []
+        step = self._undoable("删除卡片", ("item", "active_goals", goal_id))
+        self.repo.remove_active_goal(goal_id)
+        return self.commit(("del", "active_goals", goal_id), undo=step)
+
+    # ---------- 关键动作 ----------
+    # 关键动作的 id 全局唯一，按动作操作时不需要指明卡片
+
+    def add_action(self, goal_id: str, text: str):
+        self._require_goal(goal_id)
+        action = new_action(text)
+        step = self._undoable("添加关键动作", ("action", action["id"]))
+        action = self.repo.add_action(goal_id, action)
+        self.commit(("put", "active_goals", goal_id), undo=step)
+        return action
+
+    def update_action(self, action_id: str, text: str | None = None, done: bool | None = None) -> bool:
+        """修改关键动作；返回这次是否把它从未完成变成了完成（界面据此播放庆祝）。"""
+        goal = self.repo.action_goal(action_id)
+        if goal is None:
+            raise GoalError("没有卡片", "这个关键动作所在的卡片已经完成或被删除。")
+        step = self._undoable("勾选关键动作" if text is None else "修改关键动作", ("action", action_id))
+        newly_done = False
+        a = self.repo.action(action_id)
+        if text is not None:
+            a["text"] = text
+        if done is not None:
+            old_done = a.get("done", False)
+            a["done"] = done
+            if done:
+                a["completed_at"] = now_str()
+                newly_done = not old_done
+            else:
+                a["completed_at"] = None
+        self.commit(("put", "active_goals", goal["id"]), undo=step)
+        return newly_done
+
+    def reorder_actions(self, goal_id: str, ordered_ids: list[str]) -> list[tuple]:
+        self._require_goal(goal_id)
+        step = self._undoable("调整关键动作顺序", ("order", goal_id))
+        self.repo.reorder_actions(goal_id, ordered_ids)
+        return self.commit(("put", "active_goals", goal_id), undo=step)
+
+    def delete_action(self, action_id: str) -> list[tuple]:
+        """删除关键动作；删掉的是最后一个时整张卡片一起删除（界面应先确认）。"""
+        goal = self.repo.action_goal(action_id)
+        if goal is None:
+            return []
+        if len(goal["actions"]) <= 1:
+            return self.discard_goal(goal["id"])
+        step = self._undoable("删除关键动作", ("action", action_id))
+        self.repo.remove_action(action_id)
+        return self.commit(("put", "active_goals", goal["id"]), undo=step)
+
+    def toggle_all_actions(self, goal_id: str) -> list[tuple]:
+        """有未完成的就全部标为完成，否则全部清除。"""
+        goal = self._require_goal(goal_id)
+        actions = goal["actions"]
+        if not actions:
+            return []
+        target_done = any(not a.get("done") for a in actions)
+        # 只改状态确实变化的动作，已完成的保留原来的完成时间；撤销也只需要记这些动作
+        changed = [a for a in actions if bool(a.get("done")) != target_done]
+        step = self._undoable("全选关键动作" if target_done else "全清关键动作", *(("action", a["id"]) for a in changed))
+        for a in changed:
+            a["done"] = target_done
+            a["completed_at"] = now_str() if target_done else None
+        return self.commit(("put", "active_goals", goal_id), undo=step)
+
+    # ---------- 完成与归档 ----------
+    def finish_goal(self, goal_id: str):
+        """所有关键动作完成后归档这张卡片，返回 (卡片, 变更列表)。"""
+        goal = self._require_goal(goal_id)
+        if not goal["actions"]:
+            raise GoalError("无法完成", "这张卡片没有任何关键动作，无法标记为完成。", "warning")
+        if not all(a.get("done") for a in goal["actions"]):
+            raise GoalError("尚未完成", "还有关键动作没有完成，请先勾选完成全部关键动作。")
+
+        step = self._undoable(
+            "完成卡片",
+            ("item", "active_goals", goal_id),
+            ("item", "archive", goal_id),
+            ("set", "total_completed_count"),
+            *(("item", "long_term_goals", lt_id) for lt_id in goal_long_term_ids(goal) if self.repo.long_term_goal(lt_id)),
+        )
+        goal["done"] = True
+        goal["completed_at"] = now_str()
+        self.repo.remove_active_goal(goal_id)
+        self.repo.add_archive_goal(goal, 0)
+        self.store["total_completed_count"] = self.store.get("total_completed_count", 0) + 1
+        lt_changes = self._increment_long_term_progress(goal)
+
+        changes = self.commit(
+            ("put", "archive", goal_id),
+            ("set", "total_completed_count"),
+            ("del", "active_goals", goal_id),
+            *lt_changes,
+            undo=step,
+        )
+        return goal, changes
+
+    def _increment_long_term_progress(self, goal) -> list[tuple]:
+        """为卡片关联的长期目标 +1，返回对应的变更（由调用方统一保存）。"""
+        changes = []
+        for lt_id in goal_long_term_ids(goal):
+            g = self.repo.long_term_goal(lt_id)
+            if not g:
+                continue
+            g["completed_count"] = int(g.get("completed_count", 0) or 0) + 1
+
+            target = int(g.get("target_count", 100) or 100)
+            done = int(g.get("completed_count", 0) or 0)
+            if done >= target and not g.get("completed_at"):
+                g["completed_at"] = now_str()
+            changes.append(("put", "long_term_goals", lt_id))
+        return changes
+
+    def delete_tokens(self) -> tuple[int, int]:
+        return delete_tokens(self.store)
+
+    def delete_archived_goal(self, goal_id: str) -> list[tuple]:
+        """消耗一次删除机会删除一张归档卡片。"""
+        _, available = delete_tokens(self.store)
+        if available <= 0:
+            raise GoalError("没有删除机会", "当前没有可用的删除机会。")
+        row = self.repo.archive_index(goal_id)
+        if row < 0:
+            raise GoalError("未选择卡片", f"归档中找不到这张卡片：{goal_id}", "warning")
+        step = self._undoable("删除归档卡片", ("item", "archive", goal_id), ("set", "delete_tokens_used"))
+        self.repo.remove_archive_goal_at(row)
+        self.store["delete_tokens_used"] = self.store.get("delete_tokens_used", 0) + 1
+        return self.commit(("del", "archive", goal_id), ("set", "delete_tokens_used"), undo=step)
+
+    def archive_between(self, start: str | None = None, end: str | None = None):
+        """完成日期在 [start, end] 内的归档卡片（日期为 YYYY-MM-DD，省略表示不限），从新到旧。"""
+        for g in self.repo.archive():
+            day = (g.get("completed_at") or "")[:10]
+            if (start is None or day >= start) and (end is None or day <= end):
+                yield g
+
+    def import_archive(self, goals) -> int:
+        """
+        并入其他数据文件导出的归档卡片：id 已存在的跳过，其余按完成时间插到对应位置。
+        导入不计入累计完成数，不会因此获得删除机会。返回导入的张数。
+        """
+        incoming = {}
+        for g in goals:
+            g = Goal.coerce(g)
+            if g["id"] not in incoming and self.repo.archive_goal(g["id"]) is None:
+                incoming[g["id"]] = g
+        if not incoming:
+            return 0
+        new_goals = sorted(incoming.values(), key=_completed_epoch, reverse=True)
+
+        # 归档从新到旧排列：一次遍历算出每张新卡片的插入位置
+        positions = []
+        archive = self.repo.archive()
+        for i, g in enumerate(archive):
+            done = _completed_epoch(g)
+            while len(positions) < len(new_goals) and _completed_epoch(new_goals[len(positions)]) >= done:
+                positions.append(i)
+            if len(positions) == len(new_goals):
+                break
+        positions.extend([len(archive)] * (len(new_goals) - len(positions)))
+
+        # 前面每插入一张，后面的位置顺延一格
+        for k, (pos, g) in enumerate(zip(positions, new_goals)):
+            self.repo.add_archive_goal(g, pos + k)
+        self.commit(*(("put", "archive", g["id"]) for g in new_goals))
+        return len(new_goals)
+
+    # ---------- 模板 ----------
+    def save_goal_as_template(self, goal, name: str):
+        """把卡片存成模板；已有同名模板时覆盖它（界面应先确认）。返回模板。"""
+        name = (name or "").strip()
+        if not name:
+            raise GoalError("名称为空", "请输入模板名称。", "warning")
+        actions_texts = [a.get("text", "").strip() for a in (goal.get("actions") or []) if a.get("text", "").strip()]
+        if not actions_texts:
+            raise GoalError("无法保存", "该卡片没有有效的关键动作，无法保存为模板。", "warning")
+
+        lt_ids = list(goal_long_term_ids(goal))
+        existing = self.repo.template_named(name)
+        if existing:
+            step = self._undoable("覆盖模板", ("item", "templates", existing["id"]))
+            existing["long_term_text"] = goal.get("long_term", "")
+            existing["long_term_goal_id"] = lt_ids[0] if lt_ids else None
+            existing["long_term_goal_ids"] = lt_ids
+            existing["current_goal"] = goal.get("current_goal", "")
+            existing["actions_texts"] = actions_texts
+            self.commit(("put", "templates", existing["id"]), undo=step)
+            return existing
+        template_id = str(uuid.uuid4())
+        step = self._undoable("保存模板", ("item", "templates", template_id))
+        t = self.repo.add_template(
+            {
+                "id": template_id,
+                "name": name,
+                "long_term_text": goal.get("long_term", ""),
+                "long_term_goal_id": lt_ids[0] if lt_ids else None,
+                "long_term_goal_ids": lt_ids,
+                "current_goal": goal.get("current_goal", ""),
+                "actions_texts": actions_texts,
+                "created_at": now_str(),
+            },
+            0,
+        )
+        self.commit(("put", "templates", t["id"]), undo=step)
+        return t
+
+    def delete_template(self, template_id: str) -> list[tuple]:
+        if self.repo.template(template_id) is None:
+            return []
+        step = self._undoable("删除模板", ("item", "templates", template_id))
+        self.repo.remove_template(template_id)
+        return self.commit(("del", "templates", template_id), undo=step)
+
+    # ---------- 长期目标 ----------
+    def add_long_term_goal(self, title: str, target_count: int = 100):
+        title = (title or "").strip()
+        if not title:
+            raise GoalError("信息不完整", "请输入长期目标名称。", "warning")
+        lt_id = str(uuid.uuid4())
+        step = self._undoable("添加长期目标", ("item", "long_term_goals", lt_id))
+        g = self.repo.add_long_term_goal(
+            {
+                "id": lt_id,
+                "title": title,
+                "target_count": int(target_count),
+                "completed_count": 0,
+                "created_at": now_str(),
+                "completed_at": None,
+            },
+            0,
+        )
+        self.commit(("put", "long_term_goals", g["id"]), undo=step)
+        return g
+
+    def update_long_term_goal(self, goal_id: str, title: str, target_count: int) -> list[tuple]:
+        title = (title or "").strip()
+        if not title:
+            raise GoalError("信息不完整", "请输入长期目标名称。", "warning")
+        g = self.repo.long_term_goal(goal_id)
+        if g is None:
+            return []
+        step = self._undoable("修改长期目标", ("item", "long_term_goals", goal_id))
+        g["title"] = title
+        g["target_count"] = int(target_count)
+        return self.commit(("put", "long_term_goals", goal_id), undo=step)
+
+    def delete_long_term_goal(self, goal_id: str) -> list[tuple]:
+        if self.repo.long_term_goal(goal_id) is None:
+            return []
+        step = self._undoable("删除长期目标", ("item", "long_term_goals", goal_id))
+        self.repo.remove_long_term_goal(goal_id)
+        return self.commit(("del", "long_term_goals", goal_id), undo=step)
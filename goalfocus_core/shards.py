@@ -0,0 +1,415 @@
+"""
+归档按完成月份分片（JSON 存储引擎）。
+
+    goals_data.json.archive/
+        manifest.json    {"format": 1, "shards": [{"month": "2025-03", "count": 31}, ...]}，从新到旧
+        2025-03.json     这个月完成的归档卡片，从新到旧，每行一张
+        2025-03.index.json   这个分片的统计（stats.stat_entries）和卡片 id
+        2025-03.search.json  这个分片每张卡片的检索词项（search.goal_terms）
+        undated.json     没有完成时间的旧数据
+
+快照里不再包含 archive，只记 "archive_format": "monthly"。启动时只读清单和各分片的 .index.json，
+按 id 查找卡片只读它所在的那一个分片；建全文索引只读 .search.json；
+某个月的卡片要显示时（表格滚动到、检索结果）才读这个分片。
+写入由 JournalStore 的写线程按日志记录修改对应的分片，每次只读写涉及到的那几个月，
+两个附属文件随分片一起重写（先分片，再 .search.json，最后 .index.json）。
+附属文件记着写出时分片文件的签名，对不上（例如写完分片后崩溃）就不用它，改读分片本身。
+"""
+
+import bisect
+import json
+import os
+import re
+import sys
+from collections import Counter
+from collections.abc import MutableSequence
+
+from goalfocus_core.locking import file_signature
+from goalfocus_core.model import Goal, json_default
+from goalfocus_core.profiling import traced
+from goalfocus_core.search import goal_terms
+from goalfocus_core.stats import ArchiveStats, stat_entries
+
+ARCHIVE_FORMAT = "monthly"
+# 分片目录紧跟在快照文件旁边：goals_data.json.archive
+ARCHIVE_SUFFIX = ".archive"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_FORMAT = 1
+UNDATED = "undated"
+INDEX_SUFFIX = ".index.json"
+SEARCH_SUFFIX = ".search.json"
+INDEX_FORMAT = 2
+
+_MONTH = re.compile(r"\d{4}-\d{2}")
+
+
+def shard_month(goal) -> str:
+    """卡片所在的分片：完成时间的 YYYY-MM。归档卡片的完成时间不会再改，所以分片是固定的。"""
+    completed = goal.get("completed_at")
+    if isinstance(completed, str) and _MONTH.fullmatch(completed[:7]):
+        return completed[:7]
+    return UNDATED
+
+
+def sort_months(months) -> list[str]:
+    """从新到旧，undated 排在最后。"""
+    return sorted(months, key=lambda m: (m != UNDATED, m), reverse=True)
+
+
+def shard_path(directory: str, month: str) -> str:
+    return os.path.join(directory, f"{month}.json")
+
+
+def read_shard(directory: str, month: str) -> list[dict]:
+    try:
+        with open(shard_path(directory, month), "rb") as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return []
+
+
+def encode_shard(goals) -> bytes:
+    lines = [json.dumps(g, ensure_ascii=False, separators=(",", ":"), default=json_default) for g in goals]
+    if not lines:
+        return b"[]\n"
+    return ("[\n" + ",\n".join(lines) + "\n]\n").encode("utf-8")
+
+
+def shard_index_path(directory: str, month: str) -> str:
+    return os.path.join(directory, f"{month}{INDEX_SUFFIX}")
+
+
+def shard_search_path(directory: str, month: str) -> str:
+    return os.path.join(directory, f"{month}{SEARCH_SUFFIX}")
+
+
+def shard_index(goals) -> dict:
+    """分片两个附属文件的内容：统计、卡片 id 和检索词项。写线程在写出分片后加上分片签名一起写出。"""
+    return {
+        "stats": [[kind, ref, key, n] for (kind, ref, key), n in stat_entries(goals).items()],
+        "ids": [g["id"] for g in goals],
+        "search": [[g["id"], *goal_terms(g)] for g in goals],
+    }
+
+
+def encode_shard_index(signature, index: dict) -> tuple[bytes, bytes]:
+    """signature 是刚写出的分片文件的 file_signature；返回 (.index.json, .search.json) 的内容。"""
+    head = {"format": INDEX_FORMAT, "shard": list(signature)}
+    return (
+        _encode_sidecar({**head, "stats": index["stats"], "ids": index["ids"]}),
+        _encode_sidecar({**head, "search": index["search"]}),
+    )
+
+
+def _encode_sidecar(data: dict) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _read_sidecar(directory: str, month: str, path: str) -> dict | None:
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Error reading archive index for {month}: {e}", file=sys.stderr)
+        return None
+    signature = file_signature(shard_path(directory, month))
+    if not isinstance(data, dict) or data.get("format") != INDEX_FORMAT or signature is None:
+        return None
+    if data.get("shard") != list(signature):
+        return None
+    return data
+
+
+def read_shard_index(directory: str, month: str) -> dict | None:
+    """分片的 .index.json（stats、ids）；没有、读不出来或者与分片文件对不上时返回 None。"""
+    return _read_sidecar(directory, month, shard_index_path(directory, month))
+
+
+def read_shard_search(directory: str, month: str) -> list | None:
+    """分片的 .search.json：[[卡片 id, 词项, 完成时间], ...]；不可用时返回 None。"""
+    data = _read_sidecar(directory, month, shard_search_path(directory, month))
+    return data["search"] if data is not None else None
+
+
+def shard_stats(goals) -> list[tuple]:
+    return [(kind, ref, key, n) for (kind, ref, key), n in stat_entries(goals).items()]
+
+
+def read_manifest(directory: str) -> list[tuple[str, int]]:
+    """[(月份, 张数), ...]，从新到旧。清单损坏时按分片文件重建。"""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return [(s["month"], int(s["count"])) for s in data["shards"]]
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Error reading archive manifest, rebuilding it: {e}", file=sys.stderr)
+    counts = {}
+    for name in os.listdir(directory):
+        month, ext = os.path.splitext(name)
+        if ext == ".json" and (month == UNDATED or _MONTH.fullmatch(month)):
+            counts[month] = len(read_shard(directory, month))
+    return [(m, counts[m]) for m in sort_months(counts) if counts[m] > 0]
+
+
+def encode_manifest(counts: dict[str, int]) -> bytes:
+    shards = [{"month": m, "count": counts[m]} for m in sort_months(counts) if counts[m] > 0]
+    return json.dumps({"format": MANIFEST_FORMAT, "shards": shards}, indent=1).encode("utf-8")
+
+
+class ShardedArchive(MutableSequence):
+    """
+    按月分片的归档列表：行为和原来的 list 一样（最新的在下标 0，各分片从新到旧首尾相接），
+    长度来自清单，分片在第一次访问时才读入。
+    新完成的卡片插到当月分片的开头，代价只和当月的卡片数有关。
+    只修改内存；落盘由 JournalStore 根据日志记录完成。
+    """
+
+    def __init__(self, directory: str, counts: list[tuple[str, int]], loaded: dict[str, list] | None = None):
+        self.directory = directory
+        self._months = [m for m, _ in counts]
+        self._counts = dict(counts)
+        self._total = sum(self._counts.values())
+        # 各分片在整个列表中的起始下标，增删后按需重算
+        self._starts: list[int] | None = None
+        self._items: dict[str, list] = {}
+        # 已读入的分片里的卡片：id -> 卡片 / 所在月份
+        self._by_id: dict[str, Goal] = {}
+        self._month_of: dict[str, str] = {}
+        # 没读入的分片里的卡片 id -> 所在月份，来自各分片的 .index.json（load_stats 时读入）；
+        # None 表示还没有读过，按 id 查找只能逐个分片读
+        self._id_month: dict[str, str] | None = None
+        # 本次运行中删除的卡片所在的月份，写日志时带上，写线程不用逐个分片查找
+        self._removed: dict[str, str] = {}
+        # 本次运行中被删空的月份：整份写出时要删掉它们的文件
+        self._emptied: set[str] = set()
+        # load_stats 从统计文件取来、分片本身还没读入的月份 -> 当时计入的统计。
+        # 分片读入时换成按读到的内容重算的结果，这期间其它进程对分片的修改也就算进去了
+        self._stats: ArchiveStats | None = None
+        self._saved_stats: dict[str, Counter] = {}
+        for month, items in (loaded or {}).items():
+            self._set_items(month, items)
+
+    # ---------- 分片 ----------
+    def _set_items(self, month: str, items: list) -> None:
+        if month not in self._counts:
+            self._add_month(month)
+        self._items[month] = items
+        for g in items:
+            self._by_id[g["id"]] = g
+            self._month_of[g["id"]] = month
+        if self._counts.get(month) != len(items):
+            # 清单落后于分片文件（例如写清单前崩溃），以分片为准
+            self._total += len(items) - self._counts.get(month, 0)
+            self._counts[month] = len(items)
+            self._starts = None
+
+    @traced("archive.shard_load")
+    def _load(self, month: str) -> list:
+        items = self._items.get(month)
+        if items is None:
+            items = [Goal(g) for g in read_shard(self.directory, month)]
+            self._set_items(month, items)
+            saved = self._saved_stats.pop(month, None)
+            if saved is not None:
+                delta = stat_entries(items)
+                delta.subtract(saved)
+                self._stats.apply({k: n for k, n in delta.items() if n})
+        return items
+
+    def _add_month(self, month: str) -> None:
+        self._emptied.discard(month)
+        self._months = sort_months(self._months + [month])
+        self._counts[month] = 0
+        self._items[month] = []
+        self._starts = None
+
+    def _drop_month_if_empty(self, month: str) -> None:
+        if self._counts[month] == 0:
+            self._emptied.add(month)
+            self._months.remove(month)
+            del self._counts[month]
+            self._items.pop(month, None)
+            self._starts = None
+
+    def shard_start(self, month: str) -> int:
+        """month 分片第一张卡片在整个列表中的下标；没有这个分片时为它应该插入的位置。"""
+        if self._starts is None:
+            starts = []
+            n = 0
+            for m in self._months:
+                starts.append(n)
+                n += self._counts[m]
+            self._starts = starts
+        months = self._months
+        if month in self._counts:
+            return self._starts[months.index(month)]
+        pos = sort_months(months + [month]).index(month)
+        return self._starts[pos] if pos < len(months) else self._total
+
+    def _locate(self, index: int) -> tuple[str, int]:
+        if index < 0:
+            index += self._total
+        if index < 0 or index >= self._total:
+            raise IndexError("archive index out of range")
+        self.shard_start(self._months[0])
+        # 起始下标相同（中间夹着空分片）时 bisect_right 取最后一个，正好是非空的那个
+        i = bisect.bisect_right(self._starts, index) - 1
+        return self._months[i], index - self._starts[i]
+
+    def load_month(self, month: str) -> list:
+        """读入 month 分片（没有这个分片时返回空列表，不会新建）。"""
+        return self._load(month) if month in self._counts else []
+
+    def loaded_shards(self) -> dict[str, list]:
+        """已读入的分片，包括本次运行中被删空的月份（空列表）。没读入的分片在内存里没有改动过。"""
+        shards = {month: [] for month in self._emptied}
+        shards.update((m, self._items[m]) for m in self._months if m in self._items)
+        return shards
+
+    def loaded_months(self) -> list[str]:
+        return [m for m in self._months if m in self._items]
+
+    # ---------- 列表接口 ----------
+    def __len__(self) -> int:
+        return self._total
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._total))]
+        month, local = self._locate(index)
+        return self._load(month)[local]
+
+    def __iter__(self):
+        # 逐个分片遍历，每个分片先拍快照：遍历期间（分批建索引）的增删不会打乱顺序
+        for month in list(self._months):
+            # 遍历期间被删空的分片已经不在列表里，不能再从磁盘读回来
+            if month in self._counts:
+                yield from list(self._load(month))
+
+    def __setitem__(self, index, goal):
+        if isinstance(index, slice):
+            raise TypeError("slice assignment is not supported on the archive")
+        del self[index]
+        self.insert(index, goal)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            for i in sorted(range(*index.indices(self._total)), reverse=True):
+                del self[i]
+            return
+        month, local = self._locate(index)
+        g = self._load(month).pop(local)
+        self._by_id.pop(g["id"], None)
+        self._month_of.pop(g["id"], None)
+        self._removed[g["id"]] = month
+        self._counts[month] -= 1
+        self._total -= 1
+        self._starts = None
+        self._drop_month_if_empty(month)
+
+    def insert(self, index: int, goal) -> None:
+        """插入到所属月份的分片里；index 落在分片之外时放到分片离它最近的一端。"""
+        month = shard_month(goal)
+        if month not in self._counts:
+            self._add_month(month)
+        items = self._load(month)
+        if index < 0:
+            index = max(index + self._total, 0)
+        local = min(max(index - self.shard_start(month), 0), len(items))
+        items.insert(local, goal)
+        self._by_id[goal["id"]] = goal
+        self._month_of[goal["id"]] = month
+        self._removed.pop(goal["id"], None)
+        self._counts[month] += 1
+        self._total += 1
+        self._starts = None
+
+    # ---------- 按 id 访问（Repository 用，接口同 SqliteArchive） ----------
+    def find(self, goal_id: str):
+        """先查已读入的分片，再按 id -> 月份的索引只读那一个分片；没有索引时才从新到旧逐个读入其余分片。"""
+        g = self._by_id.get(goal_id)
+        if g is not None or goal_id in self._removed:
+            # 本次运行中删掉的卡片（撤销 / 重做时常见）重新插入之前肯定不在归档里
+            return g
+        if self._id_month is not None:
+            month = self._id_month.get(goal_id)
+            if month is not None and month in self._counts and month not in self._items:
+                self._load(month)
+                return self._by_id.get(goal_id)
+            # 没读入的分片都有 id 索引，不在其中就不在归档里（已读入的分片上面已经查过）
+            return None
+        for month in list(self._months):
+            if month not in self._items:
+                self._load(month)
+                g = self._by_id.get(goal_id)
+                if g is not None:
+                    return g
+        return None
+
+    def index_of(self, goal_id: str) -> int:
+        g = self.find(goal_id)
+        if g is None:
+            return -1
+        month = self._month_of[goal_id]
+        return self.shard_start(month) + self._items[month].index(g)
+
+    def locate(self, goal_id: str) -> tuple[str, int, Goal] | None:
+        """已读入的卡片所在的 (月份, 分片内下标, 卡片)；写日志时用，不会触发读分片。"""
+        g = self._by_id.get(goal_id)
+        if g is None:
+            return None
+        month = self._month_of[goal_id]
+        return month, self._items[month].index(g), g
+
+    def removed_month(self, goal_id: str) -> str | None:
+        return self._removed.get(goal_id)
+
+    def ids_for_long_term_goal(self, lt_id: str) -> list[str]:
+        return [g["id"] for g in self if lt_id in (g.get("long_term_goal_ids") or ())]
+
+    @traced("archive.load_stats")
+    def load_stats(self) -> ArchiveStats:
+        """
+        合并各分片 .index.json 里的统计，同时记下其中的卡片 id 供 find 使用；
+        已读入的分片以内存为准，附属文件缺失或过期的分片才读分片本身重算。
+        只在 load 之后立即调用（Repository 建立时），之后由 Repository 随增删维护。
+        """
+        self._saved_stats = {}
+        rows = []
+        saved = {}
+        id_month = {}
+        for month in self._months:
+            if month in self._items:
+                rows.extend(shard_stats(self._items[month]))
+                continue
+            index = read_shard_index(self.directory, month)
+            if index is not None:
+                rows.extend(index["stats"])
+                saved[month] = Counter({(kind, ref, key): n for kind, ref, key, n in index["stats"]})
+                id_month.update(dict.fromkeys(index["ids"], month))
+            else:
+                rows.extend(shard_stats(self._load(month)))
+        self._stats = ArchiveStats.from_entries(rows)
+        self._saved_stats = saved
+        self._id_month = id_month
+        return self._stats
+
+    def search_docs(self):
+        """
+        逐张产出 (卡片 id, 词项, 完成时间)，供 Repository 建全文索引：没读入的分片读它的 .search.json，
+        不读分片本身，也不用切词；附属文件不可用时才读分片。遍历期间的增删同 __iter__。
+        """
+        for month in list(self._months):
+            if month not in self._counts:
+                continue
+            if month not in self._items:
+                docs = read_shard_search(self.directory, month)
+                if docs is not None:
+                    yield from docs
+                    continue
+            for g in list(self._load(month)):
+                yield (g["id"], *goal_terms(g))
@@ -0,0 +1,541 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import MutableSequence
+from datetime import datetime
+
+from goalfocus_core.model import Goal, LongTermGoal, Template, json_default
+from goalfocus_core.profiling import traced
+from goalfocus_core.stats import ArchiveStats, stat_entries
+from goalfocus_core.storage import DATA_FILE, JournalStore, finalize_store, goal_long_term_ids
+
+SQLITE_FILE = "goals_data.sqlite3"
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS archive (
+    id           TEXT PRIMARY KEY,
+    seq          REAL NOT NULL,
+    long_term    TEXT NOT NULL DEFAULT '',
+    current_goal TEXT NOT NULL DEFAULT '',
+    created_at   TEXT,
+    completed_at TEXT,
+    data         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_archive_seq ON archive(seq);
+CREATE INDEX IF NOT EXISTS idx_archive_completed_at ON archive(completed_at);
+CREATE TABLE IF NOT EXISTS archive_long_term (
+    long_term_goal_id TEXT NOT NULL,
+    goal_id           TEXT NOT NULL,
+    PRIMARY KEY (long_term_goal_id, goal_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_archive_long_term_goal ON archive_long_term(goal_id);
+CREATE TABLE IF NOT EXISTS long_term_goals (
+    id       TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    data     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS templates (
+    id       TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name     TEXT NOT NULL DEFAULT '',
+    data     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_templates_name ON templates(name);
+CREATE TABLE IF NOT EXISTS archive_stats (
+    kind TEXT NOT NULL,
+    ref  TEXT NOT NULL,
+    key  INTEGER NOT NULL,
+    n    INTEGER NOT NULL,
+    PRIMARY KEY (kind, ref, key)
+) WITHOUT ROWID;
+"""
+
+# 归档按页从数据库取，内存里最多保留 MAX_CACHED_PAGES 页
+PAGE_SIZE = 200
+MAX_CACHED_PAGES = 16
+# 归档表格可以点表头排序的列（archive 表里单独存了这几列）
+SORT_COLUMNS = ("long_term", "current_goal", "created_at", "completed_at")
+
+# 后台线程做 WAL checkpoint（唯一需要 fsync 的步骤）的间隔，秒
+CHECKPOINT_INTERVAL = 5.0
+
+# 存在 meta 表里的顶层字段（进行中的卡片只有几张，整体存成一个 JSON 列表）
+META_KEYS = ("active_goals", "total_completed_count", "delete_tokens_used")
+# 旧版数据库里的单张进行中卡片，读取时转成 active_goals
+LEGACY_META_KEYS = ("active_goal",)
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=json_default)
+
+
+def _load_goal(data: str) -> Goal:
+    return Goal(json.loads(data))
+
+
+class SqliteArchive(MutableSequence):
+    """
+    归档列表的惰性视图：行为和原来的 list 一样（最新的在下标 0），
+    但只按页读取当前用到的行，启动时只查一次总数。
+    增删直接写入数据库（未提交），由 SqliteStore.record 统一提交。
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self._count = conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+        # 页号 -> [(seq, goal), ...]
+        self._pages: OrderedDict[int, list[tuple[float, dict]]] = OrderedDict()
+        # 本次运行中新插入的卡片：保证 archive[0] 和插入时的 dict 是同一个对象
+        self._pinned: dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _page(self, page_no: int) -> list[tuple[float, dict]]:
+        page = self._pages.get(page_no)
+        if page is not None:
+            self._pages.move_to_end(page_no)
+            return page
+        rows = self._conn.execute(
+            "SELECT seq, id, data FROM archive ORDER BY seq DESC LIMIT ? OFFSET ?",
+            (PAGE_SIZE, page_no * PAGE_SIZE),
+        ).fetchall()
+        page = [(seq, self._pinned.get(gid) or _load_goal(data)) for seq, gid, data in rows]
+        self._pages[page_no] = page
+        if len(self._pages) > MAX_CACHED_PAGES:
+            self._pages.popitem(last=False)
+        return page
+
+    def _entry(self, index: int) -> tuple[float, dict]:
+        if index < 0:
+            index += self._count
+        if index < 0 or index >= self._count:
+            raise IndexError("archive index out of range")
+        return self._page(index // PAGE_SIZE)[index % PAGE_SIZE]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._entry(i)[1] for i in range(*index.indices(self._count))]
+        return self._entry(index)[1]
+
+    def __iter__(self):
+        # 按 seq 游标分批读，避免 OFFSET 越翻越慢
+        last_seq = None
+        while True:
+            if last_seq is None:
+                rows = self._conn.execute(
+                    "SELECT seq, id, data FROM archive ORDER BY seq DESC LIMIT ?", (PAGE_SIZE,)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT seq, id, data FROM archive WHERE seq < ? ORDER BY seq DESC LIMIT ?",
+                    (last_seq, PAGE_SIZE),
+                ).fetchall()
+            if not rows:
+                return
+            for seq, gid, data in rows:
+                yield self._pinned.get(gid) or _load_goal(data)
+            last_seq = rows[-1][0]
+
+    def __setitem__(self, index, goal):
+        if isinstance(index, slice):
+            raise TypeError("slice assignment is not supported on the archive")
+        seq, old = self._entry(index)
+        self._delete_row(old.get("id"))
+        self._insert_row(seq, goal)
+        self._pages.clear()
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            for i in sorted(range(*index.indices(self._count)), reverse=True):
+                del self[i]
+            return
+        _, goal = self._entry(index)
+        self._delete_row(goal.get("id"))
+        self._count -= 1
+        self._pages.clear()
+
+    def insert(self, index: int, goal: dict) -> None:
+        if index < 0:
+            index = max(index + self._count, 0)
+        index = min(index, self._count)
+        if self._count == 0:
+            seq = 0.0
+        elif index == 0:
+            seq = self._entry(0)[0] + 1.0
+        elif index == self._count:
+            seq = self._entry(self._count - 1)[0] - 1.0
+        else:
+            seq = (self._entry(index - 1)[0] + self._entry(index)[0]) / 2.0
+        self._insert_row(seq, goal)
+        self._count += 1
+        self._pages.clear()
+
+    # ---------- 行级读写 ----------
+    def find(self, goal_id: str) -> dict | None:
+        if goal_id in self._pinned:
+            return self._pinned[goal_id]
+        for page in self._pages.values():
+            for _, g in page:
+                if g.get("id") == goal_id:
+                    return g
+        row = self._conn.execute("SELECT data FROM archive WHERE id = ?", (goal_id,)).fetchone()
+        return _load_goal(row[0]) if row else None
+
+    def ids_for_long_term_goal(self, lt_id: str) -> list[str]:
+        rows = self._conn.execute(
+            "SELECT a.id FROM archive_long_term l JOIN archive a ON a.id = l.goal_id "
+            "WHERE l.long_term_goal_id = ? ORDER BY a.seq DESC",
+            (lt_id,),
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def sorted_ids(self, field: str, descending: bool = False) -> list[str]:
+        """按 field 排序的全部卡片 id，值相同的保持归档顺序；只读 id 列，不解析卡片。"""
+        if field not in SORT_COLUMNS:
+            raise ValueError(f"cannot sort archive by {field!r}")
+        rows = self._conn.execute(
+            f"SELECT id FROM archive ORDER BY COALESCE({field}, '') {'DESC' if descending else 'ASC'}, seq DESC"
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def load_stats(self) -> ArchiveStats | None:
+        """
+        archive_stats 表里随每次增删维护的统计（见 stats.stat_entries）。
+        与归档行数对不上（旧版本程序改过数据库）时返回 None，由调用方遍历归档重建。
+        """
+        if not self.stats_match():
+            return None
+        return ArchiveStats.from_entries(self._conn.execute("SELECT kind, ref, key, n FROM archive_stats"))
+
+    def stats_match(self) -> bool:
+        row = self._conn.execute("SELECT n FROM archive_stats WHERE kind = 'cards'").fetchone()
+        return (row[0] if row else 0) == self._count
+
+    def index_of(self, goal_id: str) -> int:
+        """按 id 求下标（= seq 比它大的行数），找不到返回 -1。"""
+        row = self._conn.execute(
+            "SELECT (SELECT COUNT(*) FROM archive WHERE seq > a.seq) FROM archive a WHERE a.id = ?", (goal_id,)
+        ).fetchone()
+        return row[0] if row else -1
+
+    def update_row(self, goal: dict) -> None:
+        gid = goal.get("id")
+        self._bump_stats(self._stored_goal(gid), -1)
+        self._bump_stats(goal, 1)
+        self._conn.execute(
+            "UPDATE archive SET long_term = ?, current_goal = ?, created_at = ?, completed_at = ?, data = ? "
+            "WHERE id = ?",
+            (
+                goal.get("long_term", ""),
+                goal.get("current_goal", ""),
+                goal.get("created_at"),
+                goal.get("completed_at"),
+                _dumps(goal),
+                gid,
+            ),
+        )
+        self._write_long_term_links(goal)
+
+    def _insert_row(self, seq: float, goal: dict) -> None:
+        gid = goal.get("id")
+        # 同 id 的行会被替换掉，它的统计先减掉
+        self._bump_stats(self._stored_goal(gid), -1)
+        self._bump_stats(goal, 1)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO archive (id, seq, long_term, current_goal, created_at, completed_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                gid,
+                seq,
+                goal.get("long_term", ""),
+                goal.get("current_goal", ""),
+                goal.get("created_at"),
+                goal.get("completed_at"),
+                _dumps(goal),
+            ),
+        )
+        self._write_long_term_links(goal)
+        self._pinned[gid] = goal
+
+    def _delete_row(self, goal_id: str) -> None:
+        self._bump_stats(self._stored_goal(goal_id), -1)
+        self._conn.execute("DELETE FROM archive WHERE id = ?", (goal_id,))
+        self._conn.execute("DELETE FROM archive_long_term WHERE goal_id = ?", (goal_id,))
+        self._pinned.pop(goal_id, None)
+
+    def _stored_goal(self, goal_id: str) -> dict | None:
+        row = self._conn.execute("SELECT data FROM archive WHERE id = ?", (goal_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _bump_stats(self, goal: dict | None, sign: int) -> None:
+        """在当前事务里把一张卡片的统计加到（sign=-1 时减去）archive_stats 表上，与行的增删一起提交或回滚。"""
+        if goal is None:
+            return
+        rows = [(kind, ref, key, n * sign) for (kind, ref, key), n in stat_entries([goal]).items()]
+        self._conn.executemany(
+            "INSERT INTO archive_stats (kind, ref, key, n) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (kind, ref, key) DO UPDATE SET n = n + excluded.n",
+            rows,
+        )
+        if sign < 0:
+            self._conn.executemany(
+                "DELETE FROM archive_stats WHERE kind = ? AND ref = ? AND key = ? AND n <= 0",
+                [row[:3] for row in rows],
+            )
+
+    def _write_long_term_links(self, goal: dict) -> None:
+        gid = goal.get("id")
+        self._conn.execute("DELETE FROM archive_long_term WHERE goal_id = ?", (gid,))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO archive_long_term (long_term_goal_id, goal_id) VALUES (?, ?)",
+            [(lt_id, gid) for lt_id in goal_long_term_ids(goal)],
+        )
+
+
+class SqliteStore:
+    """
+    可选的 SQLite 存储引擎，接口与 JournalStore 一致（load / record / compact / flush / close）。
+    - 归档、长期目标、模板各自一张表，归档按完成时间、长期目标建索引，模板按名称建索引；
+    - load 只读取长期目标、模板和少量标量，归档以 SqliteArchive 惰性分页访问；
+    - 数据库不存在时，从 goals_data.json（含日志与旧版 list 格式）一次性迁移。
+    使用 WAL + synchronous=NORMAL，提交只写 WAL；落盘的 checkpoint 在后台线程完成。
+    多进程由 SQLite 自己加锁；其它连接提交后 PRAGMA data_version 会变化，poll 据此要求重新加载。
+    """
+
+    def __init__(self, path: str = SQLITE_FILE, json_path: str | None = DATA_FILE):
+        self.path = path
+        self.json_path = json_path
+        self.recovered_from: str | None = None
+        self._conn: sqlite3.Connection | None = None
+        self._archive: SqliteArchive | None = None
+        self._stop = threading.Event()
+        self._checkpointer: threading.Thread | None = None
+        self._data_version = None
+        self._external = False
+        self.on_external = None
+
+    # ---------- 读取 ----------
+    @traced("storage.load")
+    def load(self) -> dict:
+        if self._conn is not None:
+            # 重新加载：旧连接上的 SqliteArchive 随旧 store 一起丢弃
+            self._conn.close()
+            self._conn = None
+        is_new = not os.path.exists(self.path)
+        quarantined = False
+        try:
+            self._open()
+        except sqlite3.DatabaseError as e:
+            print(f"Error opening {self.path}: {e}", file=sys.stderr)
+            self._quarantine()
+            is_new = quarantined = True
+            self._open()
+
+        if is_new and self.json_path and os.path.exists(self.json_path):
+            # 只读：JSON 数据原样保留，需要时还可以换回 JSON 引擎
+            self.import_store(JournalStore(self.json_path).load(migrate=False))
+            self._set_meta("migrated_from", os.path.abspath(self.json_path))
+            self._conn.commit()
+            if quarantined:
+                # 只有真的从 JSON 数据恢复了才提示
+                self.recovered_from = self.json_path
+
+        store = {}
+        for key, value in self._conn.execute("SELECT key, value FROM meta"):
+            if key in META_KEYS or key in LEGACY_META_KEYS:
+                store[key] = json.loads(value)
+        legacy = store.pop("active_goal", None)
+        if "active_goals" not in store:
+            store["active_goals"] = [legacy] if legacy else []
+        store["active_goals"] = [Goal(g) for g in store["active_goals"] or []]
+        store["long_term_goals"] = [
+            LongTermGoal(json.loads(r[0])) for r in self._conn.execute("SELECT data FROM long_term_goals ORDER BY position")
+        ]
+        store["templates"] = [
+            Template(json.loads(r[0])) for r in self._conn.execute("SELECT data FROM templates ORDER BY position")
+        ]
+        self._archive = SqliteArchive(self._conn)
+        if not self._archive.stats_match():
+            # 还没有统计表的旧数据库，或旧版本程序增删过归档：遍历一次归档重建，之后随增删维护
+            self._write_archive_stats(self._archive)
+            self._conn.commit()
+        store["archive"] = self._archive
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self._external = False
+        return finalize_store(store)
+
+    def poll(self) -> None:
+        """检查其它进程是否提交过修改（只读一个计数器）。"""
+        if self._conn is None or self._external:
+            return
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self._external = True
+            if self.on_external is not None:
+                self.on_external()
+
+    def take_external(self, store: dict) -> tuple[bool, list[dict]]:
+        """与 JournalStore.take_external 一致；数据库没有增量记录可取，有修改时总是整体重新加载。"""
+        external, self._external = self._external, False
+        return external, []
+
+    def _open(self) -> None:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # checkpoint 交给后台线程，界面线程的提交不触发 fsync
+        conn.execute("PRAGMA wal_autocheckpoint=0")
+        conn.executescript(SCHEMA)
+        conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),)
+        )
+        conn.commit()
+        self._conn = conn
+
+    def _quarantine(self) -> None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        for suffix in ("", "-wal", "-shm"):
+            p = self.path + suffix
+            if os.path.exists(p):
+                os.replace(p, f"{p}.corrupt-{stamp}")
+
+    # ---------- 写入 ----------
+    def import_store(self, store: dict) -> None:
+        """把完整的 store 写入数据库（迁移、导入时使用），不提交。"""
+        conn = self._conn
+        for key in META_KEYS:
+            self._set_meta(key, store.get(key))
+        self._write_collection("long_term_goals", store.get("long_term_goals") or [])
+        self._write_collection("templates", store.get("templates") or [])
+
+        archive = store.get("archive") or []
+        if archive is self._archive:
+            return
+        conn.execute("DELETE FROM archive")
+        conn.execute("DELETE FROM archive_long_term")
+        n = len(archive)
+        conn.executemany(
+            "INSERT OR REPLACE INTO archive (id, seq, long_term, current_goal, created_at, completed_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    g.get("id"),
+                    float(n - i),
+                    g.get("long_term", ""),
+                    g.get("current_goal", ""),
+                    g.get("created_at"),
+                    g.get("completed_at"),
+                    _dumps(g),
+                )
+                for i, g in enumerate(archive)
+            ),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO archive_long_term (long_term_goal_id, goal_id) VALUES (?, ?)",
+            ((lt_id, g.get("id")) for g in archive for lt_id in goal_long_term_ids(g)),
+        )
+        self._write_archive_stats(archive)
+
+    def _write_archive_stats(self, goals) -> None:
+        """按 goals 重写整张 archive_stats 表（导入整份数据、或旧数据库第一次打开时），不提交。"""
+        self._conn.execute("DELETE FROM archive_stats")
+        self._conn.executemany(
+            "INSERT INTO archive_stats (kind, ref, key, n) VALUES (?, ?, ?, ?)",
+            [(kind, ref, key, n) for (kind, ref, key), n in stat_entries(goals).items()],
+        )
+
+    @traced("storage.record")
+    def record(self, store: dict, changes) -> None:
+        for change in changes:
+            op = change[0]
+            if op == "set":
+                if change[1] in META_KEYS:
+                    self._set_meta(change[1], store.get(change[1]))
+            elif change[1] == "active_goals":
+                self._set_meta("active_goals", store.get("active_goals"))
+            elif change[1] == "archive":
+                if op == "put":
+                    goal = self._archive.find(change[2]) if self._archive is not None else None
+                    if goal is not None:
+                        self._archive.update_row(goal)
+                elif self._archive is not None:
+                    self._archive._delete_row(change[2])
+            elif change[1] in ("long_term_goals", "templates"):
+                # 这两张表很小，按当前列表整体重排位置即可
+                self._write_collection(change[1], store.get(change[1]) or [])
+        self._conn.commit()
+        self._start_checkpointer()
+
+    @traced("storage.compact")
+    def compact(self, store: dict) -> None:
+        self.import_store(store)
+        self._conn.commit()
+        self._start_checkpointer()
+
+    def _set_meta(self, key: str, value) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, _dumps(value)))
+
+    def _write_collection(self, table: str, items: list[dict]) -> None:
+        conn = self._conn
+        conn.execute(f"DELETE FROM {table}")
+        if table == "templates":
+            conn.executemany(
+                "INSERT INTO templates (id, position, name, data) VALUES (?, ?, ?, ?)",
+                ((t.get("id"), i, t.get("name", ""), _dumps(t)) for i, t in enumerate(items)),
+            )
+        else:
+            conn.executemany(
+                f"INSERT INTO {table} (id, position, data) VALUES (?, ?, ?)",
+                ((x.get("id"), i, _dumps(x)) for i, x in enumerate(items)),
+            )
+
+    # ---------- 落盘 ----------
+    def _start_checkpointer(self) -> None:
+        if self._checkpointer is not None:
+            return
+        self._stop.clear()
+        self._checkpointer = threading.Thread(target=self._checkpoint_loop, name="GoalFocusCheckpoint", daemon=True)
+        self._checkpointer.start()
+
+    def _checkpoint_loop(self) -> None:
+        conn = sqlite3.connect(self.path)
+        try:
+            while not self._stop.wait(CHECKPOINT_INTERVAL):
+                conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        except sqlite3.Error as e:
+            print(f"Error checkpointing {self.path}: {e}", file=sys.stderr)
+        finally:
+            conn.close()
+
+    def flush(self) -> None:
+        if self._conn is None:
+            return
+        self._conn.commit()
+        self._conn.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def discard(self) -> None:
+        """回滚还没提交的修改再关闭（命令行 batch 出错时用）：SqliteArchive 的增删直接写在当前事务里。"""
+        if self._conn is not None:
+            self._conn.rollback()
+        self.close()
+
+    def close(self) -> None:
+        if self._checkpointer is not None:
+            self._stop.set()
+            self._checkpointer.join()
+            self._checkpointer = None
+        if self._conn is not None:
+            self.flush()
+            self._conn.close()
+            self._conn = None
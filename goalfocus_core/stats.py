@@ -0,0 +1,250 @@
+import bisect
+from collections import Counter
+from datetime import date
+
+from goalfocus_core.model import Record, goal_long_term_ids, parse_ts
+
+# 每完成这么多张卡片获得一次删除机会
+CARDS_PER_DELETE_TOKEN = 5
+
+
+def delete_tokens(store: dict) -> tuple[int, int]:
+    """(累计完成卡片数, 当前可用的删除机会)。"""
+    total_completed = int(store.get("total_completed_count", 0) or 0)
+    tokens_used = int(store.get("delete_tokens_used", 0) or 0)
+    return total_completed, max(total_completed // CARDS_PER_DELETE_TOKEN - tokens_used, 0)
+
+
+def _epoch(item, key: str) -> int | None:
+    # 领域对象直接取 epoch 属性；普通 dict 才需要解析字符串
+    value = getattr(item, key) if isinstance(item, Record) else parse_ts(item.get(key))
+    return value if isinstance(value, int) else None
+
+
+def _day(ts: int) -> int:
+    """epoch 秒 -> 本地日期的序数（date.toordinal）。"""
+    return date.fromtimestamp(ts).toordinal()
+
+
+def _week(day: int) -> int:
+    """日期序数 -> 所在周周一的日期序数（序数 1 是周一）。"""
+    return day - (day - 1) % 7
+
+
+def _bump(counter: dict, key, delta: int) -> None:
+    n = counter.get(key, 0) + delta
+    if n > 0:
+        counter[key] = n
+    else:
+        counter.pop(key, None)
+
+
+def stat_entries(goals) -> Counter:
+    """
+    卡片对统计的贡献：{(种类, 长期目标 id 或 "", 键): 次数}，键是日期序数、周一的日期序数或用时秒数。
+    几张卡片的贡献相加就是它们的统计，所以可以按分片、按行分别保存，读取时直接合并。
+    """
+    entries = Counter()
+    for goal in goals:
+        entries["cards", "", 0] += 1
+        done_ts = _epoch(goal, "completed_at")
+        if done_ts is not None:
+            day = _day(done_ts)
+            entries["cards_day", "", day] += 1
+            entries["cards_week", "", _week(day)] += 1
+            for lt_id in goal_long_term_ids(goal):
+                entries["lt_week", lt_id, _week(day)] += 1
+            created_ts = _epoch(goal, "created_at")
+            if created_ts is not None and done_ts >= created_ts:
+                entries["duration", "", done_ts - created_ts] += 1
+        for a in goal.get("actions") or []:
+            ts = _epoch(a, "completed_at")
+            if ts is not None:
+                day = _day(ts)
+                entries["actions_day", "", day] += 1
+                entries["actions_week", "", _week(day)] += 1
+    return entries
+
+
+class ArchiveStats:
+    """
+    归档的统计聚合，随每次归档/删除增量更新（add / remove 是对称的）：
+    - 每天、每周完成的卡片数和关键动作数；
+    - 卡片从创建到完成用时的有序列表（取中位数 O(1)）；
+    - 有完成记录的日期集合（连续天数）；
+    - 每个长期目标按周的完成数（推进速度）。
+    查询只读这些聚合，开销与归档大小无关，只与统计覆盖的天数/周数有关。
+    存储引擎把 stat_entries 的结果和归档一起保存，启动时用 from_entries 还原，不用遍历归档。
+    """
+
+    def __init__(self):
+        # 遍历归档建统计时用来去重；从保存的结果还原时为 None，由调用方保证 add / remove 不重复
+        self._ids: set[str] | None = set()
+        self._count = 0
+        self.cards_by_day: dict[int, int] = {}
+        self.cards_by_week: dict[int, int] = {}
+        self.actions_by_day: dict[int, int] = {}
+        self.actions_by_week: dict[int, int] = {}
+        self._durations: list[int] = []
+        self._lt_weeks: dict[str, dict[int, int]] = {}
+        self._longest_streak: int | None = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    @classmethod
+    def from_entries(cls, rows) -> "ArchiveStats":
+        """rows 是 (种类, 长期目标 id, 键, 次数)，可以来自多个分片，同一项会相加。"""
+        stats = cls()
+        stats._ids = None
+        durations = []
+        for kind, ref, key, n in rows:
+            if kind == "duration":
+                durations.extend([key] * n)
+            else:
+                stats._bump(kind, ref, key, n)
+        stats._durations = sorted(durations)
+        return stats
+
+    def entries(self) -> list[tuple]:
+        """当前统计的 (种类, 长期目标 id, 键, 次数) 列表，from_entries 的逆运算。"""
+        rows = [("cards", "", 0, self._count)] if self._count else []
+        for kind, counter in (
+            ("cards_day", self.cards_by_day),
+            ("cards_week", self.cards_by_week),
+            ("actions_day", self.actions_by_day),
+            ("actions_week", self.actions_by_week),
+        ):
+            rows.extend((kind, "", key, n) for key, n in counter.items())
+        for lt_id, weeks in self._lt_weeks.items():
+            rows.extend(("lt_week", lt_id, week, n) for week, n in weeks.items())
+        rows.extend(("duration", "", d, n) for d, n in Counter(self._durations).items())
+        return rows
+
+    # ---------- 增量维护 ----------
+    def add(self, goal) -> None:
+        if self._ids is not None:
+            goal_id = goal.get("id")
+            if goal_id in self._ids:
+                return
+            self._ids.add(goal_id)
+        self.apply(stat_entries([goal]), 1)
+
+    def remove(self, goal) -> None:
+        if self._ids is not None:
+            goal_id = goal.get("id")
+            if goal_id not in self._ids:
+                return
+            self._ids.discard(goal_id)
+        self.apply(stat_entries([goal]), -1)
+
+    def apply(self, entries: dict, sign: int = 1) -> None:
+        """加上 entries（stat_entries 的格式；sign=-1 时减去），次数可以是负数。"""
+        for (kind, ref, key), n in entries.items():
+            delta = n * sign
+            if kind == "duration":
+                for _ in range(delta):
+                    bisect.insort(self._durations, key)
+                for _ in range(-delta):
+                    i = bisect.bisect_left(self._durations, key)
+                    if i < len(self._durations) and self._durations[i] == key:
+                        del self._durations[i]
+            else:
+                self._bump(kind, ref, key, delta)
+
+    def _bump(self, kind: str, ref: str, key: int, delta: int) -> None:
+        if kind == "cards":
+            self._count += delta
+        elif kind == "cards_day":
+            had_day = key in self.cards_by_day
+            _bump(self.cards_by_day, key, delta)
+            if (key in self.cards_by_day) != had_day:
+                # 有完成记录的日期集合变了，最长连续天数下次查询时重算
+                self._longest_streak = None
+        elif kind == "lt_week":
+            weeks = self._lt_weeks.setdefault(ref, {})
+            _bump(weeks, key, delta)
+            if not weeks:
+                del self._lt_weeks[ref]
+        else:
+            counter = {
+                "cards_week": self.cards_by_week,
+                "actions_day": self.actions_by_day,
+                "actions_week": self.actions_by_week,
+            }.get(kind)
+            if counter is not None:
+                _bump(counter, key, delta)
+
+    # ---------- 查询 ----------
+    @staticmethod
+    def _today(today: date | None) -> int:
+        return (today or date.today()).toordinal()
+
+    def per_day(self, counter: dict[int, int], days: int = 14, today: date | None = None) -> list[tuple[date, int]]:
+        """最近 days 天（含今天）的计数，按日期从早到晚。"""
+        end = self._today(today)
+        return [(date.fromordinal(d), counter.get(d, 0)) for d in range(end - days + 1, end + 1)]
+
+    def per_week(self, counter: dict[int, int], weeks: int = 8, today: date | None = None) -> list[tuple[date, int]]:
+        """最近 weeks 周（含本周）的计数，键为每周周一。"""
+        end = _week(self._today(today))
+        return [(date.fromordinal(w), counter.get(w, 0)) for w in range(end - 7 * (weeks - 1), end + 1, 7)]
+
+    def median_duration(self) -> float | None:
+        """卡片从创建到完成用时的中位数（秒）。"""
+        d = self._durations
+        if not d:
+            return None
+        mid = len(d) // 2
+        return float(d[mid]) if len(d) % 2 else (d[mid - 1] + d[mid]) / 2.0
+
+    def current_streak(self, today: date | None = None) -> int:
+        """截至今天的连续完成天数；今天还没完成时从昨天往前数。"""
+        day = self._today(today)
+        if day not in self.cards_by_day:
+            day -= 1
+        n = 0
+        while day in self.cards_by_day:
+            n += 1
+            day -= 1
+        return n
+
+    def longest_streak(self) -> int:
+        if self._longest_streak is None:
+            best = run = 0
+            prev = None
+            for day in sorted(self.cards_by_day):
+                run = run + 1 if prev is not None and day == prev + 1 else 1
+                best = max(best, run)
+                prev = day
+            self._longest_streak = best
+        return self._longest_streak
+
+    def long_term_velocity(self, lt_id: str, weeks: int = 4, today: date | None = None) -> dict:
+        """
+        长期目标的推进速度：
+        total —— 归档中关联该目标的卡片数；
+        per_week —— 从第一次完成那周到本周的平均每周完成数；
+        recent —— 最近 weeks 周的平均每周完成数。
+        """
+        counts = self._lt_weeks.get(lt_id) or {}
+        total = sum(counts.values())
+        this_week = _week(self._today(today))
+        if not counts:
+            return {"total": 0, "per_week": 0.0, "recent": 0.0}
+        span = (this_week - min(counts)) // 7 + 1
+        recent = sum(n for w, n in counts.items() if w > this_week - 7 * weeks)
+        return {"total": total, "per_week": total / span, "recent": recent / weeks}
+
+
+def format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "—"
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes} 分钟"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours} 小时 {minutes} 分钟"
+    days, hours = divmod(hours, 24)
+    return f"{days} 天 {hours} 小时"
@@ -0,0 +1,1032 @@
+import atexit
+import json
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections.abc import MutableSequence
+from datetime import datetime
+
+from goalfocus_core.locking import FileLock, LockError, file_signature
+from goalfocus_core.model import COLLECTION_TYPES, Goal, LongTermGoal, Template, goal_long_term_ids, json_default
+from goalfocus_core.profiling import traced
+from goalfocus_core.shards import (
+    ARCHIVE_FORMAT,
+    ARCHIVE_SUFFIX,
+    MANIFEST_FILE,
+    ShardedArchive,
+    encode_manifest,
+    encode_shard,
+    encode_shard_index,
+    read_manifest,
+    read_shard,
+    read_shard_index,
+    shard_index,
+    shard_index_path,
+    shard_month,
+    shard_path,
+    shard_search_path,
+    sort_months,
+)
+
+DATA_FILE = "goals_data.json"
+
+# 日志文件紧跟在快照文件旁边：goals_data.json.journal
+JOURNAL_SUFFIX = ".journal"
+# 多个进程（桌面程序、命令行）共用的锁文件：goals_data.json.lock
+LOCK_SUFFIX = ".lock"
+
+# 日志至少积累到这么大才会压缩回快照；之后按快照大小的一半动态放大阈值，
+# 保证每次写入的均摊成本只和变更大小有关。
+MIN_COMPACT_BYTES = 64 * 1024
+
+# 快照布局版本：2 表示 archive 是最后一个顶层字段，读取时可以只解析它前面的部分
+SNAPSHOT_FORMAT = 2
+ARCHIVE_MARKER = b'\n  "archive": '
+READ_CHUNK = 64 * 1024
+
+# 每次重写快照前保留的历史版本数：goals_data.json.bak1（最新）… .bak3
+BACKUP_COUNT = 3
+
+# 写线程的合并窗口：最后一次修改后静默这么久才落盘，一串连续操作只写一次。
+# 持续有修改时最多推迟 WRITE_MAX_DELAY 秒。可用环境变量 GOALFOCUS_WRITE_DELAY_MS 调整。
+WRITE_DELAY = int(os.environ.get("GOALFOCUS_WRITE_DELAY_MS", "400")) / 1000.0
+WRITE_MAX_DELAY = 2.0
+# 没拿到文件锁时，待写的修改留在写线程里，隔这么久再试
+LOCK_RETRY_DELAY = 1.0
+
+
+def now_str():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def finalize_store(store: dict) -> dict:
+    if "active_goal" in store:
+        # 旧版只有一张进行中的卡片
+        legacy = store.pop("active_goal")
+        if "active_goals" not in store:
+            store["active_goals"] = [legacy] if legacy else []
+    store.setdefault("active_goals", [])
+    store.setdefault("archive", [])
+    if "total_completed_count" not in store:
+        # 只在旧数据缺这个字段时才数归档（LazyArchive 取长度需要先解析）
+        store["total_completed_count"] = len(store["archive"])
+    store.setdefault("delete_tokens_used", 0)
+    store.setdefault("long_term_goals", [])
+    store.setdefault("templates", [])
+    return store
+
+
+def normalize_store(raw) -> dict:
+    """
+    把磁盘上读出的原始 JSON（新版 dict 或旧版 list）整理成完整的 store，
+    卡片、长期目标、模板都转成 model 里的领域对象（缺省字段在构造时补齐）。
+    """
+    if isinstance(raw, dict):
+        archive = raw.get("archive", [])
+        active = raw.get("active_goals")
+        if active is None:
+            active = [raw["active_goal"]] if raw.get("active_goal") else []
+        base = {
+            "active_goals": [Goal(g) for g in active],
+            "archive": archive if isinstance(archive, LazyArchive) else [Goal(g) for g in archive],
+            "long_term_goals": [LongTermGoal(x) for x in (raw.get("long_term_goals") or [])],
+            "templates": [Template(x) for x in (raw.get("templates") or [])],
+        }
+        if "total_completed_count" in raw:
+            base["total_completed_count"] = raw["total_completed_count"]
+        if "delete_tokens_used" in raw:
+            base["delete_tokens_used"] = raw["delete_tokens_used"]
+        return finalize_store(base)
+
+    if isinstance(raw, list):
+        active = []
+        archive = []
+        for g in raw:
+            g = Goal(g)
+            if not g.get("done") and not active:
+                active.append(g)
+            else:
+                archive.append(g)
+        return finalize_store({"active_goals": active, "archive": archive})
+
+    return finalize_store({"active_goals": [], "archive": []})
+
+
+# ---------- 持久化原语 ----------
+
+def fsync_dir(path: str) -> None:
+    # Windows 无法对目录 fsync，os.replace 本身已足够；POSIX 上需要把目录项也落盘
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """先写临时文件并 fsync，再原子替换；任何时刻 path 要么是旧内容，要么是新内容。"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(path)
+
+
+def backup_paths(path: str, count: int = BACKUP_COUNT) -> list[str]:
+    return [f"{path}.bak{i}" for i in range(1, count + 1)]
+
+
+def rotate_backups(path: str, count: int = BACKUP_COUNT) -> None:
+    if count <= 0 or not os.path.exists(path):
+        return
+    backups = backup_paths(path, count)
+    for older, newer in zip(reversed(backups[1:]), reversed(backups[:-1])):
+        if os.path.exists(newer):
+            os.replace(newer, older)
+    shutil.copyfile(path, backups[0])
+
+
+# ---------- 变更记录 ----------
+#
+# 界面上的每次修改都用一个小元组描述“改了什么”：
+#   ("set", key)             —— 顶层字段整体替换，如 total_completed_count
+#   ("put", coll, item_id)   —— 列表 coll 中按 id 新增或更新一项
+#   ("del", coll, item_id)   —— 列表 coll 中按 id 删除一项
+# 日志里保存的是变更发生时该字段/该项的值，因此重放是幂等的。
+
+def make_record(store: dict, change: tuple, positions: dict | None = None) -> dict | None:
+    """
+    positions 是同一批变更共用的缓存（列表名 -> {id: 下标}）：一批里有多个 put 时
+    （例如批量导入归档）每个列表只扫描一次。
+    """
+    op = change[0]
+    if op == "set":
+        key = change[1]
+        return {"op": "set", "key": key, "value": store.get(key)}
+    if op == "put":
+        coll, item_id = change[1], change[2]
+        items = store.get(coll)
+        if isinstance(items, ShardedArchive):
+            # 分片的归档：记下分片和分片内的下标，写线程据此只改这一个分片文件
+            found = items.locate(item_id)
+            if found is None:
+                return None
+            month, i, value = found
+            return {"op": "put", "coll": coll, "index": i, "shard": month, "value": value}
+        items = items or []
+        if positions is not None:
+            index_of = positions.get(coll)
+            if index_of is None:
+                index_of = positions[coll] = {x.get("id"): i for i, x in enumerate(items)}
+            i = index_of.get(item_id)
+            return None if i is None else {"op": "put", "coll": coll, "index": i, "value": items[i]}
+        for i, x in enumerate(items):
+            if x.get("id") == item_id:
+                return {"op": "put", "coll": coll, "index": i, "value": x}
+        return None
+    if op == "del":
+        rec = {"op": "del", "coll": change[1], "id": change[2]}
+        items = store.get(change[1])
+        month = items.removed_month(change[2]) if isinstance(items, ShardedArchive) else None
+        if month is not None:
+            rec["shard"] = month
+        return rec
+    return None
+
+
+def record_key(rec: dict) -> tuple:
+    """同一个 key 的记录后写覆盖先写，用于合并一段时间内的重复修改。"""
+    if rec["op"] == "set":
+        return ("set", rec["key"])
+    value = rec.get("value")
+    item_id = value.get("id") if value is not None else rec.get("id")
+    return (rec["coll"], item_id)
+
+
+def decode_value(rec: dict):
+    """日志记录里的值 -> 领域对象。"""
+    value = rec.get("value")
+    if rec["op"] == "set":
+        return Goal.coerce(value) if rec["key"] == "active_goal" else value
+    cls = COLLECTION_TYPES.get(rec["coll"])
+    return cls.coerce(value) if cls is not None else value
+
+
+def replay_records(store: dict, records, decode: bool = True) -> dict:
+    """
+    decode=False 时值保持原始 dict：后台压缩只是把快照和日志合并后重新写出，
+    不需要构造对象。
+    """
+    # 每个列表只建一次 id 集合，避免对大归档逐条线性查找
+    ids_by_coll: dict[str, set] = {}
+
+    def ids_of(coll: str) -> set:
+        ids = ids_by_coll.get(coll)
+        if ids is None:
+            ids = {x.get("id") for x in store.get(coll) or []}
+            ids_by_coll[coll] = ids
+        return ids
+
+    for rec in records:
+        op = rec.get("op")
+        if op == "set" and rec["key"] == "active_goal":
+            # 旧版日志：整体替换唯一一张进行中的卡片
+            value = decode_value(rec) if decode else rec.get("value")
+            store["active_goals"] = [value] if value else []
+            ids_by_coll.pop("active_goals", None)
+        elif op == "set":
+            store[rec["key"]] = decode_value(rec) if decode else rec.get("value")
+        elif op == "put":
+            coll = rec["coll"]
+            value = decode_value(rec) if decode else rec["value"]
+            vid = value.get("id")
+            items = store.setdefault(coll, [])
+            ids = ids_of(coll)
+            if vid in ids:
+                for i, x in enumerate(items):
+                    if x.get("id") == vid:
+                        items[i] = value
+                        break
+            else:
+                items.insert(min(int(rec.get("index", 0) or 0), len(items)), value)
+                ids.add(vid)
+        elif op == "del":
+            coll = rec["coll"]
+            ids = ids_of(coll)
+            if rec.get("id") in ids:
+                store[coll] = [x for x in store.get(coll) or [] if x.get("id") != rec["id"]]
+                ids.discard(rec["id"])
+    return store
+
+
+
+class LazyArchive(MutableSequence):
+    """
+    归档列表的延迟视图：启动时只持有快照里 archive 那一段原始字节，
+    由后台线程（start）或第一次访问时解析成 Goal 列表；属于归档的日志记录也推迟到解析后再重放。
+    解析完成前界面可以用 is_loaded() 判断，避免在启动路径上等待。
+    """
+
+    _SKIP = re.compile(r"[\s,]*")
+
+    def __init__(self, raw: bytes, records: list[dict] | None = None):
+        self._raw = raw
+        self._records = records or []
+        self._items: list | None = None
+        self._error: Exception | None = None
+        self._lock = threading.Lock()
+
+    def is_loaded(self) -> bool:
+        return self._items is not None
+
+    def defer_records(self, records: list[dict]) -> bool:
+        """还没解析时把归档的日志记录留到解析完再重放，返回 True；已经解析过返回 False。"""
+        with self._lock:
+            if self._items is not None:
+                return False
+            self._records.extend(records)
+            return True
+
+    def start(self, on_loaded=None) -> None:
+        """在后台线程解析；完成后（在该线程里）调用 on_loaded。"""
+
+        def run():
+            try:
+                self._ensure()
+            except Exception as e:
+                print(f"Error loading archive: {e}", file=sys.stderr)
+                return
+            if on_loaded is not None:
+                on_loaded()
+
+        threading.Thread(target=run, name="GoalFocusArchiveLoader", daemon=True).start()
+
+    def _ensure(self) -> list:
+        items = self._items
+        if items is not None:
+            return items
+        with self._lock:
+            if self._items is None:
+                if self._error is not None:
+                    raise self._error
+                try:
+                    self._items = self._parse()
+                except Exception as e:
+                    self._error = e
+                    raise
+                self._raw = None
+        return self._items
+
+    @traced("archive.parse")
+    def _parse(self) -> list:
+        # 逐条 raw_decode 而不是一次 json.loads：每条之间都会让出 GIL，界面线程不会被整段卡住
+        text = self._raw.decode("utf-8")
+        decoder = json.JSONDecoder()
+        skip = self._SKIP.match
+        pos = skip(text, text.index("[") + 1).end()
+        items = []
+        while text[pos] != "]":
+            value, pos = decoder.raw_decode(text, pos)
+            items.append(Goal(value))
+            pos = skip(text, pos).end()
+        if self._records:
+            items = replay_records({"archive": items}, self._records)["archive"]
+            self._records = []
+        return items
+
+    def __len__(self) -> int:
+        return len(self._ensure())
+
+    def __getitem__(self, index):
+        return self._ensure()[index]
+
+    def __iter__(self):
+        return iter(self._ensure())
+
+    def __setitem__(self, index, goal):
+        self._ensure()[index] = goal
+
+    def __delitem__(self, index):
+        del self._ensure()[index]
+
+    def insert(self, index: int, goal) -> None:
+        self._ensure().insert(index, goal)
+
+
+class JournalStore:
+    """
+    快照 + 追加日志的存储引擎：
+    - goals_data.json 是完整快照，格式与旧版一致（多一个 journal_id 字段）；
+    - goals_data.json.journal 每行一条变更记录，首行记录它所依附的快照 journal_id；
+    - 日志超过阈值后压缩：重写快照并清空日志。
+    旧版程序改写快照时会丢掉 journal_id，此时残留的日志会被识别为过期而忽略。
+
+    所有磁盘写入（追加、fsync、压缩、备份轮换）都在后台写线程里完成，
+    界面线程只负责把变更序列化成几行 JSON 放进队列。写线程在 write_delay
+    窗口内把同一对象的多次修改合并成一条，再一次性追加并 fsync。
+
+    归档按月分片存放在 goals_data.json.archive/ 下（见 shards 模块），快照里不再包含归档；
+    归档的记录由写线程先改对应的分片、再照常追加到日志（供其它进程并入）；写整份快照时
+    内存里改动过的分片（即已读入的分片）和清单在快照之前写出。因此分片格式的快照对应的日志里，
+    每条归档记录都已经在分片里了，加载和压缩时不需要重放。旧版的整份归档在第一次加载时拆成分片。
+
+    多进程：每次读写都持有 goals_data.json.lock。写线程在加锁后先检查文件签名
+    （mtime + 大小），其它进程追加的日志记录放进 external_changes，快照被整体替换时
+    要求重新加载；界面线程用 take_external 取走（见 GoalService.apply_external）。
+    自己排队中的修改总是写在这些记录之后，所以合并时同一对象以自己的修改为准。
+    """
+
+    def __init__(
+        self,
+        path: str = DATA_FILE,
+        min_compact_bytes: int = MIN_COMPACT_BYTES,
+        write_delay: float = WRITE_DELAY,
+    ):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.min_compact_bytes = min_compact_bytes
+        self.write_delay = write_delay
+        # 主文件损坏、改用备份恢复时记录备份路径，供界面提示
+        self.recovered_from: str | None = None
+        self._journal_id: str | None = None
+        self._snapshot_bytes = 0
+        self._journal_bytes = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = FileLock(path + LOCK_SUFFIX)
+        self.archive_dir = path + ARCHIVE_SUFFIX
+        self._manifest_path = os.path.join(self.archive_dir, MANIFEST_FILE)
+        # 以下由写线程维护（load 时在界面线程初始化）：
+        # 磁盘上日志的代次、已经读过/写过的日志字节数、上次同步后两份文件的签名
+        self._disk_id: str | None = None
+        self._offset = 0
+        self._seen_sig = None
+        # 自己的修改按 record 调用编号；_written_seq 是已经落盘的最大编号
+        self._seq = 0
+        self._written_seq = 0
+        self._key_seq: dict[tuple, int] = {}
+        # 其它进程的修改：("records", 记录列表, 读到它们时的 _written_seq) 或 ("reload",)
+        self.external_changes: queue.Queue = queue.Queue()
+        # 发现外部修改时（在写线程里）调用，用来唤醒界面线程
+        self.on_external = None
+        # close 之后界面的定时检查可能还会调用 poll，不能因此重新启动写线程
+        self._closed = False
+        # 磁盘上的快照是否为分片格式（由写线程维护）：是的话归档记录要先写进分片
+        self._sharded = False
+        # 需要整体重新加载、但还没有重新加载成功（例如没拿到文件锁）；load 成功后清除
+        self._reload_wanted = False
+
+    # ---------- 读取 ----------
+    @traced("storage.load")
+    def load(self, migrate: bool = True) -> dict:
+        """
+        migrate=False 时只读取：旧版的整份归档不拆分，磁盘上的文件保持原样（迁移到 SQLite 时用）。
+        拿不到文件锁时抛出 LockError，不会不加锁就读写。
+        """
+        self._closed = False
+        with self._lock:
+            raw, source = self._load_snapshot()
+            journal_id = raw.pop("journal_id", None) if isinstance(raw, dict) else None
+            sharded = isinstance(raw, dict) and raw.pop("archive_format", None) == ARCHIVE_FORMAT
+            store = normalize_store(raw)
+
+            if source == self.path:
+                self._journal_id = journal_id
+                records, self._offset = self._read_journal(journal_id) if journal_id else ([], 0)
+            else:
+                # 从备份恢复：日志里的记录都是幂等的整项写入，叠加到旧快照上只会更接近最新状态。
+                # 下一次写入会先把恢复后的数据重写成新快照。
+                self.recovered_from = source
+                self._journal_id = None
+                records, self._offset = self._read_journal(None)
+            self._disk_id = self._read_journal_header()
+            if self._disk_id != self._journal_id:
+                # 日志不属于这份快照（在替换快照和重置日志之间崩溃过）：追加进去的记录下次加载会被忽略，
+                # 所以第一次写入时先写完整快照
+                self._journal_id = None
+            self._seen_sig = self._file_signature()
+            self._key_seq = {}
+            self._sharded = sharded
+            if sharded:
+                # 日志里的归档记录都已经在分片里了（写线程保证，见类说明和 _write_snapshot）
+                records = [r for r in records if r.get("coll") != "archive"]
+                manifest = read_manifest(self.archive_dir)
+                if migrate:
+                    self._index_shards(manifest)
+                store["archive"] = ShardedArchive(self.archive_dir, manifest)
+            if records:
+                archive = store["archive"]
+                if isinstance(archive, LazyArchive) and not archive.is_loaded():
+                    # 归档相关的记录交给 LazyArchive，解析完再重放
+                    archive._records.extend(r for r in records if r.get("coll") == "archive")
+                    records = [r for r in records if r.get("coll") != "archive"]
+                replay_records(store, records)
+                self._journal_bytes = os.path.getsize(self.journal_path)
+            if not sharded:
+                if raw is None:
+                    # 没有快照（新数据目录，或快照和备份都读不出来）：第一次写入时写成分片格式；
+                    # 已有的分片照常使用，不能被空清单覆盖
+                    store["archive"] = ShardedArchive(self.archive_dir, read_manifest(self.archive_dir))
+                elif migrate:
+                    self._migrate_archive(store)
+        self._reload_wanted = False
+        return store
+
+    @traced("archive.migrate")
+    def _migrate_archive(self, store: dict) -> None:
+        """
+        旧版快照里的整份归档拆成按月的分片，再写一份不含归档的新快照（旧快照留在 .bak1）。
+        只在第一次加载旧数据时发生一次。调用方持有锁。
+        """
+        by_month: dict[str, list] = {}
+        for g in store["archive"]:
+            by_month.setdefault(shard_month(g), []).append(g)
+        os.makedirs(self.archive_dir, exist_ok=True)
+        counts = dict(read_manifest(self.archive_dir))
+        loaded = {}
+        for month, items in by_month.items():
+            if counts.get(month):
+                # 已经有分片（旧版程序在分片之后又整体写过快照）：同 id 以快照里的为准，其余保留
+                ids = {g["id"] for g in items}
+                items = items + [Goal(g) for g in read_shard(self.archive_dir, month) if g.get("id") not in ids]
+            self._write_shard(month, encode_shard(items), shard_index(items))
+            counts[month] = len(items)
+            loaded[month] = items
+        atomic_write_bytes(self._manifest_path, encode_manifest(counts))
+        manifest = [(m, counts[m]) for m in sort_months(counts) if counts[m] > 0]
+        store["archive"] = ShardedArchive(self.archive_dir, manifest, loaded)
+
+        journal_id = uuid.uuid4().hex
+        self._journal_id = journal_id
+        self._journal_bytes = 0
+        self._write_snapshot(journal_id, self._encode_snapshot(store, journal_id, sharded=True), True)
+
+    def _load_snapshot(self):
+        for candidate in [self.path] + backup_paths(self.path):
+            if not os.path.exists(candidate):
+                continue
+            try:
+                raw = self._read_snapshot(candidate)
+            except Exception as e:
+                print(f"Error loading {candidate}: {e}", file=sys.stderr)
+                if candidate == self.path:
+                    self._quarantine(candidate)
+                continue
+            self._snapshot_bytes = os.path.getsize(candidate)
+            return raw, candidate
+        return None, None
+
+    @staticmethod
+    def _read_snapshot(path: str):
+        """
+        按块读取，找到顶层的 "archive" 字段就停止解析：前面的部分（当前卡片、长期目标、模板等）
+        立即解析，archive 只保留原始字节交给 LazyArchive。旧布局的文件整体解析。
+        """
+        with open(path, "rb") as f:
+            buf = b""
+            pos = -1
+            while pos < 0:
+                chunk = f.read(READ_CHUNK)
+                if not chunk:
+                    break
+                start = max(len(buf) - len(ARCHIVE_MARKER), 0)
+                buf += chunk
+                pos = buf.find(ARCHIVE_MARKER, start)
+            if pos >= 0:
+                head = json.loads(buf[:pos].rstrip().rstrip(b",") + b"\n}")
+                if isinstance(head, dict) and head.pop("snapshot_format", None) == SNAPSHOT_FORMAT:
+                    # 只读字节不解析；LazyArchive 解析到数组的 "]" 为止，结尾的 "}" 不用去掉
+                    f.seek(pos + len(ARCHIVE_MARKER))
+                    tail = f.read()
+                    # 快照是原子替换的，正常不会截断；这里只对结尾做一次廉价的结构检查
+                    end = tail[-64:].rstrip()
+                    if not end.endswith(b"}") or not end[:-1].rstrip().endswith(b"]"):
+                        raise ValueError("archive section is truncated")
+                    head["archive"] = LazyArchive(tail)
+                    return head
+            raw = json.loads(buf + f.read())
+        if isinstance(raw, dict):
+            raw.pop("snapshot_format", None)
+        return raw
+
+    def _quarantine(self, path: str) -> None:
+        # 损坏的主文件不覆盖、不删除，改名留档，避免下次保存把残存数据冲掉
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        try:
+            os.replace(path, f"{path}.corrupt-{stamp}")
+        except OSError as e:
+            print(f"Error moving corrupt file aside: {e}", file=sys.stderr)
+
+    def _read_journal(self, journal_id: str | None) -> tuple[list[dict], int]:
+        """
+        返回 (记录, 读过的完整行的字节数)。journal_id 为 None 时不校验首行（备份恢复场景）。
+        """
+        if not os.path.exists(self.journal_path):
+            return [], 0
+        records = []
+        offset = 0
+        with open(self.journal_path, "rb") as f:
+            for n, line in enumerate(f):
+                if not line.endswith(b"\n"):
+                    # 写到一半的最后一行（崩溃/断电，或其它进程正在写）不算读过
+                    break
+                offset += len(line)
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                if n == 0:
+                    if rec.get("op") != "base":
+                        return [], offset
+                    if journal_id is not None and rec.get("journal_id") != journal_id:
+                        return [], offset
+                    continue
+                records.append(rec)
+        return records, offset
+
+    def _read_journal_header(self) -> str | None:
+        try:
+            with open(self.journal_path, "rb") as f:
+                rec = json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+        return rec.get("journal_id") if isinstance(rec, dict) and rec.get("op") == "base" else None
+
+    def _file_signature(self):
+        return file_signature(self.path), file_signature(self.journal_path)
+
+    # ---------- 写入（界面线程） ----------
+    @traced("storage.record")
+    def record(self, store: dict, changes) -> None:
+        """把一组变更追加到日志；尚无可用快照时改为写完整快照。"""
+        if self._journal_id is None:
+            self.compact(store)
+            return
+        lines = []
+        size = 0
+        self._seq += 1
+        # 一个 put 时直接线性查找；多个 put 时共用下标缓存
+        positions = {} if sum(1 for c in changes if c[0] == "put") > 1 else None
+        for change in changes:
+            rec = make_record(store, change, positions)
+            if rec is not None:
+                # 在界面线程立刻序列化：之后界面继续修改同一个 dict 也不会影响已排队的记录
+                line = json.dumps(rec, ensure_ascii=False, separators=(",", ":"), default=json_default) + "\n"
+                line = line.encode("utf-8")
+                key = record_key(rec)
+                lines.append((key, line))
+                self._key_seq[key] = self._seq
+                size += len(line)
+        if not lines:
+            return
+        self._submit("append", (lines, self._seq))
+
+        self._journal_bytes += size
+        if self._journal_bytes > max(self.min_compact_bytes, self._snapshot_bytes // 2):
+            self._journal_bytes = 0
+            self._submit("compact", None)
+
+    def compact(self, store: dict) -> None:
+        """
+        用内存中的 store 重写完整快照（首次写入、从备份恢复后、显式保存时使用）。
+        分片的归档把已读入的分片一起写出（没读入的分片没有改动），与快照在同一次加锁中完成。
+        """
+        journal_id = uuid.uuid4().hex
+        self._journal_id = journal_id
+        self._journal_bytes = 0
+        # 别的文件的分片归档（例如 save_data 另存到其它路径）按旧格式整份写进快照，下次加载时再拆分
+        archive = store.get("archive")
+        sharded = isinstance(archive, ShardedArchive) and os.path.abspath(archive.directory) == os.path.abspath(
+            self.archive_dir
+        )
+        shards = None
+        if sharded:
+            # 在界面线程序列化，理由同 record
+            shards = {
+                month: (encode_shard(items), len(items), shard_index(items))
+                for month, items in archive.loaded_shards().items()
+            }
+        self._submit("snapshot", (journal_id, self._encode_snapshot(store, journal_id, sharded), sharded, shards))
+
+    def poll(self) -> None:
+        """请写线程检查其它进程的修改（界面定时调用）；文件签名没变时几乎没有开销。"""
+        if self._closed:
+            return
+        if self._reload_wanted and self.on_external is not None:
+            self.on_external()
+        self._submit("poll", None)
+
+    def take_external(self, store: dict) -> tuple[bool, list[dict]]:
+        """
+        界面线程调用：取走其它进程的修改，返回 (是否需要整体重新加载, 需要并入的记录)。
+        同一对象自己也改过、且自己的修改落盘在后的记录会被跳过；
+        归档还没解析时，归档记录交给 LazyArchive 解析完再重放。
+        """
+        reload = False
+        records = []
+        while True:
+            try:
+                event = self.external_changes.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == "reload":
+                reload = True
+                continue
+            _, batch, written_seq = event
+            records.extend(r for r in batch if self._key_seq.get(record_key(r), 0) <= written_seq)
+        if reload or self._reload_wanted:
+            self._reload_wanted = True
+            return True, []
+        archive = store.get("archive")
+        if isinstance(archive, LazyArchive) and not archive.is_loaded():
+            if archive.defer_records([r for r in records if r.get("coll") == "archive"]):
+                records = [r for r in records if r.get("coll") != "archive"]
+        return False, records
+
+    def flush(self) -> None:
+        """跳过合并窗口，阻塞直到已提交的修改全部落盘。"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait()
+
+    def close(self) -> None:
+        """落盘并结束写线程；可重复调用。退出程序前必须调用（也注册在 atexit 中兜底）。"""
+        self._closed = True
+        if self._thread is None:
+            return
+        self._queue.put(("stop", None))
+        self._thread.join()
+        self._thread = None
+        atexit.unregister(self.close)
+
+    def discard(self) -> None:
+        """放弃还没交给 record 的修改并关闭；JSON 引擎的修改只在 record 时写出，这里等同于 close。"""
+        self.close()
+
+    def _submit(self, kind: str, payload) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="GoalFocusWriter", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        self._queue.put((kind, payload))
+
+    @staticmethod
+    @traced("snapshot.encode")
+    def _encode_snapshot(store: dict, journal_id: str, sharded: bool = False) -> bytes:
+        # archive 放在最后，读取时才能只解析前面的小字段（见 _read_snapshot）
+        snapshot = {"snapshot_format": SNAPSHOT_FORMAT, "journal_id": journal_id}
+        for key, value in store.items():
+            if key not in ("archive", "journal_id", "snapshot_format", "archive_format"):
+                snapshot[key] = value
+        if sharded:
+            snapshot["archive_format"] = ARCHIVE_FORMAT
+        else:
+            snapshot["archive"] = list(store.get("archive") or [])
+        return json.dumps(snapshot, ensure_ascii=False, indent=2, default=json_default).encode("utf-8")
+
+    # ---------- 写入（后台写线程） ----------
+    def _run(self) -> None:
+        # key -> 序列化后的记录；dict 覆盖已有 key 时保留首次出现的位置，
+        # 因此“先插入后修改”合并后仍按插入时的顺序重放
+        pending: dict[tuple, bytes] = {}
+        pending_seq = 0
+        first_at = deadline = 0.0
+        while True:
+            timeout = max(deadline - time.monotonic(), 0.0) if pending else None
+            try:
+                kind, payload = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if not self._write_pending(pending, pending_seq):
+                    deadline = time.monotonic() + LOCK_RETRY_DELAY
+                continue
+
+            if kind == "append":
+                now = time.monotonic()
+                if not pending:
+                    first_at = now
+                lines, pending_seq = payload
+                pending.update(lines)
+                deadline = min(now + self.write_delay, first_at + WRITE_MAX_DELAY)
+                continue
+            if kind == "poll":
+                # 不打断合并窗口；有待写的修改时，写入前本来就会检查一次
+                if not pending and self._file_signature() != self._seen_sig:
+                    try:
+                        with self._lock:
+                            self._sync_external()
+                    except LockError:
+                        pass  # 下一次检查再同步
+                continue
+
+            # 其余命令都要求之前的修改先落盘
+            if not self._write_pending(pending, pending_seq):
+                deadline = time.monotonic() + LOCK_RETRY_DELAY
+                if kind == "stop":
+                    print(f"Error saving data: {len(pending)} change(s) could not be written", file=sys.stderr)
+                    return
+                # 快照和压缩同样要加锁，等待写的修改落盘后再做
+                if kind == "flush":
+                    payload.set()
+                continue
+            if kind == "stop":
+                return
+            try:
+                if kind == "snapshot":
+                    with self._lock:
+                        # 其它进程刚追加、还不在内存快照里的记录接到新日志后面，不会丢
+                        tail = self._sync_external()
+                        self._write_snapshot(*payload, tail=tail or b"")
+                elif kind == "compact":
+                    self._compact_from_disk()
+            except Exception as e:
+                print(f"Error saving data: {e}", file=sys.stderr)
+            if kind == "flush":
+                payload.set()
+
+    @traced("journal.append")
+    def _write_pending(self, pending: dict, seq: int) -> bool:
+        """返回 False 表示没拿到文件锁：修改原样留在 pending 里，由调用方稍后重试。"""
+        if not pending:
+            return True
+        try:
+            with self._lock:
+                self._append_locked(pending, seq)
+        except LockError as e:
+            print(f"Error appending journal: {e}, will retry", file=sys.stderr)
+            return False
+        return True
+
+    def _append_locked(self, pending: dict, seq: int) -> None:
+        archive_lines = [line for key, line in pending.items() if key[0] == "archive"]
+        data = b"".join(pending.values())
+        pending.clear()
+        # 先读走其它进程追加的记录，再把自己的写在它们后面
+        self._sync_external()
+        try:
+            if archive_lines and self._sharded:
+                # 先改分片再追加日志：日志里出现的归档记录，分片里一定已经有了
+                self._write_shards([json.loads(line) for line in archive_lines])
+            # 不长期占用文件句柄：其它进程压缩时要原子替换日志（Windows 上打开的文件不能被替换）
+            with open(self.journal_path, "ab") as f:
+                if f.tell() > self._offset:
+                    # 持有锁时还在的不完整末行只能是崩溃留下的半行：截掉，否则新记录会接在它后面读不出来
+                    f.truncate(self._offset)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                self._offset = f.tell()
+        except Exception as e:
+            print(f"Error appending journal: {e}", file=sys.stderr)
+            return
+        self._written_seq = seq
+        self._seen_sig = self._file_signature()
+
+    def _sync_external(self) -> bytes | None:
+        """
+        持有锁时在写线程里调用：把上次同步之后其它进程写入的内容交给界面线程，返回这些记录的原始行。
+        快照被替换（其它进程压缩过，或旧版程序整体改写）时无法增量合并，返回 None 并要求重新加载。
+        """
+        sig = self._file_signature()
+        if sig == self._seen_sig:
+            return b""
+        disk_id = self._read_journal_header()
+        size = sig[1][1] if sig[1] is not None else 0
+        if self._seen_sig is None:
+            # 没有 load 过（save_data 等一次性写入），没有需要通知的界面
+            self._disk_id, self._offset, self._seen_sig = disk_id, size, sig
+            return b""
+        if sig[0] != self._seen_sig[0] or disk_id != self._disk_id or size < self._offset:
+            self._disk_id = disk_id
+            self._offset = size
+            self._seen_sig = sig
+            self._notify_external(("reload",))
+            return None
+        data = b""
+        records = []
+        if size > self._offset:
+            with open(self.journal_path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read(size - self._offset)
+            # 只取完整的行；写到一半的留到下次
+            data = data[:data.rfind(b"\n") + 1]
+            for line in data.splitlines():
+                line = line.strip()
+                if line:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        pass
+            self._offset += len(data)
+        self._seen_sig = sig
+        if records:
+            self._notify_external(("records", records, self._written_seq))
+        return data
+
+    @traced("archive.shard_write")
+    def _write_shards(self, records: list[dict]) -> None:
+        """把归档记录应用到对应的分片文件：只读写涉及到的月份，再更新清单。调用方持有锁。"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        counts = dict(read_manifest(self.archive_dir))
+        shards: dict[str, dict] = {}
+
+        def shard(month: str) -> dict:
+            if month not in shards:
+                shards[month] = {"archive": read_shard(self.archive_dir, month)}
+            return shards[month]
+
+        by_month: dict[str, list] = {}
+        for rec in records:
+            month = rec.get("shard")
+            if month is None and rec.get("op") == "put":
+                month = shard_month(rec["value"])
+            if month is None:
+                # 不知道在哪个分片的删除（其它进程的旧记录）：从新到旧找，通常第一个分片就命中
+                month = next(
+                    (m for m in sort_months(counts) if any(g.get("id") == rec.get("id") for g in shard(m)["archive"])),
+                    None,
+                )
+                if month is None:
+                    continue
+            by_month.setdefault(month, []).append(rec)
+
+        for month, recs in by_month.items():
+            items = replay_records(shard(month), recs, decode=False)["archive"]
+            self._write_shard(month, encode_shard(items) if items else None, shard_index(items))
+            counts[month] = len(items)
+        atomic_write_bytes(self._manifest_path, encode_manifest(counts))
+
+    def _write_shard(self, month: str, content: bytes | None, index: dict) -> None:
+        """写出一个分片和它的两个附属文件（见 shards 模块说明）；content 为 None 时全部删除。调用方持有锁。"""
+        path = shard_path(self.archive_dir, month)
+        if content is None:
+            for p in (path, shard_search_path(self.archive_dir, month), shard_index_path(self.archive_dir, month)):
+                if os.path.exists(p):
+                    os.remove(p)
+            return
+        atomic_write_bytes(path, content)
+        self._write_shard_index(month, file_signature(path), index)
+
+    def _write_shard_index(self, month: str, signature, index: dict) -> None:
+        index_data, search_data = encode_shard_index(signature, index)
+        atomic_write_bytes(shard_search_path(self.archive_dir, month), search_data)
+        atomic_write_bytes(shard_index_path(self.archive_dir, month), index_data)
+
+    def _index_shards(self, manifest: list[tuple[str, int]]) -> None:
+        """给还没有附属文件（旧版本写的分片）或附属文件已过期的分片补写一份，每个分片只需要一次。调用方持有锁。"""
+        for month, _ in manifest:
+            if read_shard_index(self.archive_dir, month) is not None:
+                continue
+            signature = file_signature(shard_path(self.archive_dir, month))
+            if signature is None:
+                continue
+            try:
+                self._write_shard_index(month, signature, shard_index(read_shard(self.archive_dir, month)))
+            except (OSError, ValueError) as e:
+                print(f"Error indexing archive shard {month}: {e}", file=sys.stderr)
+
+    def _notify_external(self, event: tuple) -> None:
+        self.external_changes.put(event)
+        if self.on_external is not None:
+            self.on_external()
+
+    @traced("snapshot.write")
+    def _write_snapshot(
+        self,
+        journal_id: str,
+        data: bytes,
+        sharded: bool = False,
+        shards: dict[str, tuple[bytes, int, dict]] | None = None,
+        tail: bytes = b"",
+    ) -> None:
+        """
+        调用方持有锁。sharded 表示快照不含归档（归档在分片里）；shards 是要一起写出的分片
+        {月份: (内容, 张数, shard_index)}，张数为 0 时删除文件；tail 是新日志里紧跟首行的记录。
+        分片和清单先于快照写出：快照一旦换成分片格式，它引用的归档就都已经在分片里了。
+        """
+        if sharded and (shards or not os.path.exists(self._manifest_path)):
+            os.makedirs(self.archive_dir, exist_ok=True)
+            counts = dict(read_manifest(self.archive_dir))
+            for month, (content, count, index) in (shards or {}).items():
+                self._write_shard(month, content if count else None, index)
+                counts[month] = count
+            atomic_write_bytes(self._manifest_path, encode_manifest(counts))
+        rotate_backups(self.path)
+        atomic_write_bytes(self.path, data)
+        self._snapshot_bytes = len(data)
+        # 快照替换成功后再重置日志；若在两步之间崩溃，旧日志的 journal_id 对不上，会被忽略
+        header = (json.dumps({"op": "base", "journal_id": journal_id}) + "\n").encode("utf-8")
+        atomic_write_bytes(self.journal_path, header + tail)
+        self._disk_id = journal_id
+        self._offset = len(header) + len(tail)
+        self._seen_sig = self._file_signature()
+        self._sharded = sharded
+
+    @traced("journal.compact")
+    def _compact_from_disk(self) -> None:
+        """后台压缩：直接从磁盘读快照 + 日志合并，不触碰界面线程持有的 store。"""
+        with self._lock:
+            if self._sync_external() is None:
+                # 其它进程刚压缩过
+                return
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            if isinstance(raw, dict):
+                raw.pop("snapshot_format", None)
+            journal_id = raw.pop("journal_id", None) if isinstance(raw, dict) else None
+            if not journal_id:
+                return
+            sharded = raw.pop("archive_format", None) == ARCHIVE_FORMAT
+            store = finalize_store(raw)
+            records = self._read_journal(journal_id)[0]
+            if sharded:
+                # 分片格式下快照很小，压缩只是把日志里的非归档记录合并进去
+                records = [r for r in records if r.get("coll") != "archive"]
+            replay_records(store, records, decode=False)
+            # 界面线程可能已经排队了下一次 compact（改了 _journal_id）；这里只换日志文件的代次
+            new_id = uuid.uuid4().hex
+            self._write_snapshot(new_id, self._encode_snapshot(store, new_id, sharded), sharded)
+
+
+def open_storage(engine: str | None = None, directory: str | None = None):
+    """
+    选择存储引擎："json"（默认，快照 + 日志）或 "sqlite"。
+    未指定时读环境变量 GOALFOCUS_STORAGE；已经迁移过的 SQLite 数据库会被自动沿用。
+    directory 是数据所在的目录，默认为当前档案的目录（见 profiles 模块）。
+    """
+    from goalfocus_core.profiles import ProfileManager
+    from goalfocus_core.sqlite_store import SQLITE_FILE, SqliteStore
+
+    if directory is None:
+        directory = ProfileManager().directory()
+    json_path = os.path.join(directory, DATA_FILE)
+    sqlite_path = os.path.join(directory, SQLITE_FILE)
+    engine = engine or os.environ.get("GOALFOCUS_STORAGE")
+    if not engine:
+        engine = "sqlite" if os.path.exists(sqlite_path) else "json"
+    if engine == "sqlite":
+        return SqliteStore(sqlite_path, json_path=json_path)
+    return JournalStore(json_path)
+
+
+def load_data(path: str = DATA_FILE) -> dict:
+    return JournalStore(path).load()
+
+
+def save_data(store, path: str = DATA_FILE):
+    storage = JournalStore(path)
+    storage.compact(store)
+    storage.close()
@@ -1,8 +1,11 @@
 import sys
 import os
-import json
-import uuid
-from datetime import datetime
+import hashlib
+import threading
+import time
+
+# 进程启动的参考时刻，用于统计首帧耗时（尽量靠前，把 Qt 的导入也算进去）
+STARTUP_T0 = time.perf_counter()
 
 from PySide6.QtWidgets import (
     QApplication,
@@ -15,12 +18,12 @@ from PySide6.QtWidgets import (
     QLabel,
     QLineEdit,
     QPushButton,
+    QListView,
     QListWidget,
     QListWidgetItem,
     QProgressBar,
     QTextEdit,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QHeaderView,
     QMessageBox,
     QAbstractItemView,
@@ -33,24 +36,52 @@ from PySide6.QtWidgets import (
     QFrame,
     QSystemTrayIcon,
     QSizePolicy,
+    QComboBox,
+    QInputDialog,
 )
 from PySide6.QtCore import (
     Qt,
+    QAbstractListModel,
+    QAbstractTableModel,
+    QBuffer,
+    QByteArray,
+    QModelIndex,
     QTimer,
     QUrl,
+    Signal,
     QSize,
+    QPoint,
     QRect,
     QPropertyAnimation,
 )
-from PySide6.QtGui import QCloseEvent, QPixmap, QMovie, QColor, QBrush, QIcon
-from PySide6.QtMultimedia import QAudioOutput, QMediaPlayer
+from PySide6.QtGui import (
+    QCloseEvent,
+    QPixmap,
+    QMovie,
+    QColor,
+    QBrush,
+    QFont,
+    QIcon,
+    QImage,
+    QImageReader,
+    QKeySequence,
+    QShortcut,
+)
+from PySide6.QtNetwork import QAbstractSocket, QLocalServer, QLocalSocket
 
 try:
     import winsound
 except ImportError:
     winsound = None
 
-DATA_FILE = "goals_data.json"
+from goalfocus_core import analytics, profiling
+from goalfocus_core.locking import LockError
+from goalfocus_core.profiling import traced, tracer
+from goalfocus_core.service import GoalError, GoalService
+from goalfocus_core.shards import ShardedArchive
+from goalfocus_core.stats import format_duration
+from goalfocus_core.profiles import DEFAULT_PROFILE, ProfileManager, data_root
+from goalfocus_core.storage import open_storage
 
 
 def resource_path(relative_path: str) -> str:
@@ -68,9 +99,10 @@ REWARD_BADGE_PATH = resource_path("pic.png")
 REWARD_SOUND_PATH = resource_path("sound.mp3")
 APP_ICON_PATH = resource_path("logo.ico")
 
-
-def now_str():
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+# 规划页摘要最多列出多少个未完成的关键动作（长清单卡片只显示开头）
+SUMMARY_MAX_ACTIONS = 10
+# 多久检查一次其它进程（命令行等）对数据文件的修改，毫秒
+EXTERNAL_POLL_MS = 2000
 
 
 def strip_leading_number(text: str) -> str:
@@ -108,130 +140,424 @@ def text_color_for_bg(hex_color: str) -> str:
     return "#111111" if luminance > 0.62 else "#FFFFFF"
 
 
-def finalize_store(store: dict) -> dict:
-    store.setdefault("active_goal", None)
-    store.setdefault("archive", [])
-    store.setdefault("total_completed_count", len(store["archive"]))
-    store.setdefault("delete_tokens_used", 0)
-    store.setdefault("long_term_goals", [])
-    store.setdefault("templates", [])
-    return store
+class CelebrationAssets:
+    """
+    庆祝动画素材缓存：
+    - 奖杯图只解码一次，按（显示尺寸, 屏幕 DPR）缓存缩放结果；
+    - GIF 文件内容常驻内存，QMovie 按显示尺寸复用；预计帧缓存不超过
+      MOVIE_CACHE_LIMIT 时缓存全部帧，否则每次播放逐帧解码（但不再读盘）。
+    启动后在后台线程预热：QImage 可以在非界面线程解码和缩放，QPixmap / QMovie 只在界面线程创建。
+    """
 
+    BADGE_SIZES = (140, 720)
+    MOVIE_CACHE_LIMIT = 96 * 1024 * 1024
 
-def load_data():
-    if not os.path.exists(DATA_FILE):
-        return finalize_store({"active_goal": None, "archive": []})
-    try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            raw = json.load(f)
-    except Exception:
-        return finalize_store({"active_goal": None, "archive": []})
-
-    def ensure_goal_fields(goal: dict) -> dict:
-        if "id" not in goal:
-            goal["id"] = str(uuid.uuid4())
-        goal.setdefault("long_term", "")
-        goal.setdefault("long_term_goal_id", None)
-        goal.setdefault("long_term_goal_ids", [])
-        if not goal["long_term_goal_ids"] and goal.get("long_term_goal_id"):
-            goal["long_term_goal_ids"] = [goal["long_term_goal_id"]]
-
-        goal.setdefault("current_goal", "")
-        goal.setdefault("done", False)
-        goal.setdefault("created_at", now_str())
-        goal.setdefault("completed_at", None)
-
-        actions = goal.get("actions") or []
-        fixed_actions = []
-        for a in actions:
-            if "id" not in a:
-                a["id"] = str(uuid.uuid4())
-            a.setdefault("text", "")
-            a.setdefault("done", False)
-            a.setdefault("created_at", now_str())
-            a.setdefault("completed_at", None)
-            fixed_actions.append(a)
-        goal["actions"] = fixed_actions
-        return goal
-
-    def ensure_long_term_goal_fields(g: dict) -> dict:
-        if "id" not in g:
-            g["id"] = str(uuid.uuid4())
-        g.setdefault("title", "")
-        g.setdefault("target_count", 100)
-        g.setdefault("completed_count", 0)
-        g.setdefault("created_at", now_str())
-        g.setdefault("completed_at", None)
-        return g
-
-    def ensure_template_fields(t: dict) -> dict:
-        if "id" not in t:
-            t["id"] = str(uuid.uuid4())
-        t.setdefault("name", "")
-        t.setdefault("long_term_text", "")
-        t.setdefault("long_term_goal_id", None)
-        t.setdefault("long_term_goal_ids", [])
-        if not t["long_term_goal_ids"] and t.get("long_term_goal_id"):
-            t["long_term_goal_ids"] = [t["long_term_goal_id"]]
-        t.setdefault("current_goal", "")
-        t.setdefault("actions_texts", [])
-        t.setdefault("created_at", now_str())
-        return t
-
-    if isinstance(raw, dict):
-        active = raw.get("active_goal")
-        archive = raw.get("archive", [])
-        if active is not None:
-            active = ensure_goal_fields(active)
-        fixed_archive = [ensure_goal_fields(g) for g in archive]
-
-        base = {
-            "active_goal": active,
-            "archive": fixed_archive,
-            "long_term_goals": [ensure_long_term_goal_fields(x) for x in (raw.get("long_term_goals") or [])],
-            "templates": [ensure_template_fields(x) for x in (raw.get("templates") or [])],
-        }
-        if "total_completed_count" in raw:
-            base["total_completed_count"] = raw["total_completed_count"]
-        if "delete_tokens_used" in raw:
-            base["delete_tokens_used"] = raw["delete_tokens_used"]
-        return finalize_store(base)
-
-    if isinstance(raw, list):
-        active = None
-        archive = []
-        for g in raw:
-            g = ensure_goal_fields(g)
-            if not g.get("done") and active is None:
-                active = g
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._badge_source: QImage | None = None
+        self._badge_images: dict[tuple[int, float], QImage] = {}
+        self._badge_pixmaps: dict[tuple[int, float], QPixmap] = {}
+        self._gif_data: QByteArray | None = None
+        self._gif_frames = 0
+        self._gif_size = QSize()
+        self._movies: dict[tuple[int, int], QMovie] = {}
+
+    def warm_up(self, dpr: float):
+        threading.Thread(target=self._warm, args=(dpr,), name="GoalFocusAssets", daemon=True).start()
+
+    def _warm(self, dpr: float):
+        for size in self.BADGE_SIZES:
+            self._badge_image(size, dpr)
+        with self._lock:
+            # 常用尺寸都已缩放好，原图（2000x2000，约 16MB）不必常驻
+            self._badge_source = None
+        self._load_gif()
+
+    def _badge_image(self, size: int, dpr: float) -> QImage | None:
+        key = (size, dpr)
+        with self._lock:
+            image = self._badge_images.get(key)
+            if image is not None:
+                return image
+            if self._badge_source is None:
+                if not (REWARD_BADGE_PATH and os.path.exists(REWARD_BADGE_PATH)):
+                    return None
+                source = QImage(REWARD_BADGE_PATH)
+                if source.isNull():
+                    return None
+                self._badge_source = source
+            px = int(size * dpr)
+            image = self._badge_source.scaled(px, px, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            image.setDevicePixelRatio(dpr)
+            self._badge_images[key] = image
+            return image
+
+    def badge(self, size: int, dpr: float) -> QPixmap | None:
+        key = (size, dpr)
+        pix = self._badge_pixmaps.get(key)
+        if pix is None:
+            image = self._badge_image(size, dpr)
+            if image is None:
+                return None
+            pix = QPixmap.fromImage(image)
+            self._badge_pixmaps[key] = pix
+        return pix
+
+    def _load_gif(self):
+        with self._lock:
+            if self._gif_data is not None:
+                return
+            if not (REWARD_ANIMATION_GIF_PATH and os.path.exists(REWARD_ANIMATION_GIF_PATH)):
+                self._gif_data = QByteArray()
+                return
+            reader = QImageReader(REWARD_ANIMATION_GIF_PATH)
+            self._gif_frames = max(reader.imageCount(), 1)
+            self._gif_size = reader.size()
+            with open(REWARD_ANIMATION_GIF_PATH, "rb") as f:
+                self._gif_data = QByteArray(f.read())
+
+    def movie(self, width: int, height: int) -> QMovie | None:
+        key = (width, height)
+        movie = self._movies.get(key)
+        if movie is not None:
+            movie.stop()
+            movie.jumpToFrame(0)
+            return movie
+        self._load_gif()
+        if self._gif_data.isEmpty():
+            return None
+        movie = QMovie()
+        buffer = QBuffer(movie)
+        buffer.setData(self._gif_data)
+        movie.setDevice(buffer)
+        movie.setScaledSize(QSize(width, height))
+        frame_bytes = width * height * 4
+        if frame_bytes * self._gif_frames <= self.MOVIE_CACHE_LIMIT:
+            movie.setCacheMode(QMovie.CacheAll)
+        self._movies[key] = movie
+        return movie
+
+
+class CelebrationOverlay(QWidget):
+    """
+    常驻的庆祝浮层：每种 kind 只构造一次，之后反复 show / hide。
+    - "action"：屏幕中央的小窗（动效 + 奖杯 + 文案），停留后淡出；
+    - "card"：覆盖整个屏幕的动效，中央奖杯 + 大字文案，停留后关闭。
+    显示期间再次触发时只更新文案（附带连续次数）并重新计时，不新建窗口。
+    """
+
+    HOLD_MS = {"action": 2600, "card": 3920}
+    FADE_MS = 600
+    ACTION_SIZE = QSize(900, 520)
+    ACTION_MOVIE_SIZE = QSize(640, 360)
+
+    def __init__(self, kind: str, assets: CelebrationAssets):
+        super().__init__(None, Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
+        self.setAttribute(Qt.WA_TranslucentBackground, True)
+        self.kind = kind
+        self.assets = assets
+        self._movie: QMovie | None = None
+        self._text = ""
+        self._repeat = 0
+
+        self._hold_timer = QTimer(self)
+        self._hold_timer.setSingleShot(True)
+        self._hold_timer.timeout.connect(self._on_hold_finished)
+
+        self._fade = QPropertyAnimation(self, b"windowOpacity", self)
+        self._fade.setDuration(self.FADE_MS)
+        self._fade.setStartValue(1.0)
+        self._fade.setEndValue(0.0)
+        self._fade.finished.connect(self.dismiss)
+
+        if kind == "card":
+            self._build_card()
+        else:
+            self._build_action()
+
+    def _build_action(self):
+        root_layout = QVBoxLayout(self)
+        root_layout.setContentsMargins(0, 0, 0, 0)
+        root_layout.setSpacing(10)
+        root_layout.setAlignment(Qt.AlignCenter)
+
+        self.anim_label = QLabel()
+        size = self.ACTION_MOVIE_SIZE
+        self.anim_label.setMinimumSize(size)
+        self.anim_label.setMaximumSize(size)
+        self.anim_label.setScaledContents(True)
+        root_layout.addWidget(self.anim_label, alignment=Qt.AlignCenter)
+
+        self.anim_fallback = QLabel("🎉")
+        self.anim_fallback.setStyleSheet("font-size: 44px; color: white;")
+        root_layout.addWidget(self.anim_fallback, alignment=Qt.AlignCenter)
+
+        self.badge_label = QLabel()
+        self.badge_label.setAlignment(Qt.AlignCenter)
+        self.badge_label.setStyleSheet("background: transparent;")
+        root_layout.addWidget(self.badge_label, alignment=Qt.AlignCenter)
+
+        self.msg_label = QLabel()
+        self.msg_label.setStyleSheet(
+            "color: #F5F1DC; font-size: 22px; "
+            "background-color: rgba(255,144,19,230); "
+            "padding: 14px 28px; border-radius: 14px;"
+        )
+        self.msg_label.setWordWrap(True)
+        self.msg_label.setAlignment(Qt.AlignCenter)
+        self.msg_label.setMinimumWidth(520)
+        self.msg_label.setMaximumWidth(920)
+        root_layout.addWidget(self.msg_label, alignment=Qt.AlignCenter)
+
+    def _build_card(self):
+        self.anim_label = QLabel(self)
+        self.anim_label.setScaledContents(True)
+
+        self.anim_fallback = QLabel("🎉", self)
+        self.anim_fallback.setAlignment(Qt.AlignCenter)
+        self.anim_fallback.setStyleSheet("font-size: 72px; color: white;")
+
+        self.info_box = QWidget(self)
+        self.info_box.setAttribute(Qt.WA_TranslucentBackground, True)
+        info_layout = QVBoxLayout(self.info_box)
+        info_layout.setContentsMargins(16, 16, 16, 16)
+        info_layout.setSpacing(18)
+        info_layout.setAlignment(Qt.AlignCenter)
+
+        self.badge_label = QLabel(self.info_box)
+        self.badge_label.setAlignment(Qt.AlignCenter)
+        self.badge_label.setStyleSheet("background: transparent;")
+        info_layout.addWidget(self.badge_label, alignment=Qt.AlignCenter)
+
+        self.msg_label = QLabel(self.info_box)
+        self.msg_label.setWordWrap(True)
+        self.msg_label.setAlignment(Qt.AlignCenter)
+        self.msg_label.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Preferred)
+        self.msg_label.setStyleSheet(
+            "color: #F5F1DC; font-size: 45px; font-weight: 700; "
+            "background-color: rgba(255,144,19,240); "
+            "padding: 26px 44px; border-radius: 18px;"
+        )
+        info_layout.addWidget(self.msg_label, alignment=Qt.AlignCenter)
+
+    def play(self, text: str):
+        if self.isVisible() and text == self._text:
+            self._repeat += 1
+            self.msg_label.setText(f"{text}  ×{self._repeat + 1}")
+        else:
+            self._text = text
+            self._repeat = 0
+            self.msg_label.setText(text)
+            self._place_on_screen()
+
+        self._fade.stop()
+        self.setWindowOpacity(1.0)
+        if self._movie is not None and self._movie.state() != QMovie.Running:
+            self._movie.start()
+        self.show()
+        self.raise_()
+        self._hold_timer.start(self.HOLD_MS[self.kind])
+
+    def dismiss(self):
+        self._hold_timer.stop()
+        self._fade.stop()
+        if self._movie is not None:
+            self._movie.stop()
+        self.hide()
+
+    def _on_hold_finished(self):
+        if self.kind == "action":
+            self._fade.start()
+        else:
+            self.dismiss()
+
+    def _place_on_screen(self):
+        screen = QApplication.primaryScreen()
+        dpr = screen.devicePixelRatio() if screen is not None else 1.0
+
+        if self.kind == "action":
+            w, h = self.ACTION_SIZE.width(), self.ACTION_SIZE.height()
+            if screen is not None:
+                rect = screen.availableGeometry()
+                x = rect.x() + (rect.width() - w) // 2
+                y = rect.y() + (rect.height() - h) // 2
             else:
-                archive.append(g)
-        return finalize_store({"active_goal": active, "archive": archive})
+                x, y = 300, 200
+            self.setGeometry(x, y, w, h)
+            movie_size = self.ACTION_MOVIE_SIZE
+            badge_size = 140
+        else:
+            screen_rect = screen.geometry() if screen is not None else QRect(0, 0, 1920, 1080)
+            self.setGeometry(screen_rect)
+            self.anim_label.setGeometry(0, 0, screen_rect.width(), screen_rect.height())
+            self.anim_fallback.setGeometry(0, 0, screen_rect.width(), screen_rect.height())
+            movie_size = screen_rect.size()
+            badge_size = 720
+
+        # 缓存里取出的 movie 已停在第 0 帧；尺寸没变时就是上次那一个
+        movie = self.assets.movie(movie_size.width(), movie_size.height())
+        if movie is not self._movie:
+            if self._movie is not None:
+                self._movie.stop()
+            self._movie = movie
+            if movie is not None:
+                self.anim_label.setMovie(movie)
+        self.anim_label.setVisible(movie is not None)
+        self.anim_fallback.setVisible(movie is None)
+
+        pix = self.assets.badge(badge_size, dpr)
+        if pix is not None:
+            self.badge_label.setPixmap(pix)
+            self.badge_label.setStyleSheet("background: transparent;")
+        else:
+            self.badge_label.setText("🏆")
+            self.badge_label.setStyleSheet(
+                f"font-size: {44 if self.kind == 'action' else 64}px; background: transparent;"
+            )
 
-    return finalize_store({"active_goal": None, "archive": []})
+        if self.kind == "card":
+            screen_w, screen_h = self.width(), self.height()
+            self.msg_label.setMinimumWidth(int(screen_w * 0.45))
+            self.msg_label.setMaximumWidth(int(screen_w * 0.96))
+            self.msg_label.adjustSize()
+            self.info_box.adjustSize()
+            box_w = self.info_box.width()
+            box_h = self.info_box.height()
+            self.info_box.setGeometry((screen_w - box_w) // 2, (screen_h - box_h) // 2 + 30, box_w, box_h)
+            self.info_box.raise_()
 
 
-def save_data(store):
-    try:
-        with open(DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(store, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error saving data: {e}", file=sys.stderr)
+class ActionListModel(QAbstractListModel):
+    """
+    悬浮卡片的关键动作模型：只保存动作 id 的顺序，文字和完成状态直接读 repo，不为每行创建 item。
+    勾选/编辑某一行时只通知这一行重绘（见 sync），增删、排序等结构变化才整体重置。
+    """
 
+    # 所有卡片、所有行共用的画刷和字体
+    DONE_BRUSH = QBrush(QColor("#999999"))
+    TODO_BRUSH = QBrush(QColor("#222222"))
+    _strike_font: QFont | None = None
 
-class ActionListWidget(QListWidget):
-    def __init__(self, app, *args, **kwargs):
+    def __init__(self, app, goal_id: str, parent=None):
+        super().__init__(parent)
+        self.app = app
+        self.goal_id = goal_id
+        self._ids: list[str] = []
+        self._done: list[bool] = []
+        self.undone_count = 0
+        # setData 正在修改的行；这次修改引起的 sync 只需要重绘这一行
+        self._editing_row: int | None = None
+        if ActionListModel._strike_font is None:
+            ActionListModel._strike_font = QFont()
+            ActionListModel._strike_font.setStrikeOut(True)
+
+    def action_id(self, row: int) -> str | None:
+        return self._ids[row] if 0 <= row < len(self._ids) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        a = self.app.repo.action(self._ids[index.row()])
+        if a is None:
+            return None
+        if role == Qt.DisplayRole:
+            return f"{index.row() + 1}. {a.get('text', '')}"
+        if role == Qt.EditRole:
+            return a.get("text", "")
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if a.get("done") else Qt.Unchecked
+        if role == Qt.ForegroundRole:
+            return self.DONE_BRUSH if a.get("done") else self.TODO_BRUSH
+        if role == Qt.FontRole:
+            return self._strike_font if a.get("done") else None
+        if role == Qt.UserRole:
+            return a["id"]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            # 允许拖到列表空白处（放到最后）
+            return Qt.ItemIsDropEnabled
+        return (
+            Qt.ItemIsEnabled
+            | Qt.ItemIsSelectable
+            | Qt.ItemIsUserCheckable
+            | Qt.ItemIsEditable
+            | Qt.ItemIsDragEnabled
+        )
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid():
+            return False
+        action_id = self._ids[index.row()]
+        self._editing_row = index.row()
+        try:
+            if role == Qt.CheckStateRole:
+                self.app.modify_action_from_card(action_id, done=Qt.CheckState(value) == Qt.Checked)
+            elif role == Qt.EditRole:
+                self.app.modify_action_from_card(action_id, text=strip_leading_number(str(value)))
+            else:
+                return False
+        finally:
+            self._editing_row = None
+        return True
+
+    def move_row(self, source: int, target: int):
+        """把 source 行拖到 target 之前（target 可以等于行数，表示放到最后）。"""
+        if target in (source, source + 1):
+            return
+        ids = self._ids[:]
+        action_id = ids.pop(source)
+        ids.insert(target - 1 if target > source else target, action_id)
+        self.app.reorder_actions_from_card(self.goal_id, ids)
+
+    def sync(self):
+        goal = self.app.repo.active_goal(self.goal_id)
+        row = self._editing_row
+        if goal is not None and row is not None:
+            a = self.app.repo.action(self._ids[row])
+            done = bool(a.get("done"))
+            if done != self._done[row]:
+                self.undone_count += -1 if done else 1
+                self._done[row] = done
+            index = self.index(row, 0)
+            self.dataChanged.emit(index, index)
+            return
+        self.reload(goal)
+
+    def reload(self, goal=None):
+        goal = goal if goal is not None else self.app.repo.active_goal(self.goal_id)
+        actions = goal["actions"] if goal is not None else []
+        self.beginResetModel()
+        self._ids = [a["id"] for a in actions]
+        self._done = [bool(a.get("done")) for a in actions]
+        self.undone_count = self._done.count(False)
+        self.endResetModel()
+
+
+class ActionListView(QListView):
+    def __init__(self, app, goal_id: str, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.app = app
+        self.goal_id = goal_id
+        self.setModel(ActionListModel(app, goal_id, self))
+        # 所有行等高，滚动和布局不需要逐行测量
+        self.setUniformItemSizes(True)
         self.setAlternatingRowColors(True)
         self.setStyleSheet(
             """
-            QListWidget {
+            QListView {
                 font-size: 17px;
                 border: none;
                 outline: none;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background: #e0f2ff;
             }
             """
@@ -247,32 +573,39 @@ class ActionListWidget(QListWidget):
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
 
+    def current_action_id(self) -> str | None:
+        index = self.currentIndex()
+        return self.model().action_id(index.row()) if index.isValid() else None
+
     def keyPressEvent(self, event):
         if event.key() in (Qt.Key_Delete, Qt.Key_Backspace):
-            item = self.currentItem()
-            if item is not None:
-                action_id = item.data(Qt.UserRole)
-                if action_id:
-                    self.app.delete_action_from_card(action_id)
-                    return
+            action_id = self.current_action_id()
+            if action_id:
+                self.app.delete_action_from_card(action_id)
+                return
         super().keyPressEvent(event)
 
     def dropEvent(self, event):
-        super().dropEvent(event)
-        ordered_ids = []
-        for i in range(self.count()):
-            item = self.item(i)
-            aid = item.data(Qt.UserRole)
-            if aid:
-                ordered_ids.append(aid)
-        self.app.reorder_actions_from_card(ordered_ids)
+        # 排序交给业务层，之后由 sync 重置模型；不让视图自己搬动行
+        source = self.currentIndex()
+        if event.source() is not self or not source.isValid():
+            event.ignore()
+            return
+        target = self.indexAt(event.position().toPoint())
+        if not target.isValid():
+            row = self.model().rowCount()
+        elif self.dropIndicatorPosition() == QAbstractItemView.BelowItem:
+            row = target.row() + 1
+        else:
+            row = target.row()
+        event.setDropAction(Qt.IgnoreAction)
+        event.accept()
+        self.model().move_row(source.row(), row)
 
     def contextMenuEvent(self, event):
         pos = event.pos()
-        item = self.itemAt(pos)
-        if item is None:
-            return
-        action_id = item.data(Qt.UserRole)
+        index = self.indexAt(pos)
+        action_id = self.model().action_id(index.row()) if index.isValid() else None
         if not action_id:
             return
         menu = QMenu(self)
@@ -282,14 +615,13 @@ class ActionListWidget(QListWidget):
             self.app.delete_action_from_card(action_id)
 
     def mouseDoubleClickEvent(self, event):
-        item = self.itemAt(event.pos())
-        if item is None:
-            self.app.add_action_from_card("")
-            last_row = self.count() - 1
+        if not self.indexAt(event.pos()).isValid():
+            self.app.add_action_from_card(self.goal_id, "")
+            last_row = self.model().rowCount() - 1
             if last_row >= 0:
-                new_item = self.item(last_row)
-                self.setCurrentItem(new_item)
-                self.editItem(new_item)
+                index = self.model().index(last_row, 0)
+                self.setCurrentIndex(index)
+                self.edit(index)
         else:
             super().mouseDoubleClickEvent(event)
 
@@ -301,11 +633,13 @@ class FocusWindow(QWidget):
     - 置顶（WindowStaysOnTopHint）
     - 支持系统原生的四向/斜向缩放
     - 最小尺寸 15x15
+    - 每张进行中的卡片各有一个窗口
     """
 
-    def __init__(self, app):
+    def __init__(self, app, goal_id: str):
         super().__init__()
         self.app = app
+        self.goal_id = goal_id
         self.setWindowTitle("专注卡片")
         self.resize(520, 360)
         self.setMinimumSize(15, 15)
@@ -321,6 +655,8 @@ class FocusWindow(QWidget):
         self.finish_button = None
 
         self.build_ui()
+        QShortcut(QKeySequence("Ctrl+Z"), self, activated=self.app.undo)
+        QShortcut(QKeySequence("Ctrl+Y"), self, activated=self.app.redo)
 
     def minimumSizeHint(self) -> QSize:
         # 强制告诉 Qt：我可以小到 15x15
@@ -365,7 +701,7 @@ class FocusWindow(QWidget):
         content_layout.addWidget(self.current_label)
         content_layout.addWidget(self.long_term_label)
 
-        self.action_list = ActionListWidget(self.app)
+        self.action_list = ActionListView(self.app, self.goal_id)
         self.action_list.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         content_layout.addWidget(self.action_list, stretch=1)
 
@@ -380,8 +716,8 @@ class FocusWindow(QWidget):
             btn.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
             btn.setStyleSheet("QPushButton { font-size: 13px; padding: 2px 8px; }")
 
-        self.toggle_all_button.clicked.connect(self.app.toggle_all_actions_from_card)
-        self.finish_button.clicked.connect(self.app.finish_goal_if_completed_from_card)
+        self.toggle_all_button.clicked.connect(lambda: self.app.toggle_all_actions_from_card(self.goal_id))
+        self.finish_button.clicked.connect(lambda: self.app.finish_goal_if_completed_from_card(self.goal_id))
 
         bottom_layout.addWidget(self.toggle_all_button)
         bottom_layout.addWidget(self.finish_button)
@@ -390,65 +726,25 @@ class FocusWindow(QWidget):
         card_layout.addLayout(content_layout)
         main_layout.addWidget(card)
 
-        self.action_list.itemChanged.connect(self.on_item_changed)
-
     def closeEvent(self, event: QCloseEvent):
         event.ignore()
         self.hide()
 
     def refresh(self):
-        goal = self.app.get_active_goal()
-        self.action_list.blockSignals(True)
-        self.action_list.clear()
+        goal = self.app.repo.active_goal(self.goal_id)
+        model = self.action_list.model()
+        model.sync()
 
         if goal is None:
-            self.current_label.setText("当前没有进行中的专注卡片。")
+            self.current_label.setText("这张专注卡片已经完成或被删除。")
             self.long_term_label.setText("")
             self.toggle_all_button.setText("全选")
-            self.action_list.blockSignals(False)
             return
 
+        self.setWindowTitle(f"专注卡片 - {goal['current_goal']}")
         self.current_label.setText(goal["current_goal"])
         self.long_term_label.setText(f"长期目标：{goal['long_term']}")
-        any_undone = False
-
-        for idx2, action in enumerate(goal["actions"]):
-            display_text = f"{idx2 + 1}. {action['text']}"
-            item = QListWidgetItem(display_text)
-            item.setFlags(
-                Qt.ItemIsEnabled
-                | Qt.ItemIsSelectable
-                | Qt.ItemIsUserCheckable
-                | Qt.ItemIsEditable
-                | Qt.ItemIsDragEnabled
-            )
-            item.setCheckState(Qt.Checked if action.get("done") else Qt.Unchecked)
-            item.setData(Qt.UserRole, action["id"])
-
-            font = item.font()
-            if action.get("done"):
-                font.setStrikeOut(True)
-                item.setFont(font)
-                item.setForeground(QBrush(QColor("#999999")))
-            else:
-                font.setStrikeOut(False)
-                item.setFont(font)
-                item.setForeground(QBrush(QColor("#222222")))
-                any_undone = True
-
-            self.action_list.addItem(item)
-
-        self.toggle_all_button.setText("全选" if any_undone else "全清")
-        self.action_list.blockSignals(False)
-
-    def on_item_changed(self, item: QListWidgetItem):
-        action_id = item.data(Qt.UserRole)
-        if not action_id:
-            return
-        raw = item.text()
-        text = strip_leading_number(raw)
-        done = item.checkState() == Qt.Checked
-        self.app.modify_action_from_card(action_id, text=text, done=done)
+        self.toggle_all_button.setText("全选" if model.undone_count else "全清")
 
 
 class PendingActionListWidget(QListWidget):
@@ -506,6 +802,163 @@ class PendingActionListWidget(QListWidget):
             super().mouseDoubleClickEvent(event)
 
 
+class ArchiveTableModel(QAbstractTableModel):
+    """
+    归档表格的数据模型：直接读 app.store["archive"]（list、ShardedArchive 或 SqliteArchive），
+    不为每行创建 item；通过 canFetchMore / fetchMore 分批暴露行，只有滚动到的行才会被读取
+    （按月分片的归档只有这时才读入对应的分片）。
+    搜索时（set_results）改为按检索结果的顺序显示对应的卡片。
+    点表头排序（sort）在数据源上排整个归档（repo.sorted_archive_ids），之后按排好的 id 显示；
+    不能交给 QSortFilterProxyModel，它只看得到已经 fetchMore 的那几批行。
+    """
+
+    HEADERS = ["长期目标", "当下目标", "创建时间", "完成时间"]
+    FIELDS = ("long_term", "current_goal", "created_at", "completed_at")
+    FETCH_BATCH = 200
+
+    def __init__(self, app, parent=None):
+        super().__init__(parent)
+        self.app = app
+        self._loaded = 0
+        # 上次同步时的归档总数，用来区分“新增一张”和“更新一张”
+        self._known = 0
+        # 搜索结果（按相关度排好的卡片 id）；None 表示显示全部归档
+        self._results: list[str] | None = None
+        # 表头排序 (字段, 是否降序)；None 表示归档原顺序 / 相关度顺序
+        self._sort: tuple[str, bool] | None = None
+        # 实际显示的卡片 id（搜索或排序时）；None 表示按下标直接读归档
+        self._rows: list[str] | None = None
+
+    def archive(self):
+        # 归档还在后台解析时先当作空表，加载完成后由 GoalApp 重新 reload
+        if not self.app.archive_ready():
+            return []
+        return self.app.store.get("archive", [])
+
+    def goal_at(self, row: int):
+        if self._rows is not None:
+            return self.app.repo.archive_goal(self._rows[row])
+        return self.archive()[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows) if self._rows is not None else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        g = self.goal_at(index.row())
+        if g is None:
+            return None
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return g.get(self.FIELDS[index.column()]) or ""
+        if role == Qt.UserRole:
+            return g.get("id")
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._rows is not None:
+            return False
+        return self._loaded < len(self.archive())
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        n = min(self.FETCH_BATCH, len(self.archive()) - self._loaded)
+        if n <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + n - 1)
+        self._loaded += n
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.beginResetModel()
+        if 0 <= column < len(self.FIELDS):
+            self._sort = (self.FIELDS[column], order == Qt.DescendingOrder)
+        else:
+            self._sort = None
+        self._arrange()
+        self.endResetModel()
+
+    def _arrange(self):
+        if self._sort is None or not self.app.archive_ready():
+            self._rows = self._results
+        else:
+            self._rows = self.app.repo.sorted_archive_ids(*self._sort, ids=self._results)
+
+    def set_results(self, ids: list[str] | None):
+        """换成新的搜索结果（按相关度排列），同时清掉表头排序。"""
+        self.beginResetModel()
+        self._results = ids
+        self._sort = None
+        self._arrange()
+        if ids is None:
+            # 搜索期间归档可能有增删，回到全部列表时重新对齐行数
+            self._known = len(self.archive())
+            self._loaded = min(max(self._loaded, self.FETCH_BATCH), self._known)
+        self.endResetModel()
+
+    def reload(self):
+        self.beginResetModel()
+        self._known = len(self.archive())
+        self._loaded = min(self.FETCH_BATCH, self._known)
+        self._arrange()
+        self.endResetModel()
+
+    def _resort(self):
+        # 排序状态下增删一张卡片：行号整体可能移动，按新的顺序重排（repo 已清掉缓存）
+        self.beginResetModel()
+        self._known = len(self.archive())
+        self._arrange()
+        self.endResetModel()
+
+    def goal_changed(self, goal_id: str):
+        """某张归档卡片新增或更新：新增的插入对应行，更新的只通知这一行重绘。"""
+        if self._results is not None:
+            # 搜索状态下由 GoalApp 重新搜索刷新
+            return
+        if self._sort is not None:
+            self._resort()
+            return
+        archive = self.archive()
+        # 新完成的卡片总是插在最前面，通常第一次比较就能命中
+        for row in range(min(self._loaded + 1, len(archive))):
+            if archive[row].get("id") == goal_id:
+                break
+        else:
+            # 不在已加载的范围内，等滚动到时自然会读到
+            self._known = len(archive)
+            return
+        if len(archive) > self._known:
+            self._known = len(archive)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._loaded += 1
+            self.endInsertRows()
+        else:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def goal_removed(self, goal_id: str):
+        if self._results is not None:
+            return
+        if self._sort is not None:
+            self._resort()
+            return
+        # 删除后已无法定位原来的行号；模型不持有任何行对象，重置的代价与归档大小无关
+        self.beginResetModel()
+        self._known = len(self.archive())
+        self._loaded = min(self._loaded, self._known)
+        self.endResetModel()
+
+
 class LongTermGoalDialog(QDialog):
     def __init__(self, parent, title="", target_count=100):
         super().__init__(parent)
@@ -553,31 +1006,241 @@ class TemplateNameDialog(QDialog):
         return self.name_edit.text().strip()
 
 
+class DebugPanel(QDialog):
+    """隐藏的调试面板（Ctrl+Shift+D）：各埋点最近的耗时汇总，可随时开始记录或导出 trace。"""
+
+    def __init__(self, app: "GoalApp"):
+        super().__init__(app)
+        self.app = app
+        self.setWindowTitle("性能调试")
+        self.resize(720, 420)
+
+        layout = QVBoxLayout(self)
+        self.info_label = QLabel("")
+        self.info_label.setStyleSheet("color:#666666; font-size: 12px;")
+        layout.addWidget(self.info_label)
+
+        self.summary_view = QTextEdit()
+        self.summary_view.setReadOnly(True)
+        self.summary_view.setStyleSheet("font-family: Consolas, monospace; font-size: 12px;")
+        layout.addWidget(self.summary_view, stretch=1)
+
+        btn_row = QHBoxLayout()
+        btn_row.addStretch()
+        self.enable_btn = QPushButton("开始记录")
+        self.enable_btn.clicked.connect(self.enable_tracing)
+        self.save_btn = QPushButton("保存 trace")
+        self.save_btn.clicked.connect(self.save_trace)
+        btn_row.addWidget(self.enable_btn)
+        btn_row.addWidget(self.save_btn)
+        layout.addLayout(btn_row)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(1000)
+        self._timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self._timer.start()
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def enable_tracing(self):
+        tracer.enable()
+        self.refresh()
+
+    def save_trace(self):
+        path = tracer.write()
+        if path:
+            QMessageBox.information(self, "已保存", f"trace 已保存到：\n\n{os.path.abspath(path)}\n\n可在 chrome://tracing 或 ui.perfetto.dev 中打开。")
+
+    def refresh(self):
+        first_paint = self.app.first_paint_ms
+        paint_text = f"首帧 {first_paint:.0f} ms" if first_paint is not None else "首帧尚未绘制"
+        if not tracer.enabled:
+            self.info_label.setText(f"{paint_text}。埋点未启用（GOALFOCUS_TRACE 或 --trace）。")
+            self.enable_btn.setEnabled(True)
+            self.save_btn.setEnabled(False)
+            self.summary_view.clear()
+            return
+        self.info_label.setText(f"{paint_text}。trace 文件：{tracer.path}（退出时自动写入）")
+        self.enable_btn.setEnabled(False)
+        self.save_btn.setEnabled(True)
+
+        lines = [f"{'名称':<32}{'次数':>6}{'平均ms':>10}{'p95ms':>10}{'最大ms':>10}{'最近ms':>10}{'分配KB':>10}"]
+        for row in tracer.summary():
+            alloc = f"{row['alloc_kb']:.1f}" if row["alloc_kb"] is not None else "—"
+            lines.append(
+                f"{row['name'][:31]:<32}{row['count']:>6}{row['mean_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                f"{row['max_ms']:>10.2f}{row['last_ms']:>10.2f}{alloc:>10}"
+            )
+        self.summary_view.setPlainText("\n".join(lines))
+
+
+class SingleInstance:
+    """
+    同一个数据目录只允许一个桌面程序打开（档案在程序里切换）：第二次启动时通过本地套接字
+    通知第一个实例显示主窗口，然后退出。命令行不受限制（读写经文件锁，界面会自动并入它的修改）。
+    """
+
+    def __init__(self, root: str | None = None):
+        root = root or data_root()
+        digest = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:16]
+        self.key = f"GoalFocus-{digest}"
+        self.server: QLocalServer | None = None
+        # 收到后来启动的实例的通知时调用（主窗口建好后设置）
+        self.on_activate = None
+
+    def _connect(self, message: bytes = b"") -> bool:
+        socket = QLocalSocket()
+        socket.connectToServer(self.key)
+        if not socket.waitForConnected(500):
+            return False
+        if message:
+            socket.write(message)
+            socket.waitForBytesWritten(500)
+        socket.disconnectFromServer()
+        return True
+
+    def notify_running(self) -> bool:
+        """已有实例在运行时让它显示出来并返回 True。"""
+        return self._connect(b"show")
+
+    def listen(self) -> bool:
+        """
+        开始接收后来启动的实例的通知。返回 False 表示另一个同时启动的实例已经抢先在监听，
+        本实例应当退出；无法监听的其它情况只打印错误，照常运行。
+        """
+        self.server = QLocalServer()
+        if not self.server.listen(self.key):
+            if self.server.serverError() != QAbstractSocket.AddressInUseError:
+                print(f"Error listening on {self.key}: {self.server.errorString()}", file=sys.stderr)
+                return True
+            if self._connect():
+                return False
+            # 连不上：上次崩溃留下的套接字文件（Unix），清掉后重试
+            QLocalServer.removeServer(self.key)
+            if not self.server.listen(self.key):
+                print(f"Error listening on {self.key}: {self.server.errorString()}", file=sys.stderr)
+                return True
+
+        def on_connection():
+            socket = self.server.nextPendingConnection()
+            if socket is not None:
+                socket.disconnected.connect(socket.deleteLater)
+            if self.on_activate is not None:
+                self.on_activate()
+
+        self.server.newConnection.connect(on_connection)
+        return True
+
+
 class GoalApp(QMainWindow):
+    # 后台线程解析完归档后发出（跨线程，自动排队到界面线程）
+    archive_loaded = Signal()
+    # 写线程发现其它进程修改了数据文件时发出
+    external_changed = Signal()
+
     def __init__(self):
         super().__init__()
-        self.setWindowTitle("专注目标")
         self.resize(860, 620)
 
         if APP_ICON_PATH and os.path.exists(APP_ICON_PATH):
             self.setWindowIcon(QIcon(APP_ICON_PATH))
 
-        self.store = load_data()
-        self.focus_window: FocusWindow | None = None
-        self._celebration_overlay = None
-
-        self._audio_output = QAudioOutput()
-        self._player = QMediaPlayer()
-        self._player.setAudioOutput(self._audio_output)
+        self.profiles = ProfileManager()
+        self.update_window_title()
+        # 业务逻辑都在 GoalService 里，界面只负责收集输入、提示和刷新
+        self.service = GoalService(open_storage(directory=self.profiles.directory()), on_change=self.refresh_changed)
+        self.storage = self.service.storage
+        self.store = self.service.store
+        self.repo = self.service.repo
+        self.archive_loaded.connect(self.on_archive_loaded)
+        self.external_changed.connect(self.apply_external_changes)
+        self.service.watch(self.external_changed.emit)
+        self._external_timer: QTimer | None = None
+        # 卡片 id -> 悬浮窗口，第一次打开时创建
+        self.focus_windows: dict[str, FocusWindow] = {}
+        self.assets = CelebrationAssets()
+        self._celebration_overlays: dict[str, CelebrationOverlay] = {}
+
+        # QtMultimedia 导入和初始化都很慢，第一次播放音效时才创建（见 reward_player）
+        self._audio_output = None
+        self._player = None
 
         # 多选长期目标：保留“点击顺序”
         self.selected_long_term_goal_ids: list[str] = []
 
         self.tray: QSystemTrayIcon | None = None
+        # 首帧只构建规划页；托盘和其它标签页在第一次绘制之后再建（见 paintEvent）
+        self.tabs_ready = False
+        self.first_paint_ms: float | None = None
+        # 全文索引和统计要遍历整份归档；分片归档等第一次打开归档页或统计页时再建
+        self._archive_indexes_wanted = False
 
         self.build_ui()
-        self.init_tray()
         self.refresh_main_state()
+        self.debug_panel: DebugPanel | None = None
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, activated=self.toggle_debug_panel)
+        # 输入框里的 Ctrl+Z 仍由输入框自己处理（撤销文字编辑）
+        QShortcut(QKeySequence("Ctrl+Z"), self, activated=self.undo)
+        QShortcut(QKeySequence("Ctrl+Y"), self, activated=self.redo)
+
+        # 大归档在窗口显示之后再解析，启动耗时与归档大小无关
+        if not self.archive_ready():
+            self.store["archive"].start(on_loaded=self.archive_loaded.emit)
+        else:
+            self.start_archive_indexes()
+
+        if self.storage.recovered_from:
+            QTimer.singleShot(0, self.notify_data_recovered)
+
+        # 首次庆祝之前把素材解码好，避免勾选第一个动作时卡顿
+        screen = QApplication.primaryScreen()
+        self.assets.warm_up(screen.devicePixelRatio() if screen is not None else 1.0)
+        QTimer.singleShot(0, self.prepare_celebration_overlays)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.first_paint_ms is None:
+            self.first_paint_ms = (time.perf_counter() - STARTUP_T0) * 1000
+            tracer.instant("first_paint", ms=round(self.first_paint_ms, 1))
+            if os.environ.get("GOALFOCUS_TIMING"):
+                print(f"GoalFocus: first paint after {self.first_paint_ms:.0f} ms", file=sys.stderr)
+            QTimer.singleShot(0, self.finish_startup)
+
+    def toggle_debug_panel(self):
+        if self.debug_panel is None:
+            self.debug_panel = DebugPanel(self)
+        self.debug_panel.setVisible(not self.debug_panel.isVisible())
+
+    @traced("startup.deferred")
+    def finish_startup(self):
+        """首帧之后再做的初始化：托盘图标、其余标签页、外部修改的定时检查。"""
+        if self.tray is None:
+            self.init_tray()
+        self.build_deferred_tabs()
+        if self._external_timer is None:
+            self._external_timer = QTimer(self)
+            self._external_timer.timeout.connect(self.service.poll_external)
+            self._external_timer.start(EXTERNAL_POLL_MS)
+
+    def shutdown(self):
+        """退出前：停掉外部修改的定时检查，再写完数据、结束写线程。"""
+        if self._external_timer is not None:
+            self._external_timer.stop()
+        self.service.close()
+
+    def notify_data_recovered(self):
+        QMessageBox.warning(
+            self,
+            "数据已恢复",
+            f"数据文件损坏，已从备份恢复：\n\n{self.storage.recovered_from}\n\n"
+            "损坏的文件已改名保留（*.corrupt-时间），最近的少量修改可能丢失。",
+        )
 
     # ---------- 托盘 ----------
     def init_tray(self):
@@ -593,13 +1256,18 @@ class GoalApp(QMainWindow):
 
         act_toggle_focus.triggered.connect(self.tray_toggle_focus_window)
         act_show_main.triggered.connect(self.tray_show_main_window)
-        act_quit.triggered.connect(QApplication.quit)
+        act_quit.triggered.connect(self.quit_app)
 
         tray.setContextMenu(menu)
         tray.activated.connect(self.on_tray_activated)
         tray.show()
         self.tray = tray
 
+    def quit_app(self):
+        # 写线程有合并窗口，退出前先把尚未落盘的修改写完
+        self.storage.close()
+        QApplication.quit()
+
     def on_tray_activated(self, reason):
         if reason == QSystemTrayIcon.Trigger:
             self.tray_toggle_focus_window()
@@ -610,43 +1278,73 @@ class GoalApp(QMainWindow):
         self.activateWindow()
 
     def tray_toggle_focus_window(self):
-        goal = self.get_active_goal()
-        if goal is None:
+        """有任何悬浮卡片显示着就全部隐藏，否则显示所有进行中的卡片。"""
+        goals = self.repo.active_goals()
+        if not goals:
             QMessageBox.information(self, "没有卡片", "当前没有进行中的专注卡片。")
             return
-        if self.focus_window is None:
-            self.focus_window = FocusWindow(self)
-            self.focus_window.refresh()
-
-        if self.focus_window.isVisible():
-            self.focus_window.hide()
+        visible = [w for w in self.focus_windows.values() if w.isVisible()]
+        if visible:
+            for w in visible:
+                w.hide()
         else:
-            self.focus_window.refresh()
-            self.focus_window.show()
-            self.focus_window.raise_()
-            self.focus_window.activateWindow()
+            for goal in goals:
+                self.open_focus_window(goal["id"])
 
     # ---------- UI ----------
+    @traced()
     def build_ui(self):
         central = QWidget()
         self.setCentralWidget(central)
         main_layout = QVBoxLayout(central)
         main_layout.setContentsMargins(10, 10, 10, 10)
 
+        profile_row = QHBoxLayout()
+        profile_row.addStretch()
+        profile_row.addWidget(QLabel("档案："))
+        self.profile_combo = QComboBox()
+        self.profile_combo.setMinimumWidth(140)
+        self.profile_combo.activated.connect(self.on_profile_activated)
+        profile_row.addWidget(self.profile_combo)
+        new_profile_btn = QPushButton("新建档案")
+        new_profile_btn.clicked.connect(self.create_profile)
+        profile_row.addWidget(new_profile_btn)
+        self.delete_profile_btn = QPushButton("删除档案")
+        self.delete_profile_btn.clicked.connect(self.delete_profile)
+        profile_row.addWidget(self.delete_profile_btn)
+        main_layout.addLayout(profile_row)
+        self.refresh_profile_combo()
+
         self.tabs = QTabWidget()
         main_layout.addWidget(self.tabs)
 
         self.plan_tab = QWidget()
         self.archive_tab = QWidget()
         self.goal_tab = QWidget()
+        self.stats_tab = QWidget()
 
         self.tabs.addTab(self.plan_tab, "规划")
         self.tabs.addTab(self.archive_tab, "归档")
         self.tabs.addTab(self.goal_tab, "目标")
+        self.tabs.addTab(self.stats_tab, "统计")
 
         self.build_plan_tab()
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+
+    @traced()
+    def build_deferred_tabs(self):
+        """构建首帧不可见的标签页并做一次全量刷新；可重复调用。"""
+        if self.tabs_ready:
+            return
         self.build_archive_tab()
         self.build_goal_tab()
+        self.build_stats_tab()
+        self.tabs_ready = True
+        self.refresh_goal_tab()
+        self.refresh_template_list()
+        self.refresh_archive_tab()
+        if self.tabs.currentWidget() is self.stats_tab:
+            self.refresh_stats_tab()
 
     def build_plan_tab(self):
         w = self.plan_tab
@@ -748,7 +1446,7 @@ class GoalApp(QMainWindow):
         input_layout.addWidget(pa_group)
 
         bottom_layout = QHBoxLayout()
-        self.status_label = QLabel("一次只能有一张进行中的专注卡片，完成后才能创建新的。")
+        self.status_label = QLabel("可以同时进行多张专注卡片，每张都有自己的悬浮窗口。")
         self.status_label.setStyleSheet("color: #777777; font-size: 11px;")
         self.create_btn = QPushButton("创建专注卡片")
         self.create_btn.setStyleSheet("font-size: 12px; padding: 4px 10px;")
@@ -760,11 +1458,17 @@ class GoalApp(QMainWindow):
 
         layout.addWidget(input_group)
 
-        # 当前专注卡片摘要
-        summary_group = QGroupBox("当前专注卡片")
+        # 进行中的卡片列表 + 选中卡片的摘要
+        summary_group = QGroupBox("进行中的专注卡片")
         summary_layout = QVBoxLayout(summary_group)
         summary_layout.setSpacing(4)
 
+        self.active_list = QListWidget()
+        self.active_list.setMaximumHeight(96)
+        self.active_list.setStyleSheet("font-size: 12px;")
+        self.active_list.currentRowChanged.connect(self.refresh_active_goal_summary)
+        self.active_list.itemDoubleClicked.connect(self.on_active_item_double_clicked)
+
         self.summary_title_label = QLabel("当前没有进行中的专注卡片。")
         self.summary_title_label.setStyleSheet("font-size: 13px;")
         self.summary_title_label.setWordWrap(True)
@@ -799,9 +1503,10 @@ class GoalApp(QMainWindow):
         btn_layout.addStretch()
         self.open_focus_btn = QPushButton("打开专注卡片")
         self.open_focus_btn.setStyleSheet("font-size: 12px; padding: 4px 10px;")
-        self.open_focus_btn.clicked.connect(self.open_focus_window)
+        self.open_focus_btn.clicked.connect(self.open_selected_focus_window)
         btn_layout.addWidget(self.open_focus_btn)
 
+        summary_layout.addWidget(self.active_list)
         summary_layout.addWidget(self.summary_title_label)
         summary_layout.addWidget(self.summary_progress_bar)
         summary_layout.addWidget(self.summary_progress_text)
@@ -823,12 +1528,31 @@ class GoalApp(QMainWindow):
         self.token_info_label.setStyleSheet("color: #555555; font-size: 11px;")
         layout.addWidget(self.token_info_label)
 
-        self.archive_table = QTableWidget(0, 4)
-        self.archive_table.setHorizontalHeaderLabels(["长期目标", "当下目标", "创建时间", "完成时间"])
+        filter_row = QHBoxLayout()
+        filter_label = QLabel("筛选：")
+        filter_label.setStyleSheet("font-size: 12px;")
+        self.archive_filter_edit = QLineEdit()
+        self.archive_filter_edit.setPlaceholderText("搜索长期目标 / 当下目标 / 关键动作 / 日期")
+        self.archive_filter_edit.setStyleSheet("font-size: 12px;")
+        self.archive_filter_edit.setClearButtonEnabled(True)
+        self.archive_filter_edit.textChanged.connect(self.on_archive_filter_changed)
+        filter_row.addWidget(filter_label)
+        filter_row.addWidget(self.archive_filter_edit)
+        layout.addLayout(filter_row)
+
+        # 排序、搜索都在模型内按卡片 id 完成，不复制归档数据；搜索由 repo.search 的倒排索引完成
+        self.archive_model = ArchiveTableModel(self, self)
+
+        self.archive_table = QTableView()
+        self.archive_table.setModel(self.archive_model)
         self.archive_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.archive_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.archive_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.archive_table.itemSelectionChanged.connect(self.on_archive_selection_changed)
+        self.archive_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.archive_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.archive_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        # 默认保持归档原顺序（最新在前），点击表头才排序；先清掉排序指示，开启排序时才不会立刻按第 0 列排
+        self.archive_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.archive_table.setSortingEnabled(True)
+        self.archive_table.selectionModel().selectionChanged.connect(self.on_archive_selection_changed)
         self.archive_table.setStyleSheet("font-size: 12px;")
         layout.addWidget(self.archive_table, stretch=1)
 
@@ -909,31 +1633,77 @@ class GoalApp(QMainWindow):
 
         layout.addWidget(tpl_group, stretch=1)
 
+    def build_stats_tab(self):
+        w = self.stats_tab
+        layout = QVBoxLayout(w)
+        layout.setContentsMargins(8, 8, 8, 8)
+        layout.setSpacing(8)
+
+        title = QLabel("完成统计")
+        title.setStyleSheet("font-size: 15px; font-weight: bold;")
+        layout.addWidget(title)
+
+        self.stats_summary_label = QLabel()
+        self.stats_summary_label.setStyleSheet("font-size: 13px;")
+        self.stats_summary_label.setWordWrap(True)
+        layout.addWidget(self.stats_summary_label)
+
+        self.stats_detail = QTextEdit()
+        self.stats_detail.setReadOnly(True)
+        self.stats_detail.setStyleSheet("font-size: 12px;")
+        layout.addWidget(self.stats_detail, stretch=1)
+
+        # 时段分布要扫描整个归档做列式导出，按需生成；依赖 NumPy
+        heat_row = QHBoxLayout()
+        heat_row.addStretch()
+        self.stats_heatmap_btn = QPushButton("分析完成时段分布")
+        self.stats_heatmap_btn.setStyleSheet("font-size: 12px; padding: 4px 10px;")
+        self.stats_heatmap_btn.clicked.connect(self.show_completion_heatmap)
+        if not analytics.HAVE_NUMPY:
+            self.stats_heatmap_btn.setEnabled(False)
+            self.stats_heatmap_btn.setToolTip("需要安装 NumPy")
+        heat_row.addWidget(self.stats_heatmap_btn)
+        layout.addLayout(heat_row)
+
+        self.stats_heatmap_view = QTextEdit()
+        self.stats_heatmap_view.setReadOnly(True)
+        self.stats_heatmap_view.setStyleSheet("font-family: Consolas, monospace; font-size: 12px;")
+        self.stats_heatmap_view.hide()
+        layout.addWidget(self.stats_heatmap_view, stretch=1)
+
     # ---------- 数据访问 ----------
-    def get_active_goal(self):
-        return self.store.get("active_goal")
+    def run_service(self, op, *args, **kwargs):
+        """调用业务层操作；规则不允许时弹窗提示并返回 None。"""
+        try:
+            return op(*args, **kwargs)
+        except GoalError as e:
+            if e.level == "warning":
+                QMessageBox.warning(self, e.title, str(e))
+            else:
+                QMessageBox.information(self, e.title, str(e))
+            return None
+
+    def undo(self):
+        self.run_service(self.service.undo)
+
+    def redo(self):
+        self.run_service(self.service.redo)
+
+    def selected_active_goal(self):
+        item = self.active_list.currentItem()
+        return self.repo.active_goal(item.data(Qt.UserRole)) if item is not None else None
 
     def get_long_term_goals(self) -> list[dict]:
-        return self.store.get("long_term_goals", [])
+        return self.repo.long_term_goals()
 
     def get_templates(self) -> list[dict]:
-        return self.store.get("templates", [])
+        return self.repo.templates()
 
     def find_long_term_goal(self, goal_id: str | None) -> dict | None:
-        if not goal_id:
-            return None
-        for g in self.get_long_term_goals():
-            if g.get("id") == goal_id:
-                return g
-        return None
+        return self.repo.long_term_goal(goal_id)
 
     def find_template(self, template_id: str | None) -> dict | None:
-        if not template_id:
-            return None
-        for t in self.get_templates():
-            if t.get("id") == template_id:
-                return t
-        return None
+        return self.repo.template(template_id)
 
     # ---------- 长期目标快捷按钮（多选，按点击顺序） ----------
     def open_manage_long_term_goals(self):
@@ -1078,43 +1848,14 @@ class GoalApp(QMainWindow):
             item.setData(Qt.UserRole, t.get("id"))
             self.template_list.addItem(item)
 
-    def make_goal_from_template(self, t: dict) -> dict:
-        actions = []
-        for text in (t.get("actions_texts") or []):
-            actions.append(
-                {"id": str(uuid.uuid4()), "text": text, "done": False, "created_at": now_str(), "completed_at": None}
-            )
-        lt_ids = t.get("long_term_goal_ids") or []
-        if not lt_ids and t.get("long_term_goal_id"):
-            lt_ids = [t["long_term_goal_id"]]
-        return {
-            "id": str(uuid.uuid4()),
-            "long_term": t.get("long_term_text", ""),
-            "long_term_goal_id": lt_ids[0] if lt_ids else None,
-            "long_term_goal_ids": lt_ids,
-            "current_goal": t.get("current_goal", ""),
-            "actions": actions,
-            "done": False,
-            "created_at": now_str(),
-            "completed_at": None,
-        }
-
     def start_selected_template(self):
-        if self.get_active_goal() is not None:
-            QMessageBox.information(self, "已有进行中的卡片", "你当前已经有一张进行中的专注卡片，请先完成它，再启动模板。")
-            return
         item = self.template_list.currentItem()
         if item is None:
             return
-        tid = item.data(Qt.UserRole)
-        t = self.find_template(tid)
-        if not t:
+        goal = self.run_service(self.service.start_template, item.data(Qt.UserRole))
+        if goal is None:
             return
-        goal = self.make_goal_from_template(t)
-        self.store["active_goal"] = goal
-        save_data(self.store)
-        self.refresh_main_state()
-        self.open_focus_window()
+        self.open_focus_window(goal["id"])
         self.tabs.setCurrentWidget(self.plan_tab)
 
     def delete_selected_template(self):
@@ -1125,72 +1866,213 @@ class GoalApp(QMainWindow):
         t = self.find_template(tid)
         if not t:
             return
-        reply = QMessageBox.question(self, "确认删除", f"确定删除模板：\n\n{t.get('name','')}\n\n删除后不可恢复。")
+        reply = QMessageBox.question(self, "确认删除", f"确定删除模板：\n\n{t.get('name','')}\n\n删除后可以按 Ctrl+Z 撤销。")
         if reply != QMessageBox.Yes:
             return
-        self.store["templates"] = [x for x in self.get_templates() if x.get("id") != tid]
-        save_data(self.store)
-        self.refresh_main_state()
+        self.service.delete_template(tid)
 
     # ---------- 主状态刷新 ----------
+    @traced()
     def refresh_main_state(self):
+        """全量刷新，只在启动时使用；日常修改走 refresh_changed。其余标签页见 build_deferred_tabs。"""
         self.refresh_long_term_quick_buttons()
-        self.refresh_goal_tab()
-        self.refresh_template_list()
+        self.refresh_active_goal_views()
 
-        goal = self.get_active_goal()
+    @traced()
+    def refresh_changed(self, changes):
+        """
+        按变更涉及的区域刷新：
+        - active_goals：规划页卡片列表 + 对应的悬浮卡片（删除的卡片关闭窗口）
+        - long_term_goals：快捷按钮 + 目标页列表
+        - templates：模板列表
+        - archive：只增删/更新对应的表格行
+        - 计数字段：删除机会提示
+        其余标签页还没构建时只刷新规划页，构建时会全量刷新一次。
+        """
+        dirty = set()
+        for change in changes:
+            op, key = change[0], change[1]
+            if key == "active_goals":
+                if op == "put":
+                    self.refresh_focus_window(change[2])
+                else:
+                    self.close_focus_window(change[2])
+            if key == "archive" and self.tabs_ready:
+                if op == "put":
+                    self.archive_row_changed(change[2])
+                else:
+                    self.archive_row_removed(change[2])
+            dirty.add(key)
+
+        if "active_goals" in dirty:
+            self.refresh_active_goal_views()
+        if "long_term_goals" in dirty:
+            self.refresh_long_term_quick_buttons()
+        if not self.tabs_ready:
+            return
+        if "long_term_goals" in dirty:
+            self.refresh_goal_tab()
+        if "templates" in dirty:
+            self.refresh_template_list()
+        if dirty & {"archive", "total_completed_count", "delete_tokens_used"}:
+            self.refresh_archive_counters()
+        if dirty & {"archive", "long_term_goals"} and self.tabs.currentWidget() is self.stats_tab:
+            self.refresh_stats_tab()
+
+    # ---------- 档案 ----------
+    def profile_label(self, name: str) -> str:
+        return "默认" if name == DEFAULT_PROFILE else name
+
+    def update_window_title(self):
+        name = self.profiles.current
+        self.setWindowTitle("专注目标" if name == DEFAULT_PROFILE else f"专注目标 - {name}")
+
+    def refresh_profile_combo(self):
+        current = self.profiles.current
+        self.profile_combo.blockSignals(True)
+        self.profile_combo.clear()
+        for name in self.profiles.names():
+            self.profile_combo.addItem(self.profile_label(name), name)
+        self.profile_combo.setCurrentIndex(max(self.profile_combo.findData(current), 0))
+        self.profile_combo.blockSignals(False)
+        self.delete_profile_btn.setEnabled(current != DEFAULT_PROFILE)
+
+    def on_profile_activated(self, index: int):
+        self.switch_profile(self.profile_combo.itemData(index))
+
+    @traced()
+    def switch_profile(self, name: str):
+        """切换档案：不重启程序，原地替换 store 后全部刷新；归档仍在后台解析。"""
+        if name == self.profiles.current:
+            return
+        try:
+            self.service.switch_storage(open_storage(directory=self.profiles.directory(name)))
+        except Exception as e:
+            QMessageBox.warning(self, "切换失败", f"无法打开档案「{self.profile_label(name)}」：\n\n{e}")
+            self.refresh_profile_combo()
+            return
+        self.storage = self.service.storage
+        self.run_service(self.profiles.set_current, name)
+        self.update_window_title()
+        self.refresh_profile_combo()
+        self.refresh_after_reload()
+        if self.storage.recovered_from:
+            self.notify_data_recovered()
+
+    def create_profile(self):
+        name, ok = QInputDialog.getText(self, "新建档案", "档案名称（例如：工作、个人）：")
+        if not ok:
+            return
+        name = self.run_service(self.profiles.create, name)
+        if name is not None:
+            self.refresh_profile_combo()
+            self.switch_profile(name)
+
+    def delete_profile(self):
+        name = self.profile_combo.currentData()
+        if name == DEFAULT_PROFILE:
+            QMessageBox.information(self, "不能删除", "默认档案不能删除。")
+            return
+        reply = QMessageBox.question(
+            self,
+            "确认删除",
+            f"确定删除档案「{name}」？\n\n程序会先切换到默认档案；档案的数据文件会移到数据目录的 trash 文件夹里保留。",
+        )
+        if reply != QMessageBox.Yes:
+            return
+        self.switch_profile(DEFAULT_PROFILE)
+        if self.profiles.current != DEFAULT_PROFILE:
+            return
+        if self.run_service(self.profiles.delete, name) is not None:
+            self.refresh_profile_combo()
+
+    def apply_external_changes(self):
+        # 逐项并入的修改已经经 refresh_changed 刷新过；整体重新加载时全部刷新
+        try:
+            reloaded = self.service.apply_external()
+        except LockError as e:
+            # 数据文件被其它进程锁着：下一次定时检查时再重新加载
+            print(f"Error reloading data: {e}", file=sys.stderr)
+            return
+        if reloaded:
+            self.refresh_after_reload()
+
+    @traced()
+    def refresh_after_reload(self):
+        for goal_id in [gid for gid in self.focus_windows if self.repo.active_goal(gid) is None]:
+            self.close_focus_window(goal_id)
+        for goal_id in self.focus_windows:
+            self.refresh_focus_window(goal_id)
+        self.refresh_main_state()
+        if self.tabs_ready:
+            self.refresh_goal_tab()
+            self.refresh_template_list()
+            self.refresh_archive_tab()
+            if self.tabs.currentWidget() is self.stats_tab:
+                self.refresh_stats_tab()
+        if not self.archive_ready():
+            self.store["archive"].start(on_loaded=self.archive_loaded.emit)
+        else:
+            self.start_archive_indexes()
+
+    def refresh_active_goal_views(self):
+        """重建进行中的卡片列表（卡片数量很少），尽量保持原来的选中项。"""
+        current = self.active_list.currentItem()
+        current_id = current.data(Qt.UserRole) if current is not None else None
+        goals = self.repo.active_goals()
+
+        self.active_list.blockSignals(True)
+        self.active_list.clear()
+        row = 0
+        for i, goal in enumerate(goals):
+            total = len(goal["actions"])
+            done = sum(1 for a in goal["actions"] if a.get("done"))
+            item = QListWidgetItem(f"{goal['current_goal']}    {done} / {total}")
+            item.setData(Qt.UserRole, goal["id"])
+            self.active_list.addItem(item)
+            if goal["id"] == current_id:
+                row = i
+        if goals:
+            self.active_list.setCurrentRow(row)
+        self.active_list.blockSignals(False)
+        self.active_list.setVisible(bool(goals))
+        self.refresh_active_goal_summary()
+
+    def refresh_active_goal_summary(self, *_):
+        goal = self.selected_active_goal()
 
         if goal is None:
-            self.status_label.setText("一次只能有一张进行中的专注卡片，当前没有进行中的卡片。")
-            self.create_btn.setEnabled(True)
-
             self.summary_title_label.setText("当前没有进行中的专注卡片。")
             self.summary_progress_bar.setValue(0)
             self.summary_progress_text.setText("")
             self.summary_actions_label.setText("")
             self.open_focus_btn.setEnabled(False)
-        else:
-            self.status_label.setText("已经有一张进行中的卡片，完成后才能创建新的。")
-            self.create_btn.setEnabled(False)
-
-            title = f"{goal['long_term']} → {goal['current_goal']}"
-            self.summary_title_label.setText(title)
-
-            total = len(goal["actions"])
-            done = sum(1 for a in goal["actions"] if a.get("done"))
-            ratio = int((done / total) * 100) if total > 0 else 0
-            self.summary_progress_bar.setValue(ratio)
-            self.summary_progress_text.setText(f"{done} / {total} 个关键动作已完成")
-
-            undone = [a["text"] for a in goal["actions"] if not a.get("done")]
-            if undone:
-                lines = ["正在进行中的关键动作："]
-                for idx2, t in enumerate(undone, start=1):
-                    lines.append(f"{idx2}. {t}")
-                self.summary_actions_label.setText("\n".join(lines))
-            else:
-                self.summary_actions_label.setText("所有关键动作已完成，可以在专注卡片中点击「完成卡片」。")
-
-            self.open_focus_btn.setEnabled(True)
+            return
 
-        self.refresh_archive_tab()
+        title = f"{goal['long_term']} → {goal['current_goal']}"
+        self.summary_title_label.setText(title)
+
+        total = len(goal["actions"])
+        done = sum(1 for a in goal["actions"] if a.get("done"))
+        ratio = int((done / total) * 100) if total > 0 else 0
+        self.summary_progress_bar.setValue(ratio)
+        self.summary_progress_text.setText(f"{done} / {total} 个关键动作已完成")
+
+        undone = [a["text"] for a in goal["actions"] if not a.get("done")]
+        if undone:
+            lines = ["正在进行中的关键动作："]
+            for idx2, t in enumerate(undone[:SUMMARY_MAX_ACTIONS], start=1):
+                lines.append(f"{idx2}. {t}")
+            if len(undone) > SUMMARY_MAX_ACTIONS:
+                lines.append(f"…… 还有 {len(undone) - SUMMARY_MAX_ACTIONS} 个")
+            self.summary_actions_label.setText("\n".join(lines))
+        else:
+            self.summary_actions_label.setText("所有关键动作已完成，可以在专注卡片中点击「完成卡片」。")
 
-        if self.focus_window is not None and self.focus_window.isVisible():
-            self.focus_window.refresh()
+        self.open_focus_btn.setEnabled(True)
 
     # ---------- 创建新卡片 ----------
     def create_goal_from_input(self):
-        if self.get_active_goal() is not None:
-            QMessageBox.information(self, "已有进行中的卡片", "你当前已经有一张进行中的专注卡片，请先完成它，再创建新的。")
-            return
-
-        long_term = self.long_term_edit.text().strip()
-        current_goal = self.current_goal_edit.text().strip()
-
-        if not long_term or not current_goal:
-            QMessageBox.warning(self, "信息不完整", "请填写【长期目标描述】和【当下目标】。")
-            return
-
         actions_texts = []
         for i in range(self.pending_actions_list.count()):
             raw = self.pending_actions_list.item(i).text()
@@ -1198,444 +2080,248 @@ class GoalApp(QMainWindow):
             if t:
                 actions_texts.append(t)
 
-        if not actions_texts:
-            QMessageBox.warning(self, "没有关键动作", "请至少添加一个【关键动作】。")
+        goal = self.run_service(
+            self.service.create_goal,
+            self.long_term_edit.text(),
+            self.current_goal_edit.text(),
+            actions_texts,
+            self.selected_long_term_goal_ids[:],
+        )
+        if goal is None:
             return
 
-        lt_ids = self.selected_long_term_goal_ids[:]
-
-        actions = []
-        for text in actions_texts:
-            actions.append(
-                {"id": str(uuid.uuid4()), "text": text, "done": False, "created_at": now_str(), "completed_at": None}
-            )
-
-        goal = {
-            "id": str(uuid.uuid4()),
-            "long_term": long_term,
-            "long_term_goal_id": lt_ids[0] if lt_ids else None,
-            "long_term_goal_ids": lt_ids,
-            "current_goal": current_goal,
-            "actions": actions,
-            "done": False,
-            "created_at": now_str(),
-            "completed_at": None,
-        }
-
-        self.store["active_goal"] = goal
-        save_data(self.store)
-
         self.current_goal_edit.clear()
         self.pending_actions_list.clear()
         self.action_input_edit.clear()
 
-        self.refresh_main_state()
-        self.open_focus_window()
+        self.open_focus_window(goal["id"])
 
     # ---------- 悬浮卡片交互 ----------
-    def open_focus_window(self):
-        goal = self.get_active_goal()
-        if goal is None:
-            QMessageBox.information(self, "没有卡片", "当前没有进行中的专注卡片。")
+    def open_focus_window(self, goal_id: str):
+        if self.repo.active_goal(goal_id) is None:
+            QMessageBox.information(self, "没有卡片", "这张专注卡片已经完成或被删除。")
             return
-        if self.focus_window is None:
-            self.focus_window = FocusWindow(self)
-        self.focus_window.refresh()
-        self.focus_window.show()
-        self.focus_window.raise_()
-        self.focus_window.activateWindow()
-
-    def add_action_from_card(self, text: str):
-        goal = self.get_active_goal()
+        window = self.focus_windows.get(goal_id)
+        if window is None:
+            window = FocusWindow(self, goal_id)
+            # 新窗口错开一点，避免和已打开的卡片完全重叠
+            shown = [w for w in self.focus_windows.values() if w.isVisible()]
+            if shown:
+                window.move(shown[-1].pos() + QPoint(30, 30))
+            self.focus_windows[goal_id] = window
+        window.refresh()
+        window.show()
+        window.raise_()
+        window.activateWindow()
+
+    def open_selected_focus_window(self):
+        goal = self.selected_active_goal()
         if goal is None:
+            QMessageBox.information(self, "没有卡片", "当前没有进行中的专注卡片。")
             return
-        goal["actions"].append(
-            {"id": str(uuid.uuid4()), "text": text, "done": False, "created_at": now_str(), "completed_at": None}
-        )
-        save_data(self.store)
-        self.refresh_main_state()
+        self.open_focus_window(goal["id"])
+
+    def on_active_item_double_clicked(self, item: QListWidgetItem):
+        self.open_focus_window(item.data(Qt.UserRole))
+
+    def refresh_focus_window(self, goal_id: str):
+        window = self.focus_windows.get(goal_id)
+        if window is not None and window.isVisible():
+            window.refresh()
+
+    def close_focus_window(self, goal_id: str):
+        window = self.focus_windows.pop(goal_id, None)
+        if window is not None:
+            window.hide()
+            window.deleteLater()
+
+    def add_action_from_card(self, goal_id: str, text: str):
+        self.run_service(self.service.add_action, goal_id, text)
 
     def modify_action_from_card(self, action_id: str, text: str | None = None, done: bool | None = None):
-        goal = self.get_active_goal()
-        if goal is None:
-            return
-        celebrate_action = False
-        for a in goal["actions"]:
-            if a["id"] == action_id:
-                if text is not None:
-                    a["text"] = text
-                if done is not None:
-                    old_done = a.get("done", False)
-                    a["done"] = done
-                    if done:
-                        a["completed_at"] = now_str()
-                        if not old_done:
-                            celebrate_action = True
-                    else:
-                        a["completed_at"] = None
-                break
-        save_data(self.store)
-        self.refresh_main_state()
-        if celebrate_action:
+        if self.run_service(self.service.update_action, action_id, text=text, done=done):
             self.show_celebration(kind="action", text="关键动作完成，继续保持节奏！")
 
-    def reorder_actions_from_card(self, ordered_ids: list[str]):
-        goal = self.get_active_goal()
-        if goal is None:
-            return
-        id_to_action = {a["id"]: a for a in goal["actions"]}
-        new_actions = []
-        for aid in ordered_ids:
-            if aid in id_to_action:
-                new_actions.append(id_to_action[aid])
-        for a in goal["actions"]:
-            if a["id"] not in ordered_ids:
-                new_actions.append(a)
-        goal["actions"] = new_actions
-        save_data(self.store)
-        self.refresh_main_state()
+    def reorder_actions_from_card(self, goal_id: str, ordered_ids: list[str]):
+        self.run_service(self.service.reorder_actions, goal_id, ordered_ids)
 
     def delete_action_from_card(self, action_id: str):
-        goal = self.get_active_goal()
+        goal = self.repo.action_goal(action_id)
         if goal is None:
             return
-        actions = goal["actions"]
-        if len(actions) <= 1:
+        if len(goal["actions"]) <= 1:
             reply = QMessageBox.question(
                 self,
                 "删除卡片",
                 "这是最后一个关键动作，如果删除，将一起删除整张专注卡片。\n确定要继续吗？",
             )
-            if reply == QMessageBox.Yes:
-                self.store["active_goal"] = None
-                save_data(self.store)
-                self.refresh_main_state()
-            return
-        goal["actions"] = [a for a in actions if a["id"] != action_id]
-        save_data(self.store)
-        self.refresh_main_state()
+            if reply != QMessageBox.Yes:
+                return
+        self.service.delete_action(action_id)
 
-    def toggle_all_actions_from_card(self):
-        goal = self.get_active_goal()
-        if goal is None:
-            return
-        actions = goal["actions"]
-        if not actions:
-            return
-        any_undone = any(not a.get("done") for a in actions)
-        target_done = True if any_undone else False
-        for a in actions:
-            a["done"] = target_done
-            a["completed_at"] = now_str() if target_done else None
-        save_data(self.store)
-        self.refresh_main_state()
+    def toggle_all_actions_from_card(self, goal_id: str):
+        self.run_service(self.service.toggle_all_actions, goal_id)
 
-    def finish_goal_if_completed_from_card(self):
-        goal = self.get_active_goal()
-        if goal is None:
-            return
-        if not goal["actions"]:
-            QMessageBox.warning(self, "无法完成", "这张卡片没有任何关键动作，无法标记为完成。")
-            return
-        if not all(a.get("done") for a in goal["actions"]):
-            QMessageBox.information(self, "尚未完成", "还有关键动作没有完成，请先勾选完成全部关键动作。")
+    def finish_goal_if_completed_from_card(self, goal_id: str):
+        # 归档后 refresh_changed 会关闭这张卡片的窗口
+        if self.run_service(self.service.finish_goal, goal_id) is None:
             return
 
-        goal["done"] = True
-        goal["completed_at"] = now_str()
-
-        self.store.setdefault("archive", []).insert(0, goal)
-        self.store["total_completed_count"] = self.store.get("total_completed_count", 0) + 1
-
-        self.increment_long_term_progress(goal)
-
-        self.store["active_goal"] = None
-        save_data(self.store)
-
         self.show_celebration(kind="card", text="本次目标已成功实现，干得漂亮！")
-        self.refresh_main_state()
-
-        if self.focus_window is not None:
-            self.focus_window.hide()
         self.tabs.setCurrentWidget(self.plan_tab)
 
-    def increment_long_term_progress(self, goal: dict):
-        lt_ids = goal.get("long_term_goal_ids") or []
-        if not lt_ids and goal.get("long_term_goal_id"):
-            lt_ids = [goal["long_term_goal_id"]]
-        if not lt_ids:
-            return
+    def reward_player(self):
+        if self._player is None:
+            from PySide6.QtMultimedia import QAudioOutput, QMediaPlayer
 
-        for lt_id in lt_ids:
-            g = self.find_long_term_goal(lt_id)
-            if not g:
-                continue
-            g["completed_count"] = int(g.get("completed_count", 0) or 0) + 1
+            self._audio_output = QAudioOutput()
+            self._audio_output.setVolume(1.0)
+            self._player = QMediaPlayer()
+            self._player.setAudioOutput(self._audio_output)
+            self._player.setSource(QUrl.fromLocalFile(REWARD_SOUND_PATH))
+        return self._player
 
-            target = int(g.get("target_count", 100) or 100)
-            done = int(g.get("completed_count", 0) or 0)
-            if done >= target and not g.get("completed_at"):
-                g["completed_at"] = now_str()
-
-        save_data(self.store)
-
-    # ---------- 庆祝动画 & 全局通知 ----------
     def play_reward_sound(self):
         if REWARD_SOUND_PATH and os.path.exists(REWARD_SOUND_PATH):
             try:
-                url = QUrl.fromLocalFile(REWARD_SOUND_PATH)
-                self._player.setSource(url)
-                self._audio_output.setVolume(1.0)
-                self._player.play()
+                player = self.reward_player()
+                player.setPosition(0)
+                player.play()
                 return
             except Exception:
                 pass
         if winsound:
             winsound.MessageBeep()
 
-    def show_celebration(self, kind: str, text: str):
-        self.play_reward_sound()
+    def celebration_overlay(self, kind: str) -> CelebrationOverlay:
+        overlay = self._celebration_overlays.get(kind)
+        if overlay is None:
+            overlay = CelebrationOverlay(kind, self.assets)
+            self._celebration_overlays[kind] = overlay
+        return overlay
 
-        if self._celebration_overlay is not None:
-            self._celebration_overlay.close()
-            self._celebration_overlay = None
+    def prepare_celebration_overlays(self):
+        for kind in CelebrationOverlay.HOLD_MS:
+            self.celebration_overlay(kind)
 
-        # 单个动作完成的轻量弹窗
-        if kind == "action":
-            overlay = QWidget(None, Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
-            overlay.setAttribute(Qt.WA_TranslucentBackground, True)
+    @traced()
+    def show_celebration(self, kind: str, text: str):
+        self.play_reward_sound()
 
-            w, h = 900, 520
-            screen = QApplication.primaryScreen()
-            if screen is not None:
-                rect = screen.availableGeometry()
-                x = rect.x() + (rect.width() - w) // 2
-                y = rect.y() + (rect.height() - h) // 2
-            else:
-                x, y = 300, 200
-            overlay.setGeometry(x, y, w, h)
-
-            root_layout = QVBoxLayout(overlay)
-            root_layout.setContentsMargins(0, 0, 0, 0)
-            root_layout.setSpacing(10)
-            root_layout.setAlignment(Qt.AlignCenter)
-
-            if REWARD_ANIMATION_GIF_PATH and os.path.exists(REWARD_ANIMATION_GIF_PATH):
-                anim_label = QLabel()
-                anim_label.setMinimumSize(640, 360)
-                anim_label.setMaximumSize(640, 360)
-                anim_label.setScaledContents(True)
-                movie = QMovie(REWARD_ANIMATION_GIF_PATH)
-                movie.setScaledSize(QSize(640, 360))
-                anim_label.setMovie(movie)
-                movie.start()
-                overlay._movie = movie
-                root_layout.addWidget(anim_label, alignment=Qt.AlignCenter)
-            else:
-                txt = QLabel("🎉")
-                txt.setStyleSheet("font-size: 44px; color: white;")
-                root_layout.addWidget(txt, alignment=Qt.AlignCenter)
-
-            badge_shown = False
-            if REWARD_BADGE_PATH and os.path.exists(REWARD_BADGE_PATH):
-                pix = QPixmap(REWARD_BADGE_PATH)
-                if not pix.isNull():
-                    badge_label = QLabel()
-                    pix = pix.scaled(140, 140, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    badge_label.setPixmap(pix)
-                    badge_label.setAlignment(Qt.AlignCenter)
-                    badge_label.setStyleSheet("background: transparent;")
-                    root_layout.addWidget(badge_label, alignment=Qt.AlignCenter)
-                    badge_shown = True
-            if not badge_shown:
-                fallback_label = QLabel("🏆")
-                fallback_label.setAlignment(Qt.AlignCenter)
-                fallback_label.setStyleSheet("font-size: 44px; background: transparent;")
-                root_layout.addWidget(fallback_label, alignment=Qt.AlignCenter)
-
-            msg = QLabel(text)
-            msg.setStyleSheet(
-                "color: #F5F1DC; font-size: 22px; "
-                "background-color: rgba(255,144,19,230); "
-                "padding: 14px 28px; border-radius: 14px;"
-            )
-            msg.setWordWrap(True)
-            msg.setAlignment(Qt.AlignCenter)
-            msg.setMinimumWidth(520)
-            msg.setMaximumWidth(920)
-            root_layout.addWidget(msg, alignment=Qt.AlignCenter)
-
-            overlay.setWindowOpacity(1.0)
-            self._celebration_overlay = overlay
-            overlay.show()
-            overlay.raise_()
-
-            def start_fade_out():
-                if self._celebration_overlay is None:
-                    return
-                anim = QPropertyAnimation(overlay, b"windowOpacity")
-                anim.setDuration(600)
-                anim.setStartValue(1.0)
-                anim.setEndValue(0.0)
-
-                def on_finished():
-                    if self._celebration_overlay is overlay:
-                        self._celebration_overlay = None
-                    overlay.close()
-
-                anim.finished.connect(on_finished)
-                overlay._anim = anim
-                anim.start()
-
-            QTimer.singleShot(2600, start_fade_out)
+        card_overlay = self._celebration_overlays.get("card")
+        if kind == "action" and card_overlay is not None and card_overlay.isVisible():
+            # 整张卡片的庆祝正在全屏播放，单个动作的小弹窗并入其中，不再叠加
             return
+        if kind == "card":
+            action_overlay = self._celebration_overlays.get("action")
+            if action_overlay is not None:
+                action_overlay.dismiss()
 
-        # 整张卡片完成的全屏庆祝（这里把字体调到 50px）
-        overlay = QWidget(None, Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
-        overlay.setAttribute(Qt.WA_TranslucentBackground, True)
-
-        screen = QApplication.primaryScreen()
-        if screen is not None:
-            screen_rect = screen.geometry()
-        else:
-            screen_rect = QRect(0, 0, 1920, 1080)
-
-        screen_w = screen_rect.width()
-        screen_h = screen_rect.height()
-        overlay.setGeometry(screen_rect)
-
-        if REWARD_ANIMATION_GIF_PATH and os.path.exists(REWARD_ANIMATION_GIF_PATH):
-            bg_label = QLabel(overlay)
-            bg_label.setGeometry(0, 0, screen_w, screen_h)
-            bg_label.setScaledContents(True)
-            movie = QMovie(REWARD_ANIMATION_GIF_PATH)
-            movie.setScaledSize(QSize(screen_w, screen_h))
-            bg_label.setMovie(movie)
-            movie.start()
-            overlay._movie = movie
-        else:
-            bg_label = QLabel("🎉", overlay)
-            bg_label.setGeometry(0, 0, screen_w, screen_h)
-            bg_label.setAlignment(Qt.AlignCenter)
-            bg_label.setStyleSheet("font-size: 72px; color: white;")
-
-        info_box = QWidget(overlay)
-        info_box.setAttribute(Qt.WA_TranslucentBackground, True)
+        self.celebration_overlay(kind).play(text)
 
-        info_layout = QVBoxLayout(info_box)
-        info_layout.setContentsMargins(16, 16, 16, 16)
-        info_layout.setSpacing(18)
-        info_layout.setAlignment(Qt.AlignCenter)
+    # ---------- 归档 & 目标 ----------
+    def archive_ready(self) -> bool:
+        archive = self.store.get("archive")
+        return not hasattr(archive, "is_loaded") or archive.is_loaded()
 
-        badge_shown = False
-        if REWARD_BADGE_PATH and os.path.exists(REWARD_BADGE_PATH):
-            pix = QPixmap(REWARD_BADGE_PATH)
-            if not pix.isNull():
-                badge_label = QLabel(info_box)
-                pix = pix.scaled(720, 720, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                badge_label.setPixmap(pix)
-                badge_label.setAlignment(Qt.AlignCenter)
-                badge_label.setStyleSheet("background: transparent;")
-                info_layout.addWidget(badge_label, alignment=Qt.AlignCenter)
-                badge_shown = True
-        if not badge_shown:
-            fallback_label = QLabel("🏆", info_box)
-            fallback_label.setAlignment(Qt.AlignCenter)
-            fallback_label.setStyleSheet("font-size: 64px; background: transparent;")
-            info_layout.addWidget(fallback_label, alignment=Qt.AlignCenter)
-
-        msg_label = QLabel(info_box)
-        msg_label.setText(text)
-        msg_label.setWordWrap(True)
-        msg_label.setAlignment(Qt.AlignCenter)
-        msg_label.setMinimumWidth(int(screen_w * 0.45))
-        msg_label.setMaximumWidth(int(screen_w * 0.96))
-        msg_label.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Preferred)
-        msg_label.setStyleSheet(
-            "color: #F5F1DC; font-size: 45px; font-weight: 700; "
-            "background-color: rgba(255,144,19,240); "
-            "padding: 26px 44px; border-radius: 18px;"
-        )
-        msg_label.adjustSize()
-        info_layout.addWidget(msg_label, alignment=Qt.AlignCenter)
+    def on_archive_loaded(self):
+        # 重新加载或切换档案之前开始的解析，完成时 store 里已经是另一份归档了
+        if not self.archive_ready():
+            return
+        if self.tabs_ready:
+            self.archive_detail.setPlaceholderText("")
+            self.refresh_archive_tab()
+        self.start_archive_indexes()
 
-        info_box.adjustSize()
-        box_w = info_box.width()
-        box_h = info_box.height()
-        center_x = screen_rect.x() + (screen_w - box_w) // 2
-        center_y = screen_rect.y() + (screen_h - box_h) // 2 + 30
-        info_box.setGeometry(center_x, center_y, box_w, box_h)
-        info_box.raise_()
+    def start_archive_indexes(self):
+        if isinstance(self.store.get("archive"), ShardedArchive) and not self._archive_indexes_wanted:
+            return
+        # 分批建全文索引和统计，每批之间回到事件循环；期间的归档增删由 Repository 增量同步
+        self.repo.begin_archive_indexes()
+        QTimer.singleShot(0, self.archive_indexes_step)
 
-        self._celebration_overlay = overlay
-        overlay.show()
-        overlay.raise_()
+    def request_archive_indexes(self):
+        if self._archive_indexes_wanted:
+            return
+        self._archive_indexes_wanted = True
+        if self.archive_ready():
+            self.start_archive_indexes()
+
+    @traced()
+    def archive_indexes_step(self):
+        if not self.repo.archive_indexes_step(1000):
+            QTimer.singleShot(0, self.archive_indexes_step)
+        elif self.tabs.currentWidget() is self.stats_tab:
+            self.refresh_stats_tab()
+
+    @traced()
+    def refresh_archive_tab(self):
+        self.archive_model.reload()
+        self.refresh_archive_counters()
+        self.archive_detail.clear()
+        if not self.archive_ready():
+            self.archive_detail.setPlaceholderText("归档加载中…")
+        elif self.archive_filter_edit.text().strip():
+            self.on_archive_filter_changed(self.archive_filter_edit.text())
+
+    def archive_row_changed(self, goal_id: str):
+        self.archive_model.goal_changed(goal_id)
+        if self.archive_filter_edit.text().strip():
+            self.on_archive_filter_changed(self.archive_filter_edit.text())
+
+    def archive_row_removed(self, goal_id: str):
+        self.archive_model.goal_removed(goal_id)
+        self.archive_detail.clear()
+        if self.archive_filter_edit.text().strip():
+            self.on_archive_filter_changed(self.archive_filter_edit.text())
 
-        def close_overlay():
-            if self._celebration_overlay is overlay:
-                self._celebration_overlay.close()
-                self._celebration_overlay = None
+    @traced()
+    def on_archive_filter_changed(self, text: str):
+        if not self.archive_ready():
+            # 归档加载完成后 refresh_archive_tab 会按当前输入重新搜索
+            return
+        query = text.strip()
+        # 搜索结果按相关度排列，set_results 同时清掉表头排序
+        self.archive_model.set_results(self.repo.search_archive(query) if query else None)
+        self.archive_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.archive_detail.clear()
 
-        QTimer.singleShot(3920, close_overlay)
+    def selected_archive_goal(self):
+        """当前选中的归档卡片（已换算掉排序/搜索），未选中返回 None。"""
+        rows = self.archive_table.selectionModel().selectedRows()
+        if not rows:
+            return None
+        return self.archive_model.goal_at(rows[0].row())
 
-    # ---------- 归档 & 目标 ----------
-    def refresh_archive_tab(self):
+    def refresh_archive_counters(self):
         archive = self.store.get("archive", [])
-        self.archive_table.setRowCount(len(archive))
-        for row, g in enumerate(archive):
-            self.archive_table.setItem(row, 0, QTableWidgetItem(g.get("long_term", "")))
-            self.archive_table.setItem(row, 1, QTableWidgetItem(g.get("current_goal", "")))
-            self.archive_table.setItem(row, 2, QTableWidgetItem(g.get("created_at", "")))
-            self.archive_table.setItem(row, 3, QTableWidgetItem(g.get("completed_at", "")))
-
-        total_completed = self.store.get("total_completed_count", len(archive))
-        tokens_used = self.store.get("delete_tokens_used", 0)
-        tokens_total = total_completed // 5
-        available_tokens = max(tokens_total - tokens_used, 0)
+        total_completed, available_tokens = self.service.delete_tokens()
 
         self.token_info_label.setText(f"累计完成 {total_completed} 张专注卡片，可用删除机会：{available_tokens} 次。")
-        self.delete_with_token_btn.setEnabled(available_tokens > 0 and len(archive) > 0)
-        self.archive_detail.clear()
+        self.delete_with_token_btn.setEnabled(available_tokens > 0 and self.archive_ready() and len(archive) > 0)
 
     def delete_archive_item_with_token(self):
-        archive = self.store.get("archive", [])
-        total_completed = self.store.get("total_completed_count", len(archive))
-        tokens_used = self.store.get("delete_tokens_used", 0)
-        tokens_total = total_completed // 5
-        available_tokens = max(tokens_total - tokens_used, 0)
+        _, available_tokens = self.service.delete_tokens()
 
         if available_tokens <= 0:
             QMessageBox.information(self, "没有删除机会", "当前没有可用的删除机会。")
             return
 
-        rows = self.archive_table.selectionModel().selectedRows()
-        if not rows:
+        g = self.selected_archive_goal()
+        if g is None:
             QMessageBox.information(self, "未选择卡片", "请先在列表中选择一条要删除的卡片。")
             return
-        row = rows[0].row()
-        if row < 0 or row >= len(archive):
-            return
 
-        g = archive[row]
         reply = QMessageBox.question(self, "确认删除", f"将消耗一次删除机会，删除卡片：\n\n{g.get('current_goal','')}\n\n确定要删除吗？")
         if reply != QMessageBox.Yes:
             return
 
-        del archive[row]
-        self.store["archive"] = archive
-        self.store["delete_tokens_used"] = tokens_used + 1
-        save_data(self.store)
-        self.refresh_archive_tab()
+        self.run_service(self.service.delete_archived_goal, g["id"])
 
     def on_archive_selection_changed(self):
-        rows = self.archive_table.selectionModel().selectedRows()
-        if not rows:
+        g = self.selected_archive_goal()
+        if g is None:
             return
-        row = rows[0].row()
-        archive = self.store.get("archive", [])
-        if row < 0 or row >= len(archive):
-            return
-        g = archive[row]
 
         lines = []
         lines.append(f"长期目标：{g.get('long_term','')}")
@@ -1653,68 +2339,121 @@ class GoalApp(QMainWindow):
         self.archive_detail.setPlainText("\n".join(lines))
 
     def save_selected_archive_as_template(self):
-        rows = self.archive_table.selectionModel().selectedRows()
-        if not rows:
+        g = self.selected_archive_goal()
+        if g is None:
             QMessageBox.information(self, "未选择卡片", "请先在归档列表中选择一条要保存为模板的卡片。")
             return
-        row = rows[0].row()
-        archive = self.store.get("archive", [])
-        if row < 0 or row >= len(archive):
-            return
-        g = archive[row]
 
         default_name = g.get("current_goal", "").strip() or "未命名模板"
         dlg = TemplateNameDialog(self, default_name=default_name)
         if dlg.exec() != QDialog.Accepted:
             return
         name = dlg.get_name()
-        if not name:
-            QMessageBox.warning(self, "名称为空", "请输入模板名称。")
-            return
-
-        actions_texts = [a.get("text", "").strip() for a in (g.get("actions") or []) if a.get("text", "").strip()]
-        if not actions_texts:
-            QMessageBox.warning(self, "无法保存", "该卡片没有有效的关键动作，无法保存为模板。")
-            return
-
-        lt_ids = g.get("long_term_goal_ids") or []
-        if not lt_ids and g.get("long_term_goal_id"):
-            lt_ids = [g["long_term_goal_id"]]
 
-        existing = None
-        for t in self.get_templates():
-            if (t.get("name") or "").strip() == name.strip():
-                existing = t
-                break
-
-        if existing:
+        if name and self.repo.template_named(name):
             reply = QMessageBox.question(self, "覆盖模板？", f"已存在同名模板「{name}」。\n\n是否覆盖为这张卡片的内容？")
             if reply != QMessageBox.Yes:
                 return
-            existing["long_term_text"] = g.get("long_term", "")
-            existing["long_term_goal_id"] = lt_ids[0] if lt_ids else None
-            existing["long_term_goal_ids"] = lt_ids
-            existing["current_goal"] = g.get("current_goal", "")
-            existing["actions_texts"] = actions_texts
-            save_data(self.store)
-        else:
-            t = {
-                "id": str(uuid.uuid4()),
-                "name": name,
-                "long_term_text": g.get("long_term", ""),
-                "long_term_goal_id": lt_ids[0] if lt_ids else None,
-                "long_term_goal_ids": lt_ids,
-                "current_goal": g.get("current_goal", ""),
-                "actions_texts": actions_texts,
-                "created_at": now_str(),
-            }
-            self.store.setdefault("templates", []).insert(0, t)
-            save_data(self.store)
+        if self.run_service(self.service.save_goal_as_template, g, name) is None:
+            return
 
         QMessageBox.information(self, "已保存", f"已保存为工作流模板：{name}")
-        self.refresh_main_state()
         self.tabs.setCurrentWidget(self.goal_tab)
 
+    # ---------- 统计 ----------
+    def on_tab_changed(self, index: int):
+        # 首帧之后、延后构建之前就切换了标签页
+        self.build_deferred_tabs()
+        widget = self.tabs.widget(index)
+        # 统计从存储引擎保存的结果还原时不用遍历归档；全文检索仍要建索引
+        if widget is self.archive_tab or (widget is self.stats_tab and not self.repo.stats_ready):
+            self.request_archive_indexes()
+        if self.tabs.widget(index) is self.stats_tab:
+            self.refresh_stats_tab()
+
+    @traced()
+    def refresh_stats_tab(self):
+        """只读 repo.stats 里增量维护的聚合，不扫描归档。"""
+        if not self.repo.stats_ready:
+            self.stats_summary_label.setText("正在统计归档数据…")
+            self.stats_detail.clear()
+            return
+        stats = self.repo.stats
+        total_completed, _ = self.service.delete_tokens()
+        total_actions = sum(stats.actions_by_day.values())
+        self.stats_summary_label.setText(
+            f"累计完成 {total_completed} 张专注卡片（归档中 {len(stats)} 张），完成关键动作 {total_actions} 个。\n"
+            f"连续完成：当前 {stats.current_streak()} 天，最长 {stats.longest_streak()} 天。"
+            f"  卡片用时中位数：{format_duration(stats.median_duration())}"
+        )
+
+        weekdays = "一二三四五六日"
+        lines = ["最近 14 天："]
+        days = stats.per_day(stats.cards_by_day, 14)
+        actions = dict(stats.per_day(stats.actions_by_day, 14))
+        peak = max((n for _, n in days), default=0) or 1
+        for d, n in reversed(days):
+            bar = "█" * round(n * 20 / peak)
+            lines.append(f"{d:%m-%d} 周{weekdays[d.weekday()]}  {bar} {n} 张 / {actions[d]} 个动作")
+
+        lines.append("")
+        lines.append("最近 8 周：")
+        week_actions = dict(stats.per_week(stats.actions_by_week, 8))
+        for d, n in reversed(stats.per_week(stats.cards_by_week, 8)):
+            lines.append(f"{d:%m-%d} 起  {n} 张 / {week_actions[d]} 个动作")
+
+        goals = self.get_long_term_goals()
+        if goals:
+            lines.append("")
+            lines.append("长期目标推进速度：")
+            for g in goals:
+                v = stats.long_term_velocity(g["id"])
+                lines.append(
+                    f"{g.get('title', '')}：累计 {v['total']} 张，平均每周 {v['per_week']:.1f} 张，"
+                    f"最近 4 周每周 {v['recent']:.1f} 张"
+                )
+        self.stats_detail.setPlainText("\n".join(lines))
+
+    def show_completion_heatmap(self):
+        if not self.archive_ready():
+            QMessageBox.information(self, "请稍候", "归档还在加载中，请稍后再试。")
+            return
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            cols = analytics.ArchiveColumns(self.store.get("archive", []))
+            heat = analytics.hour_weekday_heatmap(cols.completed)
+            months, month_counts = analytics.histogram(cols.completed, "M")
+            _, rates = analytics.rolling_rate(cols.completed, 7)
+            dur_counts, _ = analytics.duration_histogram(cols)
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        shades = " ░▒▓█"
+        peak = int(heat.max()) or 1
+        lines = ["完成时段分布（行：星期，列：0-23 点，颜色越深完成越多）：", "     " + "".join(f"{h:<3d}" for h in range(24))]
+        for wd, row in enumerate(heat):
+            # 0 次留空，其余按占峰值的比例映射到 1..4 级
+            levels = [0 if n == 0 else 1 + int(n) * (len(shades) - 2) // peak for n in row]
+            cells = "".join(shades[lv] * 2 + " " for lv in levels)
+            lines.append(f"周{'一二三四五六日'[wd]}  {cells}")
+
+        lines.append("")
+        lines.append("最近 6 个月：")
+        for month, n in list(zip(months, month_counts))[-6:]:
+            lines.append(f"{month}  {n} 张")
+        if len(rates):
+            lines.append("")
+            lines.append(f"最近 7 天平均每天完成 {rates[-1]:.1f} 张。")
+
+        labels = ["1 小时内", "1-12 小时", "12-24 小时", "1-2 天", "2-3 天", "3-7 天", "1-2 周", "2 周-1 个月", "1 个月以上"]
+        lines.append("")
+        lines.append("卡片用时分布：")
+        for label, n in zip(labels, dur_counts):
+            lines.append(f"{label}：{n} 张")
+
+        self.stats_heatmap_view.setPlainText("\n".join(lines))
+        self.stats_heatmap_view.show()
+
     def refresh_goal_tab(self):
         self.lt_list.clear()
         goals = self.get_long_term_goals()
@@ -1747,20 +2486,7 @@ class GoalApp(QMainWindow):
         if dlg.exec() != QDialog.Accepted:
             return
         title, target = dlg.get_values()
-        if not title:
-            QMessageBox.warning(self, "信息不完整", "请输入长期目标名称。")
-            return
-        g = {
-            "id": str(uuid.uuid4()),
-            "title": title,
-            "target_count": int(target),
-            "completed_count": 0,
-            "created_at": now_str(),
-            "completed_at": None,
-        }
-        self.store.setdefault("long_term_goals", []).insert(0, g)
-        save_data(self.store)
-        self.refresh_main_state()
+        self.run_service(self.service.add_long_term_goal, title, target)
 
     def edit_selected_long_term_goal(self):
         item = self.lt_list.currentItem()
@@ -1774,13 +2500,7 @@ class GoalApp(QMainWindow):
         if dlg.exec() != QDialog.Accepted:
             return
         title, target = dlg.get_values()
-        if not title:
-            QMessageBox.warning(self, "信息不完整", "请输入长期目标名称。")
-            return
-        g["title"] = title
-        g["target_count"] = int(target)
-        save_data(self.store)
-        self.refresh_main_state()
+        self.run_service(self.service.update_long_term_goal, gid, title, target)
 
     def delete_selected_long_term_goal(self):
         item = self.lt_list.currentItem()
@@ -1797,15 +2517,28 @@ class GoalApp(QMainWindow):
         )
         if reply != QMessageBox.Yes:
             return
-        self.store["long_term_goals"] = [x for x in self.get_long_term_goals() if x.get("id") != gid]
-        save_data(self.store)
-        self.refresh_main_state()
+        self.service.delete_long_term_goal(gid)
 
 
 def main():
-    app = QApplication(sys.argv)
+    argv = profiling.configure(sys.argv)
+    app = QApplication(argv)
+    instance = SingleInstance()
+    if instance.notify_running():
+        return
+    if not instance.listen():
+        # 另一个同时启动的实例抢先开始了监听
+        instance.notify_running()
+        return
     QApplication.setStyle("Fusion")
-    window = GoalApp()
+    try:
+        window = GoalApp()
+    except LockError as e:
+        QMessageBox.critical(None, "无法打开数据", f"数据文件正被其它程序使用，请稍后再试。\n\n{e}")
+        return
+    instance.on_activate = window.tray_show_main_window
+    # 切换档案会换掉 window.storage，退出时关闭的是当时在用的那一个
+    app.aboutToQuit.connect(window.shutdown)
     window.show()
     sys.exit(app.exec())
 
@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """让 CLI 和 profiles 都使用临时数据目录。"""
+    monkeypatch.setenv("GOALFOCUS_DATA_DIR", str(tmp_path))
+    return tmp_path
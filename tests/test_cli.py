@@ -0,0 +1,39 @@
+import pytest
+
+from goalfocus_core import cli
+from goalfocus_core.service import GoalService
+from goalfocus_core.storage import open_storage
+
+
+def _load(engine, directory):
+    service = GoalService(open_storage(engine, str(directory)))
+    state = [g["current_goal"] for g in service.active_goals()], [g["id"] for g in service.repo.archive()]
+    service.close()
+    return state
+
+
+@pytest.mark.parametrize("engine", ["json", "sqlite"])
+def test_batch_is_all_or_nothing(engine, data_dir, tmp_path, capsys):
+    assert cli.main(["--storage", engine, "new", "--long-term", "长期", "--goal", "当下", "动作"]) == 0
+    ops = tmp_path / "ops.txt"
+    ops.write_text("check 1\nfinish\nno-such-command\n", encoding="utf-8")
+    capsys.readouterr()
+
+    assert cli.main(["--storage", engine, "batch", str(ops)]) == 1
+    err = capsys.readouterr().err
+    assert err.startswith("第 3 行无法解析")
+    assert "usage" not in err
+
+    # 前两行已经完成并归档了卡片，出错后都不应写入
+    assert _load(engine, data_dir) == (["当下"], [])
+
+
+@pytest.mark.parametrize("engine", ["json", "sqlite"])
+def test_batch_commits_once_on_success(engine, data_dir, tmp_path):
+    assert cli.main(["--storage", engine, "new", "--long-term", "长期", "--goal", "当下", "动作"]) == 0
+    ops = tmp_path / "ops.txt"
+    ops.write_text("# 注释\ncheck 1\nfinish\n", encoding="utf-8")
+
+    assert cli.main(["--storage", engine, "batch", str(ops)]) == 0
+    active, archive = _load(engine, data_dir)
+    assert active == [] and len(archive) == 1
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from goalfocus_core.service import GoalError, GoalService
+from goalfocus_core.storage import DATA_FILE, JournalStore
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = GoalService(JournalStore(os.path.join(tmp_path, DATA_FILE), write_delay=0))
+    yield service
+    service.close()
+
+
+def _finish(service, text="当下"):
+    goal = service.create_goal("长期", text, ["动作"])
+    service.toggle_all_actions(goal["id"])
+    service.finish_goal(goal["id"])
+    return goal["id"]
+
+
+def test_undo_and_redo_finishing_a_card(service):
+    goal_id = _finish(service)
+    assert service.repo.archive_goal(goal_id) is not None
+
+    assert service.undo() == "完成卡片"
+    assert service.active_goal(goal_id) is not None
+    assert service.repo.archive_goal(goal_id) is None
+    assert service.store["total_completed_count"] == 0
+
+    assert service.redo() == "完成卡片"
+    assert service.active_goal(goal_id) is None
+    assert service.repo.archive()[0]["id"] == goal_id
+    assert service.store["total_completed_count"] == 1
+
+
+def test_undo_deleting_an_archived_card_restores_position_and_token(service):
+    ids = [_finish(service, f"卡片{i}") for i in range(3)]
+    service.store["total_completed_count"] = 10  # 攒够删除机会
+    used = service.store.get("delete_tokens_used", 0)
+
+    service.delete_archived_goal(ids[1])
+    assert [g["id"] for g in service.repo.archive()] == [ids[2], ids[0]]
+
+    service.undo()
+    assert [g["id"] for g in service.repo.archive()] == [ids[2], ids[1], ids[0]]
+    assert service.store.get("delete_tokens_used", 0) == used
+
+
+def test_undo_survives_reload_as_persisted_state(service, tmp_path):
+    goal_id = _finish(service)
+    service.undo()
+    service.close()
+
+    reloaded = GoalService(JournalStore(os.path.join(tmp_path, DATA_FILE), write_delay=0))
+    assert reloaded.active_goal(goal_id) is not None
+    assert reloaded.repo.archive_goal(goal_id) is None
+    reloaded.close()
+
+
+def test_new_change_clears_redo(service):
+    goal = service.create_goal("长期", "当下", ["动作"])
+    service.add_action(goal["id"], "第二个")
+    service.undo()
+    assert service.history.can_redo()
+    service.add_action(goal["id"], "第三个")
+    assert not service.history.can_redo()
+
+
+def test_failed_operation_does_not_leave_an_undo_step(service):
+    goal = service.create_goal("长期", "当下", ["动作"])
+    label = service.history.undo_label()
+    with pytest.raises(GoalError):
+        service.finish_goal(goal["id"])  # 动作还没勾选
+    service.add_long_term_goal("另一个长期目标")
+    service.undo()
+    # 撤销的是刚才添加长期目标这一步，不是失败的操作
+    assert service.history.undo_label() == label
@@ -0,0 +1,103 @@
+import json
+import os
+
+from goalfocus_core.service import GoalService
+from goalfocus_core.storage import DATA_FILE, JournalStore
+
+
+def _open(path) -> GoalService:
+    return GoalService(JournalStore(path, write_delay=0))
+
+
+def _cards(path) -> list[str]:
+    service = _open(path)
+    cards = sorted(g["current_goal"] for g in service.active_goals())
+    service.close()
+    return cards
+
+
+def _journal_lines(path) -> list[dict]:
+    with open(path + ".journal", "rb") as f:
+        return [json.loads(line) for line in f.read().splitlines() if line.strip()]
+
+
+def _write_cards(path, *texts):
+    service = _open(path)
+    for text in texts:
+        service.create_goal("长期", text, ["动作"])
+    service.close()
+
+
+def test_changes_are_replayed_from_the_journal(tmp_path):
+    path = str(tmp_path / DATA_FILE)
+    _write_cards(path, "一", "二")
+    # 小改动只追加日志，不重写快照
+    assert any(rec.get("coll") == "active_goals" for rec in _journal_lines(path))
+    assert _cards(path) == ["一", "二"]
+
+
+def test_torn_last_line_is_ignored_and_overwritten(tmp_path):
+    path = str(tmp_path / DATA_FILE)
+    _write_cards(path, "一")
+    with open(path + ".journal", "ab") as f:
+        f.write(b'{"op":"put","coll":"active_goals","id":"x","val')  # 崩溃时写了一半
+    assert _cards(path) == ["一"]
+
+    # 之后的写入不能接在半行后面，否则这一行和它之后的记录都读不出来
+    _write_cards(path, "二")
+    _write_cards(path, "三")
+    assert _cards(path) == ["一", "三", "二"]
+
+
+def test_journal_from_another_generation_is_ignored(tmp_path):
+    path = str(tmp_path / DATA_FILE)
+    _write_cards(path, "一")
+    with open(path + ".journal", "rb") as f:
+        header, rest = f.read().split(b"\n", 1)
+    # 模拟在替换快照和重置日志之间崩溃：日志还是上一代的
+    with open(path + ".journal", "wb") as f:
+        f.write(json.dumps({"op": "base", "journal_id": "stale"}).encode() + b"\n" + rest)
+    before = _cards(path)
+
+    _write_cards(path, "二")
+    assert _cards(path) == sorted(before + ["二"])
+
+
+def test_background_compaction_keeps_every_change(tmp_path):
+    path = str(tmp_path / DATA_FILE)
+    service = GoalService(JournalStore(path, write_delay=0, min_compact_bytes=0))
+    goal = service.create_goal("长期", "当下", ["动作"])
+    for i in range(30):
+        service.add_action(goal["id"], f"动作{i}")
+    service.close()
+
+    with open(path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    # 压缩过：快照里已经有这张卡片，日志属于快照的这一代
+    assert [g["id"] for g in snapshot["active_goals"]] == [goal["id"]]
+    assert _journal_lines(path)[0] == {"op": "base", "journal_id": snapshot["journal_id"]}
+
+    service = _open(path)
+    assert len(service.active_goal(goal["id"])["actions"]) == 31
+    service.close()
+
+
+def test_reload_matches_the_state_in_memory(tmp_path):
+    path = str(tmp_path / DATA_FILE)
+    service = _open(path)
+    goal = service.create_goal("长期", "当下", ["动作"])
+    service.toggle_all_actions(goal["id"])
+    service.finish_goal(goal["id"])
+    service.create_goal("长期", "下一张", ["动作"])
+    service.save()
+    service.storage.flush()
+    expected = json.loads(json.dumps({k: v for k, v in service.store.items() if k != "archive"}, default=str))
+    archive = [g["id"] for g in service.repo.archive()]
+    service.close()
+
+    reloaded = _open(path)
+    actual = json.loads(json.dumps({k: v for k, v in reloaded.store.items() if k != "archive"}, default=str))
+    assert actual == expected
+    assert [g["id"] for g in reloaded.repo.archive()] == archive
+    reloaded.close()
+    assert os.path.exists(path)
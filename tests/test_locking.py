@@ -0,0 +1,58 @@
+import pytest
+
+from goalfocus_core.locking import FileLock, LockError
+from goalfocus_core.service import GoalService
+from goalfocus_core.storage import DATA_FILE, LOCK_SUFFIX, JournalStore
+
+
+def _journal(path) -> bytes:
+    with open(path + ".journal", "rb") as f:
+        return f.read()
+
+
+def test_lock_timeout_raises(tmp_path):
+    path = str(tmp_path / "x.lock")
+    with FileLock(path):
+        with pytest.raises(LockError):
+            with FileLock(path, timeout=0.1):
+                pass
+    # 失败后线程锁已经释放，同一个对象还能正常加锁
+    lock = FileLock(path, timeout=0.1)
+    with pytest.raises(LockError):
+        with FileLock(path):
+            with lock:
+                pass
+    with lock:
+        pass
+
+
+def test_changes_wait_for_the_lock_instead_of_writing_unlocked(tmp_path):
+    path = str(tmp_path / DATA_FILE)
+    service = GoalService(JournalStore(path, write_delay=0))
+    service.create_goal("长期", "第一张", ["动作"])
+    service.storage.flush()
+    before = _journal(path)
+
+    service.storage._lock.timeout = 0.1
+    other = FileLock(path + LOCK_SUFFIX)
+    with other:
+        service.create_goal("长期", "第二张", ["动作"])
+        service.storage.flush()
+        assert _journal(path) == before
+
+    # 锁释放后，留在写线程里的修改照常写出
+    service.storage.flush()
+    service.close()
+    reloaded = GoalService(JournalStore(path, write_delay=0))
+    assert sorted(g["current_goal"] for g in reloaded.active_goals()) == ["第一张", "第二张"]
+    reloaded.close()
+
+
+def test_load_raises_when_locked(tmp_path):
+    path = str(tmp_path / DATA_FILE)
+    store = JournalStore(path)
+    store._lock.timeout = 0.1
+    with FileLock(path + LOCK_SUFFIX):
+        with pytest.raises(LockError):
+            store.load()
+    assert store.load()["active_goals"] == []
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from goalfocus_core.model import Action, Goal, LongTermGoal, Template, format_ts, json_default, parse_ts
+
+GOAL = {
+    "id": "g1",
+    "long_term": "长期",
+    "long_term_goal_id": "lt1",
+    "long_term_goal_ids": ["lt1"],
+    "current_goal": "当下",
+    "done": True,
+    "created_at": "2024-03-01 08:30:00",
+    "completed_at": "2024-03-02 21:15:09",
+    "actions": [
+        {"id": "a1", "text": "动作", "done": True, "created_at": "2024-03-01 08:30:00", "completed_at": None},
+    ],
+}
+
+
+def _json(record) -> dict:
+    return json.loads(json.dumps(record, default=json_default))
+
+
+def test_goal_round_trips_to_the_same_json():
+    goal = Goal(json.loads(json.dumps(GOAL)))
+    assert _json(goal) == GOAL
+    assert list(goal.to_dict()) == list(GOAL)
+
+
+def test_time_fields_are_stored_as_epoch_seconds():
+    goal = Goal(GOAL)
+    assert isinstance(goal.created_at, int)
+    assert goal.completed_at - goal.created_at == 36 * 3600 + 45 * 60 + 9
+    assert goal["completed_at"] == "2024-03-02 21:15:09"
+    assert isinstance(goal.actions[0], Action)
+    assert goal.actions[0].completed_at is None
+
+
+@pytest.mark.parametrize("value", ["2024-03-01", "not a time", "2024-03-01 08:61:00", None, ""])
+def test_unparseable_times_are_kept_as_is(value):
+    assert parse_ts(value) == value
+    assert format_ts(parse_ts(value)) == value
+    assert Goal({"created_at": value})["created_at"] == value
+
+
+def test_unknown_keys_survive_the_round_trip():
+    goal = Goal({**GOAL, "color": "red", "meta": {"a": [1]}})
+    assert goal["color"] == "red"
+    assert _json(goal)["meta"] == {"a": [1]}
+    del goal["color"]
+    assert "color" not in goal
+    with pytest.raises(KeyError):
+        del goal["current_goal"]
+
+
+def test_defaults_fill_missing_fields():
+    goal = Goal({"long_term_goal_id": "lt1"})
+    assert goal.long_term_goal_ids == ["lt1"]
+    assert goal.actions == [] and goal.done is False and goal.id
+    assert LongTermGoal({}).target_count == 100
+    assert Template({"long_term_goal_id": "lt1"}).long_term_goal_ids == ["lt1"]
+
+
+def test_clone_is_deep_and_compares_by_identity():
+    goal = Goal({**GOAL, "meta": {"a": [1]}})
+    copy = goal.clone()
+    assert _json(copy) == _json(goal)
+    assert copy != goal
+    copy.actions[0]["text"] = "改过"
+    copy["meta"]["a"].append(2)
+    assert goal.actions[0]["text"] == "动作"
+    assert goal["meta"] == {"a": [1]}
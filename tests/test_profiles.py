@@ -0,0 +1,23 @@
+import sys
+
+from goalfocus_core.profiles import ProfileManager
+from goalfocus_core.storage import DATA_FILE
+
+
+def test_legacy_data_comes_only_from_the_program_directory(tmp_path, monkeypatch):
+    program_dir = tmp_path / "program"
+    other_dir = tmp_path / "elsewhere"
+    program_dir.mkdir()
+    other_dir.mkdir()
+    (other_dir / DATA_FILE).write_text('{"from": "cwd"}', encoding="utf-8")
+    monkeypatch.chdir(other_dir)
+    monkeypatch.setattr(sys, "argv", [str(program_dir / "main.py")])
+
+    root = tmp_path / "data"
+    ProfileManager(str(root))
+    assert not (root / DATA_FILE).exists()
+
+    (program_dir / DATA_FILE).write_text('{"from": "program"}', encoding="utf-8")
+    root = tmp_path / "data2"
+    ProfileManager(str(root))
+    assert (root / DATA_FILE).read_text(encoding="utf-8") == '{"from": "program"}'
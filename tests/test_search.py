@@ -0,0 +1,66 @@
+from goalfocus_core.model import Goal
+from goalfocus_core.search import ArchiveSearchIndex, query_terms, tokenize
+
+
+def _goal(goal_id, current, long_term="", actions=(), completed_at="2024-01-01 10:00:00"):
+    return Goal(
+        {
+            "id": goal_id,
+            "current_goal": current,
+            "long_term": long_term,
+            "actions": [{"text": t} for t in actions],
+            "completed_at": completed_at,
+        }
+    )
+
+
+def test_tokenize_cjk_bigrams_and_latin_words():
+    assert tokenize("背单词 Python3") == ["背", "单", "词", "背单", "单词", "python3"]
+    # 多字查询只用 bigram，单字查询用单字
+    assert query_terms("单词") == ["单词"]
+    assert query_terms("词") == ["词"]
+
+
+def test_search_ranks_current_goal_above_actions():
+    index = ArchiveSearchIndex()
+    index.add(_goal("in-action", "跑步", actions=["背单词"]))
+    index.add(_goal("in-goal", "背单词"))
+    index.add(_goal("other", "读书"))
+
+    assert index.search("单词") == ["in-goal", "in-action"]
+    # 所有词项都要命中
+    assert index.search("单词 读书") == []
+
+
+def test_ties_put_recent_cards_first():
+    index = ArchiveSearchIndex()
+    index.add(_goal("old", "写周报", completed_at="2024-01-01 10:00:00"))
+    index.add(_goal("new", "写周报", completed_at="2024-03-01 10:00:00"))
+
+    assert index.search("周报") == ["new", "old"]
+
+
+def test_latin_prefix_matching_follows_add_and_remove():
+    index = ArchiveSearchIndex()
+    index.add(_goal("a", "read python book"))
+    index.add(_goal("b", "pyramid plan"))
+
+    assert sorted(index.search("py")) == ["a", "b"]
+    assert index.search("pyt") == ["a"]
+    assert index.search("PYTHON") == ["a"]
+
+    index.remove("a")
+    assert index.search("py") == ["b"]
+    assert index.search("python") == []
+
+
+def test_re_adding_a_card_replaces_its_terms():
+    index = ArchiveSearchIndex()
+    goal = _goal("a", "学习英语")
+    index.add(goal)
+    goal["current_goal"] = "学习数学"
+    index.add(goal)
+
+    assert index.search("英语") == []
+    assert index.search("数学") == ["a"]
+    assert len(index) == 1
@@ -0,0 +1,92 @@
+import json
+import os
+
+from goalfocus_core.service import GoalService
+from goalfocus_core.shards import shard_search_path
+from goalfocus_core.storage import DATA_FILE, JournalStore
+
+MONTHS = ["2024-03", "2024-02", "2024-01"]
+
+
+def _open(directory) -> GoalService:
+    return GoalService(JournalStore(os.path.join(directory, DATA_FILE), write_delay=0))
+
+
+def _legacy_data(directory):
+    """旧版快照：整份归档在快照里，第一次加载时拆成分片并写出附属文件。"""
+    archive = []
+    for month in MONTHS:
+        for day in (20, 10):
+            archive.append({
+                "id": f"{month}-{day}",
+                "current_goal": f"{month} 第 {day} 天 writing",
+                "long_term": "长期",
+                "done": True,
+                "created_at": f"{month}-{day:02d} 08:00:00",
+                "completed_at": f"{month}-{day:02d} 09:00:00",
+                "actions": [{"id": f"a-{month}-{day}", "text": "动作", "done": True}],
+            })
+    archive[-1]["current_goal"] = "最早的一张 reading"
+    with open(os.path.join(directory, DATA_FILE), "w", encoding="utf-8") as f:
+        json.dump({"archive": archive}, f, ensure_ascii=False)
+    _open(directory).close()
+
+
+def test_startup_reads_no_shards(tmp_path):
+    _legacy_data(tmp_path)
+    service = _open(tmp_path)
+    archive = service.store["archive"]
+    assert len(archive) == 6 and len(service.repo.stats) == 6
+    assert archive.loaded_months() == []
+    service.close()
+
+
+def test_lookup_by_id_reads_only_its_shard(tmp_path):
+    _legacy_data(tmp_path)
+    service = _open(tmp_path)
+    archive = service.store["archive"]
+
+    assert service.repo.archive_goal("2024-01-10")["current_goal"] == "最早的一张 reading"
+    assert archive.loaded_months() == ["2024-01"]
+    assert service.repo.archive_index("2024-01-10") == 5
+    assert service.repo.archive_goal("no-such-card") is None
+    assert archive.loaded_months() == ["2024-01"]
+    service.close()
+
+
+def test_search_index_is_built_without_reading_shards(tmp_path):
+    _legacy_data(tmp_path)
+    service = _open(tmp_path)
+    archive = service.store["archive"]
+
+    assert service.repo.search_archive("reading") == ["2024-01-10"]
+    assert service.repo.search_archive("writ") == [f"{m}-{d}" for m in MONTHS for d in (20, 10)][:-1]
+    assert archive.loaded_months() == []
+    service.close()
+
+
+def test_stale_or_missing_sidecar_falls_back_to_the_shard(tmp_path):
+    _legacy_data(tmp_path)
+    os.remove(shard_search_path(os.path.join(tmp_path, DATA_FILE + ".archive"), "2024-01"))
+
+    service = _open(tmp_path)
+    assert service.repo.search_archive("reading") == ["2024-01-10"]
+    assert service.store["archive"].loaded_months() == ["2024-01"]
+    service.close()
+
+
+def test_sidecars_follow_archive_changes(tmp_path):
+    _legacy_data(tmp_path)
+    service = _open(tmp_path)
+    service.store["total_completed_count"] = 10
+    service.delete_archived_goal("2024-01-10")
+    goal = service.create_goal("长期", "新卡片 reading", ["动作"])
+    service.toggle_all_actions(goal["id"])
+    service.finish_goal(goal["id"])
+    service.close()
+
+    service = _open(tmp_path)
+    assert service.repo.search_archive("reading") == [goal["id"]]
+    assert len(service.repo.stats) == 6
+    assert service.repo.archive_goal("2024-01-10") is None
+    service.close()
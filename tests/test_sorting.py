@@ -0,0 +1,61 @@
+import json
+import os
+
+from goalfocus_core.repository import Repository
+from goalfocus_core.service import GoalService
+from goalfocus_core.sqlite_store import SqliteStore
+
+# 归档顺序：最新在前；"b" 与 "c" 的长期目标相同，用来检查相同值保持原来的先后
+ARCHIVE = [
+    {"id": "d", "long_term": "写作", "current_goal": "周报", "completed_at": "2024-03-01 09:00:00"},
+    {"id": "c", "long_term": "跑步", "current_goal": "五公里", "completed_at": "2024-02-01 09:00:00"},
+    {"id": "b", "long_term": "跑步", "current_goal": "十公里", "completed_at": "2024-02-15 09:00:00"},
+    {"id": "a", "long_term": "", "current_goal": "读书", "completed_at": None},
+]
+
+
+def _goals():
+    return [dict(g, done=True, actions=[]) for g in ARCHIVE]
+
+
+def test_sorts_whole_list_archive():
+    repo = Repository({"archive": _goals()})
+
+    assert repo.sorted_archive_ids("long_term") == ["a", "d", "c", "b"]
+    assert repo.sorted_archive_ids("long_term", descending=True) == ["c", "b", "d", "a"]
+    assert repo.sorted_archive_ids("completed_at") == ["a", "c", "b", "d"]
+
+
+def test_sort_follows_archive_changes():
+    repo = Repository({"archive": _goals()})
+    assert repo.sorted_archive_ids("completed_at", descending=True)[0] == "d"
+
+    repo.add_archive_goal({"id": "e", "current_goal": "新", "done": True, "completed_at": "2024-04-01 09:00:00"})
+    assert repo.sorted_archive_ids("completed_at", descending=True)[0] == "e"
+
+    repo.remove_archive_goal_at(repo.archive_index("e"))
+    assert "e" not in repo.sorted_archive_ids("completed_at", descending=True)
+
+
+def test_sorts_search_results_only():
+    repo = Repository({"archive": _goals()})
+
+    assert repo.sorted_archive_ids("current_goal", ids=["d", "a"]) == ["d", "a"]
+    assert repo.sorted_archive_ids("completed_at", ids=["d", "b", "c"]) == ["c", "b", "d"]
+
+
+def test_sqlite_order_by_matches_list_archive(tmp_path):
+    # 第一次打开时从 JSON 数据迁移
+    json_path = os.path.join(tmp_path, "goals_data.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({"archive": _goals()}, f, ensure_ascii=False)
+    service = GoalService(SqliteStore(os.path.join(tmp_path, "goals.sqlite3"), json_path=json_path))
+    expected = Repository({"archive": _goals()})
+    try:
+        for field in ("long_term", "current_goal", "created_at", "completed_at"):
+            for descending in (False, True):
+                assert service.repo.sorted_archive_ids(field, descending) == expected.sorted_archive_ids(
+                    field, descending
+                )
+    finally:
+        service.close()
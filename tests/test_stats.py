@@ -0,0 +1,172 @@
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from goalfocus_core.service import GoalService
+from goalfocus_core.shards import shard_index_path
+from goalfocus_core.stats import ArchiveStats
+from goalfocus_core.storage import open_storage
+
+TODAY = date(2024, 3, 10)
+
+
+def _card(gid, done_day: date, hours=2, lt="lt1", actions=1):
+    done = datetime.combine(done_day, datetime.min.time()) + timedelta(hours=12)
+    fmt = "%Y-%m-%d %H:%M:%S"
+    return {
+        "id": gid,
+        "long_term_goal_ids": [lt],
+        "created_at": (done - timedelta(hours=hours)).strftime(fmt),
+        "completed_at": done.strftime(fmt),
+        "actions": [{"id": f"{gid}-{i}", "completed_at": done.strftime(fmt)} for i in range(actions)],
+    }
+
+
+def _stats(*days) -> ArchiveStats:
+    stats = ArchiveStats()
+    for i, d in enumerate(days):
+        stats.add(_card(f"g{i}", d))
+    return stats
+
+
+def test_current_streak_counts_from_yesterday_until_today_is_done():
+    stats = _stats(TODAY - timedelta(days=1), TODAY - timedelta(days=2))
+    assert stats.current_streak(TODAY) == 2
+    stats.add(_card("today", TODAY))
+    assert stats.current_streak(TODAY) == 3
+
+
+def test_gap_breaks_the_streak():
+    stats = _stats(TODAY - timedelta(days=2), TODAY - timedelta(days=3))
+    assert stats.current_streak(TODAY) == 0
+    assert stats.longest_streak() == 2
+
+
+def test_several_cards_on_one_day_count_once():
+    stats = _stats(TODAY, TODAY, TODAY - timedelta(days=1))
+    assert stats.current_streak(TODAY) == 2
+    assert stats.cards_by_day[TODAY.toordinal()] == 2
+
+
+def test_longest_streak_across_month_and_year_boundaries():
+    start = date(2023, 12, 30)
+    stats = _stats(*(start + timedelta(days=i) for i in range(5)), date(2024, 2, 1))
+    assert stats.longest_streak() == 5
+
+
+def test_removing_a_card_recomputes_the_streak():
+    days = [TODAY - timedelta(days=i) for i in range(4)]
+    stats = _stats(*days)
+    assert stats.longest_streak() == 4
+    stats.remove(_card("g1", days[1]))
+    assert stats.longest_streak() == 2
+    assert stats.current_streak(TODAY) == 1
+    # 同一天还有别的卡片时，删掉一张不影响连续天数
+    stats = _stats(TODAY, TODAY, TODAY - timedelta(days=1))
+    stats.remove(_card("g0", TODAY))
+    assert stats.current_streak(TODAY) == 2
+
+
+def test_empty_stats():
+    stats = ArchiveStats()
+    assert stats.current_streak(TODAY) == 0
+    assert stats.longest_streak() == 0
+    assert stats.median_duration() is None
+    assert stats.long_term_velocity("lt1", today=TODAY) == {"total": 0, "per_week": 0.0, "recent": 0.0}
+
+
+def test_median_and_velocity():
+    stats = ArchiveStats()
+    for i, hours in enumerate([1, 3, 2, 10]):
+        stats.add(_card(f"g{i}", TODAY - timedelta(days=7 * i), hours=hours))
+    assert stats.median_duration() == 2.5 * 3600
+    v = stats.long_term_velocity("lt1", weeks=2, today=TODAY)
+    assert v["total"] == 4 and v["recent"] == 1.0
+
+
+def test_add_and_remove_are_symmetric_and_entries_round_trip():
+    cards = [_card(f"g{i}", TODAY - timedelta(days=i % 3), hours=i + 1, actions=i) for i in range(6)]
+    stats = ArchiveStats()
+    for c in cards:
+        stats.add(c)
+    restored = ArchiveStats.from_entries(stats.entries())
+    assert sorted(restored.entries()) == sorted(stats.entries())
+    assert len(restored) == 6 and restored.median_duration() == stats.median_duration()
+    for c in cards:
+        restored.remove(c)
+    assert restored.entries() == [] and len(restored) == 0
+
+
+def _finish(service, text):
+    goal = service.create_goal("长期", text, ["动作"])
+    service.toggle_all_actions(goal["id"])
+    service.finish_goal(goal["id"])
+    return goal["id"]
+
+
+@pytest.mark.parametrize("engine", ["json", "sqlite"])
+def test_saved_stats_are_used_at_startup(engine, tmp_path):
+    service = GoalService(open_storage(engine, str(tmp_path)))
+    ids = [_finish(service, f"卡片{i}") for i in range(3)]
+    service.store["total_completed_count"] = 10
+    service.delete_archived_goal(ids[0])
+    service.close()
+
+    service = GoalService(open_storage(engine, str(tmp_path)))
+    stats = service.repo.stats
+    assert len(stats) == 2
+    assert stats.current_streak() == 1
+    assert sum(stats.actions_by_day.values()) == 2
+    if engine == "json":
+        # 统计来自各分片的统计文件，没有读分片
+        assert service.store["archive"].loaded_months() == []
+    service.close()
+
+
+def test_missing_shard_index_is_rebuilt(tmp_path):
+    service = GoalService(open_storage("json", str(tmp_path)))
+    _finish(service, "卡片")
+    month = service.store["archive"].loaded_months()[0]
+    service.close()
+    index = shard_index_path(str(tmp_path / "goals_data.json.archive"), month)
+    os.remove(index)
+
+    service = GoalService(open_storage("json", str(tmp_path)))
+    assert len(service.repo.stats) == 1
+    assert os.path.exists(index)
+    service.close()
+
+
+def test_shard_changed_by_another_process_is_counted_once(tmp_path):
+    first = GoalService(open_storage("json", str(tmp_path)))
+    _finish(first, "一")
+    first.close()
+
+    first = GoalService(open_storage("json", str(tmp_path)))
+    second = GoalService(open_storage("json", str(tmp_path)))
+    _finish(second, "二")
+    second.close()
+
+    first.poll_external()
+    first.storage.flush()
+    first.apply_external()
+    assert len(first.repo.stats) == 2
+    assert first.repo.stats.cards_by_day[date.today().toordinal()] == 2
+    first.close()
+
+
+def test_sqlite_stats_table_is_rebuilt_when_out_of_date(tmp_path):
+    service = GoalService(open_storage("sqlite", str(tmp_path)))
+    _finish(service, "卡片")
+    service.close()
+    conn = sqlite3.connect(tmp_path / "goals_data.sqlite3")
+    conn.execute("DELETE FROM archive_stats")  # 旧版本数据库没有这张表的内容
+    conn.commit()
+    conn.close()
+
+    service = GoalService(open_storage("sqlite", str(tmp_path)))
+    assert len(service.repo.stats) == 1
+    assert service.repo.stats_ready
+    service.close()
@@ -0,0 +1,82 @@
+import json
+import os
+
+from goalfocus_core import cli
+from goalfocus_core.service import GoalService
+from goalfocus_core.shards import read_manifest
+from goalfocus_core.storage import DATA_FILE, JournalStore
+
+
+def _open(directory) -> GoalService:
+    return GoalService(JournalStore(os.path.join(directory, DATA_FILE), write_delay=0))
+
+
+def _finish_new_goal(service: GoalService, text: str):
+    goal = service.create_goal("长期", text, ["动作"])
+    service.toggle_all_actions(goal["id"])
+    service.finish_goal(goal["id"])
+    return goal["id"]
+
+
+def _archive_ids(directory) -> list[str]:
+    service = _open(directory)
+    ids = [g["id"] for g in service.repo.archive()]
+    service.close()
+    return ids
+
+
+def _batch(tmp_path, *lines) -> int:
+    ops = tmp_path / "ops.txt"
+    ops.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return cli.main(["--storage", "json", "batch", str(ops)])
+
+
+def test_finish_in_fresh_data_dir(data_dir, tmp_path):
+    # 整批只写一次：第一次写入就是包含新归档卡片的完整快照
+    assert _batch(tmp_path, "new --long-term 长期 --goal 当下 动作", "check 1", "finish") == 0
+
+    assert len(_archive_ids(data_dir)) == 1
+    assert sum(n for _, n in read_manifest(os.path.join(data_dir, DATA_FILE + ".archive"))) == 1
+
+
+def test_import_into_empty_data_dir(data_dir, tmp_path):
+    exported = tmp_path / "exp.json"
+    goal = {"id": "g1", "current_goal": "导入", "done": True, "completed_at": "2024-05-06 07:08:09", "actions": []}
+    exported.write_text(json.dumps({"archive": [goal]}), encoding="utf-8")
+
+    assert cli.main(["--storage", "json", "import", str(exported)]) == 0
+    assert _archive_ids(data_dir) == ["g1"]
+
+
+def test_finish_after_recovering_from_backup(data_dir, tmp_path):
+    service = _open(data_dir)
+    kept = _finish_new_goal(service, "旧的")
+    service.create_goal("长期", "进行中", ["动作"])
+    # 再写一次完整快照，让 .bak1 里有一份可用的备份
+    service.storage.compact(service.store)
+    service.close()
+    with open(os.path.join(data_dir, DATA_FILE), "w", encoding="utf-8") as f:
+        f.write("{ 损坏")
+
+    assert _batch(tmp_path, "check 1", "finish") == 0
+
+    service = _open(data_dir)
+    assert service.active_goals() == []
+    assert len(service.repo.archive()) == 2 and service.repo.archive()[1]["id"] == kept
+    service.close()
+
+
+def test_missing_snapshot_keeps_existing_shards(tmp_path):
+    service = _open(tmp_path)
+    kept = _finish_new_goal(service, "旧的")
+    service.close()
+    for name in os.listdir(tmp_path):
+        if name.startswith(DATA_FILE) and name != DATA_FILE + ".archive":
+            os.remove(os.path.join(tmp_path, name))
+
+    service = _open(tmp_path)
+    assert [g["id"] for g in service.repo.archive()] == [kept]
+    added = _finish_new_goal(service, "新的")
+    service.close()
+
+    assert _archive_ids(tmp_path) == [added, kept]